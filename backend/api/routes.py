@@ -1,7 +1,9 @@
 import json
 import io
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse, StreamingResponse
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import ValidationError
+from fastapi.responses import JSONResponse, StreamingResponse, Response
 
 from backend.types.types import (
     EnrichTaskRequest,
@@ -11,12 +13,21 @@ from backend.types.types import (
     EditProjectRequest,
     EditEnrichedTaskRequest,
     DeleteProjectRequest,
-    DeleteEnrichedTaskRequest, ProjectHandbookRequest
+    DeleteEnrichedTaskRequest, ProjectHandbookRequest,
+    BulkImportTask
 )
 from backend.rag.retriever import RAGService
-from backend.model.model import enrich_task_details, generate_project_handbook_text, render_handbook_pdf
+from backend.rag.async_rag import AsyncRAGService
+from backend.model.model import (
+    enrich_task_details, stream_task_enrichment,
+    get_handbook_fingerprint, open_handbook_pdf, handbook_cache, handbook_renderer
+)
 from backend.service.project_service import ProjectService
 from backend.service.task_service import TaskService
+from backend.model.context_builder import context_metrics
+from backend.model import response_cache
+from backend.model.enrichment_queue import enrichment_queue
+from backend.core.local_cache import context_cache
 
 
 
@@ -33,7 +44,20 @@ def health() -> IndexResponse:
     ready = _rag is not None and _rag_init_error is None
     return IndexResponse(
         ok=ready,
-        data={"service": "index", "rag_ready": ready},
+        data={
+            "service": "index",
+            "rag_ready": ready,
+            "embedding_cache": _rag.vs.embedding_cache_stats() if ready else {},
+            "lexical_index": _rag.vs.lexical.stats() if ready else {},
+            "collections": _rag.vs.collections.stats() if ready else {},
+            "rag_pool": AsyncRAGService.stats(),
+            "context": context_metrics(),
+            "context_cache": context_cache.stats(),
+            "response_cache": response_cache.stats(),
+            "enrichment_jobs": enrichment_queue.stats(),
+            "handbook_cache": handbook_cache.stats(),
+            "handbook_renderer": handbook_renderer.stats(),
+        },
         detail=None if ready else f"RAGService init error: {_rag_init_error}",
     )
 
@@ -126,6 +150,130 @@ async def enrich_and_index(req: EnrichTaskRequest) -> IndexResponse:
         raise HTTPException(status_code=500, detail=f"Enrich+Index failed: {e}") from e
 
 
+@router.post("/task/enrich_and_index/jobs", status_code=202)
+async def enqueue_enrich_and_index(req: EnrichTaskRequest):
+    """
+    Asynchronous /task/enrich_and_index: queue the enrichment and return a job id
+    right away. Poll /task/jobs/{jobId} for the status and the result.
+    Re-submitting the same task (project, title, description) returns the existing job.
+    """
+    try:
+        job_id, deduplicated = await enrichment_queue.enqueue(
+            IndexTaskRequest(
+                projectId=req.projectId,
+                task_title=req.task_title,
+                taskId=req.taskId,
+                user_description=req.user_description,
+                selected_model=req.selected_model,
+                userId=req.userId,
+                status=req.status
+            )
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Enqueue enrichment failed: {e}") from e
+
+    return JSONResponse(status_code=202, content={
+        "success": True,
+        "jobId": job_id,
+        "deduplicated": deduplicated
+    })
+
+
+@router.get("/task/jobs/{job_id}")
+async def get_enrich_job(job_id: str):
+    try:
+        job = await enrichment_queue.get_job(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Job lookup failed: {e}") from e
+
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return JSONResponse(content=job)
+
+
+@router.post("/task/enrich_and_index/stream")
+async def enrich_and_index_stream(req: EnrichTaskRequest):
+    """
+    Same as /task/enrich_and_index, but streams the generation as Server-Sent Events
+    (token, story_points, done / error). The task is saved once the stream completes.
+    """
+    if _rag is None:
+        raise HTTPException(status_code=500, detail=f"Unavailable RAGService: {_rag_init_error}")
+
+    return StreamingResponse(
+        stream_task_enrichment(
+            IndexTaskRequest(
+                projectId=req.projectId,
+                task_title=req.task_title,
+                taskId=req.taskId,
+                user_description=req.user_description,
+                selected_model=req.selected_model,
+                userId=req.userId,
+                status=req.status
+            )
+        ),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+async def _iter_ndjson_tasks(request: Request, rejected: list):
+    """Parse the request body line by line as NDJSON, without buffering it whole."""
+    buffer = b""
+    line_no = 0
+
+    def parse(raw: bytes):
+        nonlocal line_no
+        line_no += 1
+        if not raw.strip():
+            return None
+        try:
+            return BulkImportTask.model_validate_json(raw)
+        except ValidationError as e:
+            rejected.append({"line": line_no, "error": str(e.errors()[0].get("msg", e))})
+            return None
+
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            task = parse(raw)
+            if task is not None:
+                yield task
+    task = parse(buffer)
+    if task is not None:
+        yield task
+
+
+@router.post("/task/bulk_import", response_model=IndexResponse)
+async def bulk_import_tasks(projectId: str, request: Request, batch_size: int = 500) -> IndexResponse:
+    """
+    Import many tasks at once. The body is NDJSON, one task per line:
+    {"title": ..., "description": ..., "ai_description": ..., "status": ..., "story_points": ...}
+    """
+    rejected: list = []
+    try:
+        stats = await _task_service.bulk_import_tasks(
+            projectId,
+            _iter_ndjson_tasks(request, rejected),
+            batch_size=max(1, min(batch_size, 1000)),
+        )
+        stats["rejected"] = len(rejected)
+
+        return IndexResponse(
+            ok=stats["failed"] == 0 and not stats.get("index_failed") and not rejected,
+            data={**stats, "rejected_lines": rejected[:50]},
+            detail=f"Imported {stats['imported']} tasks"
+                   + (f", {stats['index_failed']} not indexed" if stats.get("index_failed") else "")
+        )
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Bulk import failed: {e}") from e
+
+
 @router.put("/edit/task", response_model=IndexResponse)
 async def update_task(req: EditEnrichedTaskRequest) -> IndexResponse:
     try:
@@ -162,25 +310,77 @@ async def delete_task(req: DeleteEnrichedTaskRequest) -> IndexResponse:
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Task deletion failed: {e}") from e
 
-@router.post("/project/handbook/pdf")
-async def generate_project_handbook_pdf(req: ProjectHandbookRequest):
+PDF_CHUNK_SIZE = 64 * 1024
+
+
+async def _iter_file(f, chunk_size: int = PDF_CHUNK_SIZE):
+    """Stream an open file in fixed-size chunks and close it, also when the client disconnects."""
+    try:
+        while True:
+            chunk = await asyncio.to_thread(f.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+async def _handbook_pdf_response(req: ProjectHandbookRequest, if_none_match: str | None = None):
     """
-    Generate a structured project handbook using the LLM and return it as a downloadable PDF.
-    This uses only Supabase data (no Redis or RAG in this flow).
+    The handbook PDF, cached by a fingerprint of the project / task rows which is
+    also the ETag. With `if_none_match` (GET only), a matching ETag gets a 304
+    without any generation.
     """
     try:
-        # generate handbook text from Supabase data
-        markdown_text = await generate_project_handbook_text(req)
-        pdf_bytes = render_handbook_pdf(markdown_text)
+        fingerprint, project_row = await get_handbook_fingerprint(req)
+        etag = f'"{fingerprint}"'
+        cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
 
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=cache_headers)
+
+        pdf_file = await open_handbook_pdf(req, fingerprint, project_row)
+        size = pdf_file.seek(0, io.SEEK_END)
+        pdf_file.seek(0)
 
         return StreamingResponse(
-            io.BytesIO(pdf_bytes),
+            _iter_file(pdf_file),
             media_type="application/pdf",
             headers={
-            "Content-Disposition": "inline; filename=project-handbook.pdf"
+            "Content-Disposition": "inline; filename=project-handbook.pdf",
+            "Content-Length": str(size),
+            **cache_headers
             }
         )
     except Exception as e:
         print(f'Unexpected error in project handbook route: {e}')
-        raise HTTPException(status_code=500, detail=f"Handbook generation failed unexpectedly: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Handbook generation failed unexpectedly: {e}")
+
+
+@router.post("/project/handbook/pdf")
+async def generate_project_handbook_pdf(req: ProjectHandbookRequest):
+    """
+    Generate a structured project handbook using the LLM and return it as a downloadable PDF.
+    This uses only Supabase data (no Redis or RAG in this flow).
+
+    Always answers with the PDF (and its ETag); conditional requests go through
+    GET /project/handbook/pdf, since a POST cannot be answered with a 304.
+    """
+    return await _handbook_pdf_response(req)
+
+
+@router.get("/project/handbook/pdf")
+async def get_project_handbook_pdf(request: Request, userId: str, projectId: str, selected_model: int = 1):
+    """
+    Same handbook PDF as the POST route, addressed by query parameters so it
+    supports conditional requests: a matching If-None-Match gets a 304.
+    """
+    req = ProjectHandbookRequest(userId=userId, projectId=projectId, selected_model=selected_model)
+    return await _handbook_pdf_response(req, request.headers.get("if-none-match"))
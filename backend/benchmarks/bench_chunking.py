@@ -0,0 +1,88 @@
+"""
+Chunking throughput, current chunk_text against the previous implementation.
+
+    python -m backend.benchmarks.bench_chunking --mb 1 --repeat 3
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+from typing import Callable, List
+
+from backend.rag.chunking import _SENT_SPLIT, chunk_text, iter_chunks, normalize_text
+
+
+def legacy_chunk_text(text: str, max_words: int = 220, overlap_words: int = 40) -> List[str]:
+    """chunk_text before the single-pass rewrite, kept as the reference output."""
+    text = normalize_text(text)
+    if not text:
+        return []
+    sents = [s.strip() for s in _SENT_SPLIT.split(text) if s.strip()]
+    chunks: List[str] = []
+    cur: List[str] = []
+    cur_words = 0
+    for sent in sents:
+        w = len(sent.split())
+        if cur_words + w > max_words and cur:
+            chunks.append(" ".join(cur))
+            # overlap
+            overlap, ow = [], 0
+            for t in reversed(cur):
+                tw = len(t.split())
+                if ow + tw > overlap_words: break
+                overlap.insert(0, t); ow += tw
+            cur = overlap + [sent]
+            cur_words = sum(len(t.split()) for t in cur)
+        else:
+            cur.append(sent)
+            cur_words += w
+    if cur:
+        chunks.append(" ".join(cur))
+    return chunks
+
+
+def sample_text(n_bytes: int, seed: int = 0) -> str:
+    """Task-description-like text: sentences of 3 to 40 words, some blank lines."""
+    rng = random.Random(seed)
+    vocab = ["api", "login", "dashboard", "refactor", "the", "user", "token", "cache",
+             "endpoint", "database", "migration", "test", "deploy", "error", "page"]
+    parts, size = [], 0
+    while size < n_bytes:
+        sent = " ".join(rng.choice(vocab) for _ in range(rng.randint(3, 40)))
+        sent += rng.choice([". ", "! ", "? ", ".\n\n"])
+        parts.append(sent)
+        size += len(sent)
+    return "".join(parts)
+
+
+def bench(name: str, fn: Callable[[str], object], text: str, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - t)
+    mb = len(text) / (1024 * 1024)
+    print(f"{name:<22} {best * 1000:9.1f} ms   {mb / best:8.1f} MB/s")
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mb", type=float, default=1.0, help="input size in MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-words", type=int, default=220)
+    parser.add_argument("--overlap-words", type=int, default=40)
+    args = parser.parse_args()
+
+    text = sample_text(int(args.mb * 1024 * 1024))
+    kwargs = {"max_words": args.max_words, "overlap_words": args.overlap_words}
+    assert chunk_text(text, **kwargs) == legacy_chunk_text(text, **kwargs)
+
+    legacy = bench("legacy chunk_text", lambda t: legacy_chunk_text(t, **kwargs), text, args.repeat)
+    current = bench("chunk_text", lambda t: chunk_text(t, **kwargs), text, args.repeat)
+    bench("iter_chunks (first)", lambda t: next(iter_chunks(t, **kwargs)), text, args.repeat)
+    print(f"speedup: {legacy / current:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
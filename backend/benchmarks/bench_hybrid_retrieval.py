@@ -0,0 +1,122 @@
+"""
+Hybrid retrieval latency per query: BM25 search + rank fusion, optionally the
+Chroma vector query as well (random unit vectors, no embedding model needed).
+
+    python -m backend.benchmarks.bench_hybrid_retrieval --chunks 10000 100000
+    python -m backend.benchmarks.bench_hybrid_retrieval --chunks 10000 --chroma
+"""
+from __future__ import annotations
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from backend.rag.lexical_index import BM25Index, reciprocal_rank_fusion
+
+
+DIM = 384  # all-MiniLM-L6-v2
+
+
+def synthetic_chunks(n: int, seed: int = 0) -> List[Tuple[str, str, dict]]:
+    """Task-like chunks: zipf-distributed vocabulary plus ticket keys / error codes."""
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(5000)]
+    weights = [1 / (i + 1) for i in range(len(vocab))]
+    chunks = []
+    for i in range(n):
+        words = rng.choices(vocab, weights=weights, k=rng.randint(40, 200))
+        words.append(f"PROJ-{rng.randint(1, n)}")
+        if rng.random() < 0.2:
+            words.append(f"E{rng.randint(1000, 9999)}")
+        status = "archived" if rng.random() < 0.05 else "todo"
+        chunks.append((f"task-T{i}-0", " ".join(words), {"type": "task", "status": status}))
+    return chunks
+
+
+def queries(n: int, count: int, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        f"PROJ-{rng.randint(1, n)} " + " ".join(f"w{rng.randint(0, 2000)}" for _ in range(rng.randint(3, 12)))
+        for _ in range(count)
+    ]
+
+
+def percentiles(samples_ms: List[float]) -> str:
+    samples_ms = sorted(samples_ms)
+    p95 = samples_ms[int(0.95 * (len(samples_ms) - 1))]
+    return f"p50 {statistics.median(samples_ms):7.2f} ms   p95 {p95:7.2f} ms"
+
+
+def chroma_collection(chunks, seed: int = 2):
+    import chromadb
+
+    client = chromadb.PersistentClient(path=tempfile.mkdtemp(prefix="bench_chroma_"))
+    coll = client.get_or_create_collection("bench", embedding_function=None)
+    rng = np.random.default_rng(seed)
+    batch = client.get_max_batch_size()
+    for start in range(0, len(chunks), batch):
+        part = chunks[start:start + batch]
+        vectors = rng.normal(size=(len(part), DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        coll.add(ids=[c[0] for c in part], documents=[c[1] for c in part],
+                 metadatas=[c[2] for c in part], embeddings=vectors)
+    return coll
+
+
+def run(n: int, n_queries: int, k: int, with_chroma: bool) -> None:
+    chunks = synthetic_chunks(n)
+
+    t = time.perf_counter()
+    index = BM25Index()
+    for doc_id, text, md in chunks:
+        index.add(doc_id, text, md)
+    print(f"\n{n} chunks: BM25 index built in {time.perf_counter() - t:.1f} s")
+
+    coll = chroma_collection(chunks) if with_chroma else None
+    rng = np.random.default_rng(3)
+    lexical_ms, fusion_ms, vector_ms = [], [], []
+    for q in queries(n, n_queries):
+        if coll is not None:
+            vec = rng.normal(size=DIM).astype(np.float32)
+            t = time.perf_counter()
+            res = coll.query(query_embeddings=[vec / np.linalg.norm(vec)], n_results=k,
+                             where={"status": {"$ne": "archived"}})
+            vector_ms.append((time.perf_counter() - t) * 1000)
+            vector_ids = res["ids"][0]
+        else:
+            vector_ids = [chunks[i][0] for i in range(k)]
+
+        t = time.perf_counter()
+        hits = index.search(q, k, accept=lambda md: md["status"] != "archived")
+        lexical_ms.append((time.perf_counter() - t) * 1000)
+
+        t = time.perf_counter()
+        reciprocal_rank_fusion([vector_ids, [cid for cid, _ in hits]])
+        fusion_ms.append((time.perf_counter() - t) * 1000)
+
+    print(f"  lexical search   {percentiles(lexical_ms)}")
+    print(f"  rank fusion      {percentiles(fusion_ms)}")
+    if vector_ms:
+        print(f"  vector query     {percentiles(vector_ms)}")
+        total = [a + b + c for a, b, c in zip(vector_ms, lexical_ms, fusion_ms)]
+        print(f"  hybrid total     {percentiles(total)}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=12)
+    parser.add_argument("--chroma", action="store_true", help="also measure the Chroma vector query")
+    args = parser.parse_args()
+
+    for n in args.chunks:
+        run(n, args.queries, args.k, args.chroma)
+
+
+if __name__ == "__main__":
+    main()
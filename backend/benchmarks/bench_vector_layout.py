@@ -0,0 +1,181 @@
+"""
+Vector store layouts at many projects: "per_project" (one collection each)
+against "sharded" (VECTOR_SHARDS shared collections filtered by projectId).
+
+For each layout and project count, a store is built in a temporary directory
+(random unit vectors, no embedding model needed), then a fresh process opens
+it and measures start up (client + first query), query latency over random
+projects, peak RSS, open file descriptors and disk size. Queries run twice:
+the first pass loads the HNSW index of each collection it touches (cold),
+the second one finds them in memory (warm).
+
+Measured so far: 1000 projects in both layouts, 10000 in the sharded one.
+The 50000 point and per_project at 10000 (its build did not finish in 10
+minutes) are out of scope of those results; the first command below runs
+them on a machine with the disk and time to spare.
+
+    python -m backend.benchmarks.bench_vector_layout --projects 1000 10000 50000
+    python -m backend.benchmarks.bench_vector_layout --projects 1000 --shards 32 --chunks 8
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from backend.rag.vector_layout import PER_PROJECT, SHARDED
+from backend.rag.vector_store import VectorStore, VSConfig
+from backend.benchmarks.bench_hybrid_retrieval import DIM, percentiles
+
+
+class RandomEmbedding(EmbeddingFunction[Documents]):
+    """Unit vectors seeded by the text, standing in for all-MiniLM-L6-v2."""
+
+    def __init__(self) -> None:
+        pass
+
+    def __call__(self, input: Documents) -> Embeddings:
+        out = []
+        for text in input:
+            seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+            v = np.random.default_rng(seed).normal(size=DIM).astype(np.float32)
+            out.append(v / np.linalg.norm(v))
+        return out
+
+    @staticmethod
+    def name() -> str:
+        return "default"
+
+    def get_config(self) -> Dict[str, object]:
+        return {}
+
+    @staticmethod
+    def build_from_config(config: Dict[str, object]) -> "RandomEmbedding":
+        return RandomEmbedding()
+
+
+def open_store(path: str, layout: str, shards: int) -> VectorStore:
+    vs = VectorStore(VSConfig(persist_dir=path, layout=layout, shards=shards))
+    vs.embed = RandomEmbedding()
+    return vs
+
+
+def build(path: str, layout: str, shards: int, projects: int, chunks: int) -> float:
+    """Index `chunks` task chunks per project; returns the seconds taken."""
+    vs = open_store(path, layout, shards)
+    rng = np.random.default_rng(0)
+    started = time.perf_counter()
+    for p in range(projects):
+        items = [{
+            "id": f"task-T{p}x{i}-0",
+            "text": f"task {i} of project {p}: login flow, error E{1000 + i}",
+            "metadata": {"projectId": f"P{p}", "type": "task", "taskId": f"T{p}x{i}", "status": "todo"},
+        } for i in range(chunks)]
+        vectors = rng.normal(size=(chunks, DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        vs.upsert_texts(f"P{p}", items, embeddings=vectors)
+    return time.perf_counter() - started
+
+
+def disk_bytes(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss survives exec, it would report the builder's peak: read the VmHWM of this process
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def measure(path: str, layout: str, shards: int, projects: int, n_queries: int) -> Dict[str, object]:
+    """Run in a fresh process: cold open, then queries over random projects."""
+    started = time.perf_counter()
+    vs = open_store(path, layout, shards)
+    vs.query("P0", "login error", k=5, where={"status": {"$ne": "archived"}})
+    startup_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(1)
+    project_ids = [f"P{rng.randrange(projects)}" for _ in range(n_queries)]
+    passes: List[List[float]] = []
+    for _ in ("cold", "warm"):
+        latencies: List[float] = []
+        for project_id in project_ids:
+            t = time.perf_counter()
+            raw = vs.query(project_id, "login error", k=5, where={"status": {"$ne": "archived"}})
+            latencies.append((time.perf_counter() - t) * 1000)
+            assert all(md["projectId"] == project_id for md in raw["metadatas"][0])
+        passes.append(latencies)
+
+    return {
+        "startup_ms": startup_ms,
+        "cold": passes[0],
+        "warm": passes[1],
+        "rss_mb": peak_rss_mb(),
+        "open_fds": len(os.listdir("/proc/self/fd")) if os.path.isdir("/proc/self/fd") else None,
+        "collections": len(vs.client.list_collections()),
+    }
+
+
+def run(layout: str, shards: int, projects: int, chunks: int, n_queries: int) -> None:
+    path = tempfile.mkdtemp(prefix="bench_layout_")
+    try:
+        build_s = build(path, layout, shards, projects, chunks)
+        out = subprocess.run(
+            [sys.executable, "-m", "backend.benchmarks.bench_vector_layout", "--measure", path,
+             "--layout", layout, "--shards", str(shards), "--projects", str(projects),
+             "--queries", str(n_queries)],
+            check=True, capture_output=True, text=True,
+        )
+        m = json.loads(out.stdout.strip().splitlines()[-1])
+        print(f"  {layout:<12} built in {build_s:7.1f} s   {m['collections']:>6} collections   "
+              f"disk {disk_bytes(path) / 2**20:8.1f} MB")
+        print(f"  {'':<12} start up {m['startup_ms']:8.1f} ms   rss {m['rss_mb']:7.1f} MB   "
+              f"open fds {m['open_fds']}")
+        print(f"  {'':<12} cold     {percentiles(m['cold'])}")
+        print(f"  {'':<12} warm     {percentiles(m['warm'])}")
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--projects", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--layout", nargs="+", choices=[PER_PROJECT, SHARDED], default=[PER_PROJECT, SHARDED])
+    parser.add_argument("--shards", type=int, default=64)
+    parser.add_argument("--chunks", type=int, default=5, help="chunks per project")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--measure", metavar="PATH", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.layout[0], args.shards, args.projects[0], args.queries)))
+        return
+
+    for n in args.projects:
+        print(f"\n{n} projects, {args.chunks} chunks each")
+        for layout in args.layout:
+            run(layout, args.shards, n, args.chunks, args.queries)
+
+
+if __name__ == "__main__":
+    main()
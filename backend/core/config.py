@@ -32,8 +32,90 @@ class Settings:
     CHROMA_DIR: where the AI memory (ChromaDB) will save files
     MODEL_PROVIDER: which AI service to use (e.g., OpenAI or Gemini)
     MODEL_NAME: name of the model (empty for now since it's a stub)
+    EMBEDDING_CACHE_DIR: where cached embedding vectors are saved (empty disables the cache);
+        each worker process claims its own worker-{n} directory in it
+    EMBEDDING_CACHE_MAX_ENTRIES: how many vectors the embedding cache keeps (LRU eviction)
+    RAG_MAX_WORKERS: size of the thread pool running Chroma / embedding calls off the event loop
+    CACHE_DISTRIBUTED_LOCK: also coalesce context cache misses across worker processes (Redis lock)
+    CACHE_LOCK_TIMEOUT: seconds a Redis cache-fill lock is held / waited for
+    CONTEXT_MODE: "ranked" (semantic top-k within a token budget) or "full" (whole task list)
+    CONTEXT_TOKEN_BUDGET: max estimated tokens of the enrichment prompt context
+    CONTEXT_TOP_K: how many retrieved chunks are candidates for the context
+    LLM_MAX_CONNECTIONS: size of the pooled (HTTP/2 keep-alive) connections to OpenRouter
+    LLM_MAX_RETRIES: retries of an OpenRouter call on 429 / 5xx / timeouts before falling back
+    LLM_CACHE_TTL: seconds an enrichment response stays in the exact-match cache (0 disables it)
+    LLM_CACHE_SIMILARITY: reuse the enrichment of a prior task whose title + user description have
+        a cosine similarity of at least this value with the new ones (0 disables the near-duplicate tier)
+    ENRICH_MAX_PER_MODEL: enrichment jobs running at the same time per model provider (and process),
+        each model provider has that many background workers
+    ENRICH_JOB_TTL: seconds a job (and its idempotency key) is kept in Redis
+    ENRICH_JOB_LEASE: seconds without a heartbeat after which the jobs taken by a worker process
+        are put back in the queue
+    HANDBOOK_CACHE_DIR: where generated handbooks (markdown + PDF) are cached by content fingerprint
+    HANDBOOK_CACHE_MAX_BYTES: size of the handbook cache directory before the oldest files are evicted
+    HANDBOOK_RENDER_WORKERS: processes of the WeasyPrint rendering pool
+    HANDBOOK_RENDER_MAX_CONCURRENCY: handbook PDFs rendered at the same time (others wait their turn)
+    HANDBOOK_SINGLE_PASS_TOKENS: largest handbook prompt sent as is; bigger projects use map-reduce
+    HANDBOOK_PARTITION_TOKENS: estimated tokens of tasks summarized per map call
+    HANDBOOK_MAP_CONCURRENCY: map calls running at the same time
+    SUPABASE_PAGE_SIZE: rows per page of the paginated Supabase loaders
+    CHUNK_MODE: "words" (max 220 words per chunk) or "tokens" (chunks packed up to EMBED_MAX_TOKENS
+        tokens of the embedding model tokenizer); changing it re-chunks texts on their next indexing
+    EMBED_MAX_TOKENS: input limit of the embedding model (256 for all-MiniLM-L6-v2)
+    CHUNK_OVERLAP_TOKENS: tokens shared by consecutive chunks in "tokens" mode
+    INDEX_CHUNK_WORKERS: processes chunking / hashing the documents of a batch index (0 = in process)
+    RETRIEVAL_MODE: "vector" (Chroma similarity only) or "hybrid" (fused with an in-process BM25 index
+        of the project chunks, by reciprocal rank fusion)
+    RRF_K: reciprocal rank fusion constant, higher values flatten the weight of the top ranks
+    LEXICAL_INDEX_MAX_PROJECTS: BM25 indexes of hybrid retrieval kept per process (LRU eviction, 0 disables)
+    LOCAL_CACHE_TTL: seconds project / task context stays in the in-process tier in front of Redis
+        (0 disables the tier); writes invalidate it through Redis pub/sub
+    LOCAL_CACHE_MAX_ENTRIES: entries of the in-process tier (LRU eviction)
+    LOCAL_CACHE_MAX_BYTES: size of the in-process tier (LRU eviction)
+    COLLECTION_CACHE_SIZE: Chroma collection handles kept per process (LRU eviction, 0 disables)
+    COLLECTION_PREWARM: collections of the most recently active projects opened at start up (0 disables)
+    VECTOR_LAYOUT: "per_project" (one Chroma collection per project) or "sharded" (VECTOR_SHARDS shared
+        collections filtered by projectId); switch with python -m backend.rag.migrate_layout
+    VECTOR_SHARDS: shard collections of the "sharded" layout (changing it needs a migration too)
     """
     CHROMA_DIR: str = os.getenv("CHROMA_DIR", ".chroma")
+    EMBEDDING_CACHE_DIR: str = os.getenv("EMBEDDING_CACHE_DIR", ".embedding_cache")
+    EMBEDDING_CACHE_MAX_ENTRIES: int = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "50000"))
+    RAG_MAX_WORKERS: int = int(os.getenv("RAG_MAX_WORKERS", "4"))
+    CACHE_DISTRIBUTED_LOCK: bool = os.getenv("CACHE_DISTRIBUTED_LOCK", "false").lower() in ("1", "true", "yes")
+    CACHE_LOCK_TIMEOUT: float = float(os.getenv("CACHE_LOCK_TIMEOUT", "10"))
+    CONTEXT_MODE: str = os.getenv("CONTEXT_MODE", "ranked")
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+    CONTEXT_TOP_K: int = int(os.getenv("CONTEXT_TOP_K", "12"))
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "3"))
+    LLM_CACHE_TTL: int = int(os.getenv("LLM_CACHE_TTL", "86400"))
+    LLM_CACHE_SIMILARITY: float = float(os.getenv("LLM_CACHE_SIMILARITY", "0"))
+    ENRICH_MAX_PER_MODEL: int = int(os.getenv("ENRICH_MAX_PER_MODEL", "2"))
+    ENRICH_JOB_TTL: int = int(os.getenv("ENRICH_JOB_TTL", "86400"))
+    ENRICH_JOB_LEASE: float = float(os.getenv("ENRICH_JOB_LEASE", "60"))
+    HANDBOOK_CACHE_DIR: str = os.getenv("HANDBOOK_CACHE_DIR", ".handbook_cache")
+    HANDBOOK_CACHE_MAX_BYTES: int = int(os.getenv("HANDBOOK_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+    HANDBOOK_RENDER_WORKERS: int = int(os.getenv("HANDBOOK_RENDER_WORKERS", "2"))
+    HANDBOOK_RENDER_MAX_CONCURRENCY: int = int(os.getenv("HANDBOOK_RENDER_MAX_CONCURRENCY", "2"))
+    HANDBOOK_SINGLE_PASS_TOKENS: int = int(os.getenv("HANDBOOK_SINGLE_PASS_TOKENS", "8000"))
+    HANDBOOK_PARTITION_TOKENS: int = int(os.getenv("HANDBOOK_PARTITION_TOKENS", "6000"))
+    HANDBOOK_MAP_CONCURRENCY: int = int(os.getenv("HANDBOOK_MAP_CONCURRENCY", "4"))
+    SUPABASE_PAGE_SIZE: int = int(os.getenv("SUPABASE_PAGE_SIZE", "500"))
+    CHUNK_MODE: str = os.getenv("CHUNK_MODE", "words")
+    EMBED_MAX_TOKENS: int = int(os.getenv("EMBED_MAX_TOKENS", "256"))
+    CHUNK_OVERLAP_TOKENS: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", "48"))
+    INDEX_CHUNK_WORKERS: int = int(os.getenv("INDEX_CHUNK_WORKERS", "0"))
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "vector")
+    RRF_K: int = int(os.getenv("RRF_K", "60"))
+    LEXICAL_INDEX_MAX_PROJECTS: int = int(os.getenv("LEXICAL_INDEX_MAX_PROJECTS", "64"))
+    LOCAL_CACHE_TTL: float = float(os.getenv("LOCAL_CACHE_TTL", "30"))
+    LOCAL_CACHE_MAX_ENTRIES: int = int(os.getenv("LOCAL_CACHE_MAX_ENTRIES", "1024"))
+    LOCAL_CACHE_MAX_BYTES: int = int(os.getenv("LOCAL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    COLLECTION_CACHE_SIZE: int = int(os.getenv("COLLECTION_CACHE_SIZE", "256"))
+    COLLECTION_PREWARM: int = int(os.getenv("COLLECTION_PREWARM", "32"))
+    VECTOR_LAYOUT: str = os.getenv("VECTOR_LAYOUT", "per_project")
+    VECTOR_SHARDS: int = int(os.getenv("VECTOR_SHARDS", "64"))
     
 
 
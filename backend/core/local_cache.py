@@ -0,0 +1,233 @@
+"""
+Process-local cache tier in front of Redis.
+
+Context texts read by a worker are kept in memory for a few seconds, so
+back-to-back enrichments of the same project skip the Redis round trips.
+Writers publish the keys they change on a Redis pub/sub channel; every worker
+process listens and drops them from its local tier. If the subscription is
+lost, the whole local tier is cleared (invalidations may have been missed),
+and the TTL bounds staleness in any case.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from redis import asyncio as aioredis
+
+from backend.core.config import get_redis_client, get_settings
+
+
+settings = get_settings()
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+
+class LocalCache:
+    """
+    Bounded LRU of strings with a TTL and a byte budget (UTF-8 size of key + value).
+
+    `epoch` changes on every invalidation: a value read from Redis before an
+    invalidation is refused by `put(..., epoch=...)`, so a reader racing a
+    writer cannot keep the old value around until the TTL.
+    Hits and misses of the Redis tier behind it are counted too (`record_remote`).
+    """
+
+    def __init__(
+            self,
+            max_entries: int = 1024,
+            max_bytes: int = 64 * 1024 * 1024,
+            ttl: float = 30.0,
+            clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self.bytes = 0
+        self.epoch = 0
+        self._counts: Dict[str, int] = {
+            "hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0,
+            "remote_hits": 0, "remote_misses": 0,
+        }
+
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+
+    def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            self._counts["misses"] += 1
+            return None
+        value, expires_at, _ = entry
+        if expires_at <= self._clock():
+            self._drop(key)
+            self._counts["expired"] += 1
+            self._counts["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        self._counts["hits"] += 1
+        return value
+
+
+    def put(self, key: str, value: str, epoch: Optional[int] = None) -> bool:
+        """Store a value; refused when an invalidation happened since `epoch` was read."""
+        if not self.enabled or value is None or (epoch is not None and epoch != self.epoch):
+            return False
+        size = len(key.encode("utf-8")) + len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return False
+        self._drop(key)
+        self._entries[key] = (value, self._clock() + self.ttl, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self._counts["evictions"] += 1
+        return True
+
+
+    def _drop(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= entry[2]
+
+
+    def invalidate(self, *keys: str) -> None:
+        self.epoch += 1
+        self._counts["invalidations"] += 1
+        for key in keys:
+            self._drop(key)
+
+
+    def clear(self) -> None:
+        self.epoch += 1
+        self._entries.clear()
+        self.bytes = 0
+
+
+    def record_remote(self, hit: bool) -> None:
+        """Count a lookup of the Redis tier (after a local miss)."""
+        self._counts["remote_hits" if hit else "remote_misses"] += 1
+
+
+    def stats(self) -> Dict[str, object]:
+        c = dict(self._counts)
+
+        def rate(hits: int, misses: int):
+            return round(hits / (hits + misses), 3) if hits + misses else None
+
+        return {
+            "local": {
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "hits": c["hits"],
+                "misses": c["misses"],
+                "hit_rate": rate(c["hits"], c["misses"]),
+                "evictions": c["evictions"],
+                "expired": c["expired"],
+                "invalidations": c["invalidations"],
+            },
+            "redis": {
+                "hits": c["remote_hits"],
+                "misses": c["remote_misses"],
+                "hit_rate": rate(c["remote_hits"], c["remote_misses"]),
+            },
+        }
+
+
+class CacheInvalidation:
+    """Publishes and receives the invalidations of a LocalCache over Redis pub/sub."""
+
+    def __init__(
+            self,
+            cache: LocalCache,
+            redis_factory: Callable[[], Awaitable[aioredis.Redis]],
+            channel: str = INVALIDATION_CHANNEL,
+    ):
+        self.cache = cache
+        self._redis_factory = redis_factory
+        self.channel = channel
+        self._task: Optional[asyncio.Task] = None
+        self.received = 0
+
+
+    async def publish(self, redis: aioredis.Redis, *keys: str) -> None:
+        """Drop the keys here right away, then tell the other processes."""
+        keys = tuple(k for k in keys if k)
+        if not keys:
+            return
+        self.cache.invalidate(*keys)
+        try:
+            await redis.publish(self.channel, json.dumps(keys))
+        except Exception as e:
+            # the other processes fall back on the TTL
+            print(f'Cache invalidation publish failed for {keys}: {e}')
+
+
+    def handle(self, data: str) -> None:
+        try:
+            keys = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        self.received += 1
+        self.cache.invalidate(*keys)
+
+
+    async def _listen(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                redis = await self._redis_factory()
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(self.channel)
+                while True:
+                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=5.0)
+                    if message is not None and message.get("type") == "message":
+                        self.handle(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f'Cache invalidation listener failed: {e}')
+                # invalidations may have been missed while disconnected
+                self.cache.clear()
+                await asyncio.sleep(1)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+
+    def start(self) -> None:
+        """Start listening (called on app start up)."""
+        if self._task is None and self.cache.enabled:
+            self._task = asyncio.create_task(self._listen())
+
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+# project / task context texts of the enrichment prompts
+context_cache = LocalCache(
+    max_entries=settings.LOCAL_CACHE_MAX_ENTRIES,
+    max_bytes=settings.LOCAL_CACHE_MAX_BYTES,
+    ttl=settings.LOCAL_CACHE_TTL,
+)
+context_invalidation = CacheInvalidation(context_cache, get_redis_client)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from redis import asyncio as aioredis
+from redis.exceptions import LockError
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent loads of the same key inside one process.
+
+    The first caller for a key runs the loader, every caller arriving while it is
+    in flight awaits the same result instead of hitting Chroma again.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            # the load runs in its own task: it belongs to no caller
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self.leaders += 1
+            task.add_done_callback(lambda t: self._release(key, t))
+        # shield: a cancelled caller (the leader included) only cancels itself
+        return await asyncio.shield(task)
+
+
+    def _release(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark as retrieved when every caller went away
+
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._inflight), "leaders": self.leaders, "coalesced": self.coalesced}
+
+
+async def load_with_redis_lock(
+    redis: aioredis.Redis,
+    key: str,
+    read_cache: Callable[[], Awaitable[Optional[Any]]],
+    load: Callable[[], Awaitable[Any]],
+    timeout: float = 10.0,
+) -> Any:
+    """
+    Coalesce a cache miss across worker processes with a Redis lock.
+
+    The lock holder loads and fills the cache; the others wait for the lock,
+    then find the value in the cache. If the lock cannot be taken in time we
+    load anyway rather than fail the request.
+    """
+    lock = redis.lock(f"lock:{key}", timeout=timeout, blocking_timeout=timeout)
+    try:
+        acquired = await lock.acquire()
+    except LockError:
+        acquired = False
+
+    try:
+        if acquired:
+            cached = await read_cache()
+            if cached:
+                return cached
+        return await load()
+    finally:
+        if acquired:
+            try:
+                await lock.release()
+            except LockError:
+                # lock expired while loading, someone else may hold it now
+                pass
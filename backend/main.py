@@ -4,6 +4,11 @@ from contextlib import asynccontextmanager
 
 from backend.api.routes import router as api_router
 from backend.core.config import get_redis_client, get_supabase_client
+from backend.rag.async_rag import AsyncRAGService
+from backend.rag.chunking import shutdown_chunk_pool
+from backend.model.model import close_http_client, handbook_renderer, prewarm_collections
+from backend.model.enrichment_queue import enrichment_queue
+from backend.core.local_cache import context_invalidation
 
 
 
@@ -12,12 +17,21 @@ async def lifespan(app: FastAPI):
     # on start up
     app.state.supabase = await get_supabase_client()
     app.state.redis = await get_redis_client()
-
+    enrichment_queue.start()
+    context_invalidation.start()
+    await prewarm_collections()
+    handbook_renderer.warm_up()
 
     yield
 
     # on shutdown
+    await enrichment_queue.stop()
+    await context_invalidation.stop()
     await app.state.redis.close()
+    AsyncRAGService.shutdown()
+    shutdown_chunk_pool()
+    await close_http_client()
+    handbook_renderer.shutdown()
     
 
 app = FastAPI(lifespan=lifespan)
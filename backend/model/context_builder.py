@@ -0,0 +1,147 @@
+from __future__ import annotations
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from backend.rag.chunking import normalize_text
+
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENT_SPLIT = re.compile(r"(?<=[.!?\n])\s+")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Fast local token estimate: words and punctuation marks.
+    Close to what BPE / WordPiece tokenizers produce for English and code-like text,
+    without loading a tokenizer.
+    """
+    return len(_TOKEN_RE.findall(text or ""))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly `max_tokens`, on a sentence boundary when possible."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    kept: List[str] = []
+    used = 0
+    for sent in _SENT_SPLIT.split(text):
+        t = estimate_tokens(sent)
+        if used + t > max_tokens:
+            if not kept:
+                # a single very long sentence: cut by words
+                words = sent.split()
+                kept.append(" ".join(words[:max(1, int(max_tokens * 0.75))]))
+            break
+        kept.append(sent)
+        used += t
+    return " ".join(kept)
+
+
+def dedupe_chunks(chunks: List[str]) -> Tuple[List[str], int]:
+    """
+    Drop repeated content across chunks.
+
+    Chunks of the same task overlap by whole sentences (see chunk_text), so every
+    sentence already seen is removed and chunks left empty are skipped.
+    Returns (chunks, number of chunks dropped entirely).
+    """
+    seen = set()
+    out: List[str] = []
+    dropped = 0
+    for chunk in chunks:
+        fresh = []
+        for sent in _SENT_SPLIT.split(chunk or ""):
+            key = normalize_text(sent).lower()
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            fresh.append(sent.strip())
+        if fresh:
+            out.append(" ".join(fresh))
+        else:
+            dropped += 1
+    return out, dropped
+
+
+@dataclass
+class ContextStats:
+    budget: int
+    project_tokens: int = 0
+    tasks_tokens: int = 0
+    total_tokens: int = 0
+    chunks_considered: int = 0
+    chunks_used: int = 0
+    chunks_deduped: int = 0
+    truncated: bool = False
+
+
+def assemble_context(
+    project_text: str,
+    task_chunks: List[str],
+    new_task_title: str,
+    new_task_user_description: str,
+    budget: int,
+    project_share: float = 0.4,
+) -> Tuple[str, ContextStats]:
+    """
+    Build the enrichment prompt within a token budget.
+
+    `task_chunks` must already be ranked by relevance: they are deduplicated and
+    added in order until the budget is used. The new task is always included, the
+    project overview gets at most `project_share` of what is left.
+    """
+    stats = ContextStats(budget=budget, chunks_considered=len(task_chunks))
+
+    new_task = f"NEW TASK:\ntask_Title: {new_task_title}\nDescription: {new_task_user_description}\n"
+    headers = estimate_tokens("PROJECT OVERVIEW:\nPREVIOUS TASKS:\n")
+    remaining = max(0, budget - headers - estimate_tokens(new_task))
+
+    project_limit = int(remaining * project_share)
+    project_part = truncate_to_tokens(project_text or "", project_limit)
+    if project_part != (project_text or ""):
+        stats.truncated = True
+    stats.project_tokens = estimate_tokens(project_part)
+    remaining -= stats.project_tokens
+
+    chunks, stats.chunks_deduped = dedupe_chunks(task_chunks)
+    used: List[str] = []
+    for chunk in chunks:
+        t = estimate_tokens(chunk)
+        if t > remaining:
+            stats.truncated = True
+            break
+        used.append(chunk)
+        remaining -= t
+        stats.tasks_tokens += t
+    stats.chunks_used = len(used)
+
+    previous_tasks_text = "\n\n".join(used)
+    context = (
+        f"PROJECT OVERVIEW:\n{project_part}\n\n"
+        f"PREVIOUS TASKS:\n{previous_tasks_text}\n\n"
+        f"{new_task}"
+    )
+    stats.total_tokens = estimate_tokens(context)
+    record_context_stats(stats)
+    return context, stats
+
+
+_metrics_lock = threading.Lock()
+_metrics: Dict[str, int] = {"prompts": 0, "tokens_total": 0, "tokens_max": 0, "truncated": 0}
+
+
+def record_context_stats(stats: ContextStats) -> None:
+    with _metrics_lock:
+        _metrics["prompts"] += 1
+        _metrics["tokens_total"] += stats.total_tokens
+        _metrics["tokens_max"] = max(_metrics["tokens_max"], stats.total_tokens)
+        _metrics["truncated"] += int(stats.truncated)
+
+
+def context_metrics() -> Dict[str, object]:
+    with _metrics_lock:
+        m = dict(_metrics)
+    m["tokens_avg"] = round(m["tokens_total"] / m["prompts"], 1) if m["prompts"] else None
+    return m
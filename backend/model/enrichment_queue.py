@@ -0,0 +1,384 @@
+"""
+Asynchronous enrichment jobs, queued in Redis.
+
+  enrich:queue:{model}         job ids waiting for that model provider (LPUSH, taken from the right)
+  enrich:processing:{worker}   job ids taken by the workers of one process (BLMOVE)
+  enrich:alive:{worker}        heartbeat of that process, expires after ENRICH_JOB_LEASE
+  enrich:workers               set of the worker process ids
+  enrich:job:{id}              hash: status, request, result, error, attempts, timestamps
+  enrich:dedup:{sha256}        job id of the last job for (projectId, title, description)
+
+The route enqueues and answers with the job id right away. Each model provider
+has its own queue and ENRICH_MAX_PER_MODEL workers per process, started with
+the app: a worker holds one of its model's slots while it waits for a job, so
+a busy model never holds back the jobs of another one, and each queue is run
+in order. The workers run `enrich_task_details` and store the result on the
+job hash for polling.
+
+A job stays in the processing list of its process until it is finished. If
+the process dies, its heartbeat expires and the other processes put its jobs
+back in the queue (failed after MAX_ATTEMPTS losses). On shutdown, running
+jobs are marked failed and jobs not started yet go back to the queue, so a
+job never stays "queued" or "running" forever.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+import socket
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from redis import asyncio as aioredis
+
+from backend.core.config import get_redis_client, get_settings
+from backend.rag.chunking import normalize_text, sha256_of
+from backend.types.types import IndexTaskRequest
+from backend.model.model import enrich_task_details, model_providers
+
+
+settings = get_settings()
+
+QUEUE_PREFIX = "enrich:queue:"
+WORKERS_KEY = "enrich:workers"
+JOB_PREFIX = "enrich:job:"
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+MAX_ATTEMPTS = 3
+
+# Create the job unless the dedup key points to a live (not failed) job.
+# One script: two concurrent enqueues cannot both take over a failed job.
+_ENQUEUE = """
+local existing = redis.call('GET', KEYS[1])
+if existing then
+    local status = redis.call('HGET', ARGV[4] .. existing, 'status')
+    if status and status ~= ARGV[5] then
+        return {existing, 1}
+    end
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('HSET', KEYS[2], 'status', ARGV[6], 'request', ARGV[3], 'dedup', KEYS[1],
+           'queue', KEYS[3], 'attempts', 0, 'created_at', ARGV[7], 'updated_at', ARGV[7])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('LPUSH', KEYS[3], ARGV[1])
+return {ARGV[1], 0}
+"""
+
+# Put a taken job back at the front of its queue, if it is still in the processing list.
+_REQUEUE = """
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 0 then
+    return 0
+end
+redis.call('RPUSH', KEYS[2], ARGV[1])
+return 1
+"""
+
+# Recover the jobs of a worker process whose heartbeat expired (back to the queue of their model).
+_RECOVER = """
+if redis.call('EXISTS', KEYS[3]) == 1 then
+    return 0
+end
+local requeued = 0
+for _, id in ipairs(redis.call('LRANGE', KEYS[1], 0, -1)) do
+    local key = ARGV[2] .. id
+    if redis.call('EXISTS', key) == 1 then
+        local attempts = redis.call('HINCRBY', key, 'attempts', 1)
+        local queue = redis.call('HGET', key, 'queue')
+        if attempts >= tonumber(ARGV[3]) or not queue then
+            redis.call('HSET', key, 'status', 'failed', 'error', 'enrichment worker lost', 'updated_at', ARGV[4])
+        else
+            redis.call('HSET', key, 'status', 'queued', 'updated_at', ARGV[4])
+            redis.call('RPUSH', queue, id)
+            requeued = requeued + 1
+        end
+    end
+end
+redis.call('DEL', KEYS[1])
+redis.call('SREM', KEYS[2], ARGV[1])
+return requeued
+"""
+
+
+def queue_key(selected_model: int) -> str:
+    return f"{QUEUE_PREFIX}{selected_model}"
+
+
+def job_key(job_id: str) -> str:
+    return f"{JOB_PREFIX}{job_id}"
+
+
+def processing_key(worker_id: str) -> str:
+    return f"enrich:processing:{worker_id}"
+
+
+def alive_key(worker_id: str) -> str:
+    return f"enrich:alive:{worker_id}"
+
+
+def dedup_key(req: IndexTaskRequest) -> str:
+    """Same project, title and description (ignoring case and spacing) -> same job."""
+    fingerprint = "\x1f".join([
+        str(req.projectId),
+        normalize_text(req.task_title).lower(),
+        normalize_text(req.user_description).lower(),
+    ])
+    return f"enrich:dedup:{sha256_of(fingerprint)}"
+
+
+class EnrichmentQueue:
+
+    def __init__(
+        self,
+        enrich: Callable[[IndexTaskRequest], Awaitable[dict]] = enrich_task_details,
+        job_ttl: int = settings.ENRICH_JOB_TTL,
+        max_per_model: int = settings.ENRICH_MAX_PER_MODEL,
+        lease: float = settings.ENRICH_JOB_LEASE,
+        models: Optional[List[int]] = None,
+    ) -> None:
+        self._enrich = enrich
+        self.job_ttl = job_ttl
+        self.max_per_model = max_per_model
+        self.lease = lease
+        self.models = list(model_providers) if models is None else list(models)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._redis_client: Optional[aioredis.Redis] = None
+        self._workers: List[asyncio.Task] = []
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._model_slots: Dict[int, asyncio.Semaphore] = {}
+        self._running: Dict[int, int] = {}
+        self._counts: Dict[str, int] = {"recovered": 0, "cancelled": 0}
+
+
+    async def ensure_redis_client(self) -> aioredis.Redis:
+        if self._redis_client is None:
+            self._redis_client = await get_redis_client()
+        return self._redis_client
+
+
+    @property
+    def processing_key(self) -> str:
+        return processing_key(self.worker_id)
+
+
+    async def enqueue(self, req: IndexTaskRequest) -> Tuple[str, bool]:
+        """
+        Queue an enrichment, returns (job id, deduplicated).
+        A request identical to a queued, running or finished job returns that job instead.
+        """
+        if req.selected_model not in self.models:
+            # no worker takes jobs of an unknown model, it would stay queued forever
+            raise ValueError(f"Unknown model {req.selected_model}")
+        redis = await self.ensure_redis_client()
+        job_id = uuid.uuid4().hex
+        script = redis.register_script(_ENQUEUE)
+        found_id, deduplicated = await script(
+            keys=[dedup_key(req), job_key(job_id), queue_key(req.selected_model)],
+            args=[job_id, self.job_ttl, req.model_dump_json(), JOB_PREFIX, STATUS_FAILED,
+                  STATUS_QUEUED, str(time.time())],
+        )
+        return found_id, bool(int(deduplicated))
+
+
+    async def get_job(self, job_id: str) -> Optional[dict]:
+        redis = await self.ensure_redis_client()
+        job = await redis.hgetall(job_key(job_id))
+        if not job:
+            return None
+        out = {
+            "jobId": job_id,
+            "status": job.get("status"),
+            "created_at": float(job["created_at"]) if job.get("created_at") else None,
+            "updated_at": float(job["updated_at"]) if job.get("updated_at") else None,
+        }
+        if job.get("result"):
+            out["result"] = json.loads(job["result"])
+        if job.get("error"):
+            out["error"] = job["error"]
+        return out
+
+
+    def _slots(self, selected_model: int) -> asyncio.Semaphore:
+        if selected_model not in self._model_slots:
+            self._model_slots[selected_model] = asyncio.Semaphore(self.max_per_model)
+        return self._model_slots[selected_model]
+
+
+    async def _fail(self, job_id: str, error: str) -> None:
+        redis = await self.ensure_redis_client()
+        pipe = redis.pipeline(transaction=True)
+        pipe.hset(job_key(job_id), mapping={
+            "status": STATUS_FAILED, "error": error, "updated_at": str(time.time())
+        })
+        pipe.expire(job_key(job_id), self.job_ttl)
+        await pipe.execute()
+
+
+    async def _requeue(self, job_id: str, selected_model: int) -> bool:
+        """Move a job of this process back to the front of its queue (no-op if it already left the processing list)."""
+        redis = await self.ensure_redis_client()
+        script = redis.register_script(_REQUEUE)
+        return bool(await script(keys=[self.processing_key, queue_key(selected_model)], args=[job_id]))
+
+
+    async def _load(self, job_id: str) -> Optional[IndexTaskRequest]:
+        redis = await self.ensure_redis_client()
+        raw = await redis.hget(job_key(job_id), "request")
+        if raw is None:
+            # expired before a worker got to it
+            await redis.lrem(self.processing_key, 1, job_id)
+            return None
+        return IndexTaskRequest.model_validate_json(raw)
+
+
+    async def run_job(self, job_id: str, req: Optional[IndexTaskRequest] = None) -> None:
+        """Run a job now, once a slot of its model is free."""
+        if req is None:
+            req = await self._load(job_id)
+            if req is None:
+                return
+        async with self._slots(req.selected_model):
+            await self._execute(job_id, req)
+
+
+    async def _execute(self, job_id: str, req: IndexTaskRequest) -> None:
+        """Run a job, the caller holds a slot of its model."""
+        redis = await self.ensure_redis_client()
+        try:
+            self._running[req.selected_model] = self._running.get(req.selected_model, 0) + 1
+            try:
+                await redis.hset(job_key(job_id), mapping={"status": STATUS_RUNNING, "updated_at": str(time.time())})
+                result = await self._enrich(req)
+            except Exception as e:
+                print(f'Enrichment job {job_id} failed: {e}')
+                await self._fail(job_id, str(e))
+                return
+            finally:
+                self._running[req.selected_model] -= 1
+
+            await redis.hset(job_key(job_id), mapping={
+                "status": STATUS_DONE, "result": json.dumps(result), "updated_at": str(time.time())
+            })
+        except asyncio.CancelledError:
+            # shutting down: fail the job so the same task can be submitted again
+            self._counts["cancelled"] += 1
+            await self._fail(job_id, "cancelled: enrichment worker shut down")
+            raise
+        finally:
+            await redis.lrem(self.processing_key, 1, job_id)
+
+
+    async def _handle(self, job_id: str, selected_model: int) -> None:
+        """Run a job taken from the queue of `selected_model`, the caller holds a slot."""
+        try:
+            req = await self._load(job_id)
+        except asyncio.CancelledError:
+            # not started yet: the next worker takes it
+            await self._requeue(job_id, selected_model)
+            raise
+        if req is not None:
+            await self._execute(job_id, req)
+
+
+    async def _worker(self, selected_model: int, n: int) -> None:
+        """Take the jobs of one model in order, only while holding one of its slots."""
+        redis = await self.ensure_redis_client()
+        name = f"{selected_model}/{n}"
+        while True:
+            async with self._slots(selected_model):
+                try:
+                    job_id = await redis.blmove(queue_key(selected_model), self.processing_key, 5, "RIGHT", "LEFT")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f'Enrichment worker {name}: queue read failed: {e}')
+                    await asyncio.sleep(1)
+                    continue
+                if job_id is None:
+                    continue
+                try:
+                    await self._handle(job_id, selected_model)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f'Enrichment worker {name}: job {job_id} crashed: {e}')
+
+
+    async def recover_lost_jobs(self) -> int:
+        """Requeue the jobs of worker processes whose heartbeat expired. Returns how many."""
+        redis = await self.ensure_redis_client()
+        script = redis.register_script(_RECOVER)
+        requeued = 0
+        for worker_id in await redis.smembers(WORKERS_KEY):
+            if worker_id == self.worker_id:
+                continue
+            requeued += int(await script(
+                keys=[processing_key(worker_id), WORKERS_KEY, alive_key(worker_id)],
+                args=[worker_id, JOB_PREFIX, MAX_ATTEMPTS, str(time.time())],
+            ))
+        self._counts["recovered"] += requeued
+        return requeued
+
+
+    async def _beat(self) -> None:
+        redis = await self.ensure_redis_client()
+        while True:
+            try:
+                await redis.set(alive_key(self.worker_id), "1", ex=max(1, int(self.lease)))
+                await redis.sadd(WORKERS_KEY, self.worker_id)
+                await self.recover_lost_jobs()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f'Enrichment heartbeat failed: {e}')
+            await asyncio.sleep(self.lease / 3)
+
+
+    def start(self) -> None:
+        """Start the heartbeat and max_per_model workers per model (called on app start up)."""
+        if self._workers:
+            return
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._workers = [
+            asyncio.create_task(self._worker(model, n))
+            for model in self.models
+            for n in range(self.max_per_model)
+        ]
+
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+            self._heartbeat = None
+            try:
+                # anything left in our processing list goes back to the queue right away
+                redis = await self.ensure_redis_client()
+                await redis.delete(alive_key(self.worker_id))
+                script = redis.register_script(_RECOVER)
+                await script(
+                    keys=[self.processing_key, WORKERS_KEY, alive_key(self.worker_id)],
+                    args=[self.worker_id, JOB_PREFIX, MAX_ATTEMPTS, str(time.time())],
+                )
+            except Exception as e:
+                print(f'Enrichment queue shutdown cleanup failed: {e}')
+
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "workers": len(self._workers),
+            "max_per_model": self.max_per_model,
+            "running_per_model": dict(self._running),
+            **self._counts,
+        }
+
+
+enrichment_queue = EnrichmentQueue()
@@ -0,0 +1,163 @@
+from __future__ import annotations
+import json
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backend.model.context_builder import estimate_tokens
+
+
+TASK_TABLE_HEADING = "## 4. Task Breakdown and Status"
+STATUS_ORDER = ["todo", "in_progress", "in_review", "done"]
+# columns of the task table and the status counts, kept for every task
+TABLE_COLUMNS = ("id", "title", "status", "story_points")
+
+_HEADING_RE = re.compile(r"^##\s+(\d+)\.", re.MULTILINE)
+_TABLE_LINE_RE = re.compile(r"^\s*\|.*\|\s*$")
+
+
+def task_context(row: dict) -> Dict[str, object]:
+    """The fields of a task row the LLM gets to see."""
+    return {
+        "id": row.get("id"),
+        "title": row.get("title", ""),
+        "status": row.get("status", ""),
+        "story_points": row.get("story_points"),
+        "user_description": row.get("description") or "",
+        "ai_description": row.get("ai_description") or "",
+    }
+
+
+def _cell(value) -> str:
+    if value is None or value == "":
+        return "—"
+    return str(value).replace("|", "\\|").replace("\n", " ").strip()
+
+
+def render_task_table(task_rows: List[dict]) -> str:
+    """Section 4 task table, one row per task, built from the Supabase rows (no LLM)."""
+    lines = [
+        "| ID | Title | Status | Story Points |",
+        "|----|-------|--------|--------------|",
+    ]
+    for row in task_rows:
+        lines.append(
+            f"| {_cell(row.get('id'))} | {_cell(row.get('title'))} "
+            f"| {_cell(row.get('status'))} | {_cell(row.get('story_points'))} |"
+        )
+    return "\n".join(lines)
+
+
+def status_rank(status: Optional[str]) -> int:
+    """Position of a status in the workflow, unknown ones last."""
+    return STATUS_ORDER.index(status) if status in STATUS_ORDER else len(STATUS_ORDER)
+
+
+def status_counts(task_rows: List[dict]) -> Dict[str, Dict[str, int]]:
+    """{status: {"tasks": n, "story_points": sum}}, in workflow order."""
+    counts: Dict[str, Dict[str, int]] = {}
+    for row in task_rows:
+        c = counts.setdefault(row.get("status") or "unknown", {"tasks": 0, "story_points": 0})
+        c["tasks"] += 1
+        c["story_points"] += int(row.get("story_points") or 0)
+    return dict(sorted(counts.items(), key=lambda kv: status_rank(kv[0])))
+
+
+class TaskFold:
+    """
+    Folds task rows into the handbook inputs as they stream in, without keeping the rows.
+
+    Every task keeps its table columns (`table_rows`). The task contexts sent to
+    the LLM are kept while they fit one prompt (`single_pass_tokens`); past that,
+    the project takes the map-reduce path: contexts are grouped by status and a
+    group is handed to `on_partition` as soon as it reaches `partition_tokens`,
+    so the map calls start while later pages are still loading.
+    """
+
+    def __init__(
+            self,
+            single_pass_tokens: int,
+            partition_tokens: int,
+            on_partition: Callable[[List[dict]], None],
+    ):
+        self.single_pass_tokens = single_pass_tokens
+        self.partition_tokens = partition_tokens
+        self._on_partition = on_partition
+        self.table_rows: List[dict] = []
+        # None once the tasks no longer fit one prompt
+        self._kept: Optional[List[Tuple[dict, int]]] = []
+        self._kept_tokens = 0
+        self._groups: Dict[object, Tuple[List[dict], int]] = {}
+
+
+    @property
+    def single_pass(self) -> bool:
+        return self._kept is not None
+
+
+    @property
+    def contexts(self) -> List[dict]:
+        """Contexts of every task, on the single pass path."""
+        return [context for context, _ in self._kept or []]
+
+
+    def add(self, row: dict) -> None:
+        self.table_rows.append({k: row.get(k) for k in TABLE_COLUMNS})
+        context = task_context(row)
+        tokens = estimate_tokens(json.dumps(context, ensure_ascii=False))
+        if self._kept is None:
+            self._group(context, tokens)
+            return
+        self._kept.append((context, tokens))
+        self._kept_tokens += tokens
+        if self._kept_tokens > self.single_pass_tokens:
+            self.spill()
+
+
+    def spill(self) -> None:
+        """Switch to the map-reduce path, partitioning the contexts kept so far."""
+        kept, self._kept = self._kept or [], None
+        for context, tokens in kept:
+            self._group(context, tokens)
+
+
+    def _group(self, context: dict, tokens: int) -> None:
+        contexts, used = self._groups.get(context["status"], ([], 0))
+        if contexts and used + tokens > self.partition_tokens:
+            self._on_partition(contexts)
+            contexts, used = [], 0
+        contexts.append(context)
+        self._groups[context["status"]] = (contexts, used + tokens)
+
+
+    def finish(self) -> None:
+        """Hand over the last, partial, partition of every status (map-reduce path)."""
+        for status in sorted(self._groups, key=status_rank):
+            contexts, _ = self._groups[status]
+            if contexts:
+                self._on_partition(contexts)
+        self._groups.clear()
+
+
+def _strip_tables(text: str) -> str:
+    return "\n".join(l for l in text.split("\n") if not _TABLE_LINE_RE.match(l))
+
+
+def insert_task_table(handbook: str, task_rows: List[dict]) -> str:
+    """
+    Put the deterministic task table into section 4 of the LLM handbook,
+    replacing any table the model wrote there. Creates the section when missing.
+    """
+    table = render_task_table(task_rows)
+    headings = [(int(m.group(1)), m.start()) for m in _HEADING_RE.finditer(handbook)]
+
+    section_4 = next((pos for num, pos in headings if num == 4), None)
+    if section_4 is not None:
+        end = next((pos for num, pos in headings if pos > section_4), len(handbook))
+        body = _strip_tables(handbook[section_4:end]).rstrip()
+        return f"{handbook[:section_4]}{body}\n\n{table}\n\n{handbook[end:]}".rstrip() + "\n"
+
+    after = next((pos for num, pos in headings if num > 4), None)
+    section = f"{TASK_TABLE_HEADING}\n\n{table}\n\n"
+    if after is None:
+        return f"{handbook.rstrip()}\n\n{section}"
+    return f"{handbook[:after]}{section}{handbook[after:]}"
@@ -0,0 +1,170 @@
+from __future__ import annotations
+import os
+import threading
+import time
+import uuid
+from typing import BinaryIO, Dict, List, Optional
+
+from backend.rag.chunking import sha256_of
+
+
+def handbook_fingerprint(project_row: dict, task_rows: List[dict], *parts: str) -> str:
+    """
+    Content address of a handbook: the project and task ids with their `updated_at`,
+    plus anything else the output depends on (model id, prompt / template digests).
+    Any edit, insert or delete of a task gives a new fingerprint.
+    """
+    tasks = sorted((str(r.get("id")), str(r.get("updated_at"))) for r in task_rows)
+    payload = "\n".join([
+        f"{project_row.get('id')}|{project_row.get('updated_at')}",
+        *(f"{tid}|{updated}" for tid, updated in tasks),
+        *parts,
+    ])
+    return sha256_of(payload)
+
+
+class HandbookCache:
+    """
+    Local disk cache of generated handbooks, one `{fingerprint}.md` and `{fingerprint}.pdf` per entry.
+
+    Reads touch the file mtime, so when the directory grows over `max_bytes` the
+    least recently used files are removed first. Temporary files not written to
+    for `tmp_max_age` seconds (left by a crashed or cancelled render) go too.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 200 * 1024 * 1024, tmp_max_age: float = 3600.0):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.tmp_max_age = tmp_max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.tmp_removed = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+
+
+    def _file(self, fingerprint: str, ext: str) -> str:
+        return os.path.join(self.path, f"{fingerprint}.{ext}")
+
+
+    def _read(self, fingerprint: str, ext: str) -> Optional[bytes]:
+        path = self._file(fingerprint, ext)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+
+    def temp_path(self, fingerprint: str, ext: str) -> str:
+        """Where to write a new entry before `commit` (never evicted, invisible to readers)."""
+        return f"{self._file(fingerprint, ext)}.{uuid.uuid4().hex}.tmp"
+
+
+    def commit(self, fingerprint: str, ext: str, tmp_path: str) -> None:
+        path = self._file(fingerprint, ext)
+        # atomic: concurrent readers never see a partial file
+        os.replace(tmp_path, path)
+        self._evict(keep=path)
+
+
+    def _write(self, fingerprint: str, ext: str, data: bytes) -> None:
+        tmp = self.temp_path(fingerprint, ext)
+        with open(tmp, "wb") as f:
+            f.write(data)
+        self.commit(fingerprint, ext, tmp)
+
+
+    def get_markdown(self, fingerprint: str) -> Optional[str]:
+        data = self._read(fingerprint, "md")
+        return data.decode("utf-8") if data is not None else None
+
+
+    def put_markdown(self, fingerprint: str, markdown_text: str) -> None:
+        self._write(fingerprint, "md", markdown_text.encode("utf-8"))
+
+
+    def open_pdf(self, fingerprint: str) -> Optional[BinaryIO]:
+        """
+        Open the cached PDF for streaming, or None on a miss.
+        The open handle stays readable even if the file gets evicted meanwhile.
+        """
+        path = self._file(fingerprint, "pdf")
+        try:
+            f = open(path, "rb")
+            os.utime(path)
+        except OSError:
+            f = None
+        with self._lock:
+            if f is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return f
+
+
+    def _entries(self, tmp: bool = False) -> List[os.DirEntry]:
+        try:
+            return [e for e in os.scandir(self.path) if e.is_file() and e.name.endswith(".tmp") == tmp]
+        except OSError:
+            return []
+
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        with self._lock:
+            self._remove_stale_tmp()
+            entries = []
+            for e in self._entries():
+                try:
+                    st = e.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, e.path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.evictions += 1
+
+
+    def _remove_stale_tmp(self) -> None:
+        # a render cancelled on the web side can keep writing its file in the
+        # worker after the cleanup ran: only files idle for a while are dropped
+        cutoff = time.time() - self.tmp_max_age
+        for e in self._entries(tmp=True):
+            try:
+                if e.stat().st_mtime < cutoff:
+                    os.remove(e.path)
+                    self.tmp_removed += 1
+            except OSError:
+                continue
+
+
+    def stats(self) -> Dict[str, object]:
+        sizes = []
+        for e in self._entries():
+            try:
+                sizes.append(e.stat().st_size)
+            except OSError:
+                continue
+        lookups = self.hits + self.misses
+        return {
+            "files": len(sizes),
+            "bytes": sum(sizes),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "tmp_removed": self.tmp_removed,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
@@ -0,0 +1,255 @@
+from __future__ import annotations
+import asyncio
+import json
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+# statuses worth retrying; 429 / 503 after the last retry mean "saturated" -> try the fallback model
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+SATURATED_STATUSES = {429, 503}
+
+
+class LLMError(RuntimeError):
+    """OpenRouter returned an error (after retries) or an unexpected payload."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, payload: Any = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.payload = payload
+
+
+@dataclass
+class LLMClientConfig:
+    """
+    Connection pool, timeout and retry settings of the shared OpenRouter client.
+
+    model_timeouts: read timeout (seconds) per model id, slow reasoning models get more
+    fallbacks: model id -> other model ids to try when it is saturated (429/503/timeouts)
+    """
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    keepalive_expiry: float = 30.0
+    http2: bool = True
+    connect_timeout: float = 5.0
+    default_timeout: float = 30.0
+    max_retries: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    retry_after_max: float = 30.0
+    model_timeouts: Dict[str, float] = field(default_factory=dict)
+    fallbacks: Dict[str, List[str]] = field(default_factory=dict)
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class LLMClient:
+    """
+    One place for every OpenRouter chat completion call.
+
+    - pooled HTTP/2 keep-alive connections with configurable limits
+    - jittered exponential retry on 429 / 5xx / timeouts, honoring Retry-After
+    - per-model read timeouts
+    - fallback to another model id when the requested one stays saturated
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        config: Optional[LLMClientConfig] = None,
+        http_client_factory: Optional[Callable[[], Awaitable[httpx.AsyncClient]]] = None,
+        url: str = OPENROUTER_URL,
+    ):
+        self.api_key = api_key
+        self.cfg = config or LLMClientConfig()
+        self.url = url
+        self._http_client_factory = http_client_factory or self.pooled_http_client
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.stats: Dict[str, int] = {"requests": 0, "retries": 0, "fallbacks": 0, "failures": 0}
+
+
+    async def pooled_http_client(self) -> httpx.AsyncClient:
+        """The shared connection pool (created on first use)."""
+        if self._http_client is None:
+            self._http_client = httpx.AsyncClient(
+                http2=self.cfg.http2 and _http2_available(),
+                limits=httpx.Limits(
+                    max_connections=self.cfg.max_connections,
+                    max_keepalive_connections=self.cfg.max_keepalive_connections,
+                    keepalive_expiry=self.cfg.keepalive_expiry,
+                ),
+                timeout=httpx.Timeout(self.cfg.default_timeout, connect=self.cfg.connect_timeout),
+            )
+        return self._http_client
+
+
+    async def aclose(self) -> None:
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+
+
+    def _timeout(self, model: str) -> httpx.Timeout:
+        read = self.cfg.model_timeouts.get(model, self.cfg.default_timeout)
+        return httpx.Timeout(read, connect=self.cfg.connect_timeout)
+
+
+    def _candidates(self, model: str) -> List[str]:
+        return [model] + [m for m in self.cfg.fallbacks.get(model, []) if m != model]
+
+
+    def _backoff(self, attempt: int, retry_after: Optional[str]) -> float:
+        """Delay before the next attempt: Retry-After if the server sent one, else full-jitter backoff."""
+        if retry_after:
+            try:
+                delay = float(retry_after)
+            except ValueError:
+                try:
+                    delay = parsedate_to_datetime(retry_after).timestamp() - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+            if delay is not None:
+                return min(max(delay, 0.0), self.cfg.retry_after_max)
+        ceiling = min(self.cfg.backoff_max, self.cfg.backoff_base * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+
+    async def chat(self, model: str, messages: List[Dict[str, str]], max_tokens: int, **extra: Any) -> Dict[str, Any]:
+        """
+        Run a chat completion and return the decoded OpenRouter response.
+        The model that answered is in the response's "model" field.
+        """
+        last_error: Optional[LLMError] = None
+        for i, model_id in enumerate(self._candidates(model)):
+            if i:
+                self.stats["fallbacks"] += 1
+                print(f'LLM model {model} saturated, falling back to {model_id}')
+            try:
+                return await self._chat_with_retry(model_id, messages, max_tokens, **extra)
+            except LLMError as e:
+                last_error = e
+                if e.status_code not in SATURATED_STATUSES and e.status_code is not None:
+                    break
+        self.stats["failures"] += 1
+        raise last_error
+
+
+    async def _chat_with_retry(self, model: str, messages, max_tokens: int, **extra: Any) -> Dict[str, Any]:
+        payload = {"model": model, "messages": messages, "max_tokens": max_tokens, **extra}
+        body = json.dumps(payload)
+
+        for attempt in range(self.cfg.max_retries + 1):
+            client = await self._http_client_factory()
+            self.stats["requests"] += 1
+            try:
+                response = await client.post(
+                    url=self.url,
+                    headers=self._headers(),
+                    content=body,
+                    timeout=self._timeout(model),
+                )
+            except (httpx.TimeoutException, httpx.TransportError) as e:
+                if attempt == self.cfg.max_retries:
+                    # treat a model that keeps timing out like a saturated one
+                    raise LLMError(f'Openrouter request failed: {e}', status_code=503) from e
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt, None))
+                continue
+
+            if response.status_code in RETRYABLE_STATUSES and attempt < self.cfg.max_retries:
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt, response.headers.get("Retry-After")))
+                continue
+
+            try:
+                data = response.json()
+            except ValueError:
+                data = {"raw": response.text}
+
+            if response.status_code != 200:
+                print(f'OpenRouter error: {data}')
+                raise LLMError(f'Openrouter API Error: {data}', status_code=response.status_code, payload=data)
+
+            if 'choices' not in data:
+                print('Unexpected Openrouter response')
+                raise LLMError('Unexpected Openrouter response', payload=data)
+
+            return data
+
+        raise LLMError('Openrouter retries exhausted')
+
+
+    @asynccontextmanager
+    async def stream_chat(self, model: str, messages: List[Dict[str, str]], max_tokens: int,
+                          **extra: Any) -> AsyncIterator[httpx.Response]:
+        """
+        Open a streaming (`stream: true`) completion and yield the response once it is accepted.
+        Retries / fallbacks only happen before the first byte, never mid-stream.
+        """
+        last_error: Optional[LLMError] = None
+        accepted = False
+        for i, model_id in enumerate(self._candidates(model)):
+            if i:
+                self.stats["fallbacks"] += 1
+                print(f'LLM model {model} saturated, falling back to {model_id}')
+            payload = json.dumps({
+                "model": model_id, "messages": messages, "max_tokens": max_tokens, "stream": True, **extra
+            })
+            for attempt in range(self.cfg.max_retries + 1):
+                client = await self._http_client_factory()
+                self.stats["requests"] += 1
+                try:
+                    async with client.stream(
+                        "POST",
+                        self.url,
+                        headers=self._headers(),
+                        content=payload,
+                        timeout=self._timeout(model_id),
+                    ) as response:
+                        if response.status_code == 200:
+                            accepted = True
+                            yield response
+                            return
+                        body = (await response.aread()).decode("utf-8", errors="replace")
+                        retry_after = response.headers.get("Retry-After")
+                        last_error = LLMError(
+                            f'Openrouter API Error: {body}', status_code=response.status_code, payload=body
+                        )
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    if accepted:
+                        # failed mid-stream: the caller already consumed tokens
+                        raise
+                    retry_after = None
+                    last_error = LLMError(f'Openrouter request failed: {e}', status_code=503)
+
+                if last_error.status_code not in RETRYABLE_STATUSES or attempt == self.cfg.max_retries:
+                    break
+                self.stats["retries"] += 1
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+
+            if last_error.status_code not in SATURATED_STATUSES:
+                break
+
+        self.stats["failures"] += 1
+        raise last_error
@@ -1,38 +1,46 @@
 import os
+import asyncio
 from dotenv import load_dotenv
 import json
 import re
 import httpx
 import io
-import markdown
-from weasyprint import HTML, CSS
-from jinja2 import Environment, FileSystemLoader
-from datetime import datetime
-from pathlib import Path
+from typing import AsyncIterator, Awaitable, BinaryIO, Callable, Iterable
 
 from backend.types.types import (
     IndexEnrichedTaskRequest,
     IndexTaskRequest,
+    RetrieveRequest,
     EnrichResult, ProjectHandbookRequest
 )
 from backend.service.task_service import TaskService
-from backend.rag.retriever import RAGService
-from backend.core.config import get_redis_client, get_supabase_client
+from backend.service import task_cache
+from backend.rag.async_rag import AsyncRAGService
+from backend.core.config import get_redis_client, get_supabase_client, get_settings
+from backend.core.singleflight import SingleFlight, load_with_redis_lock
+from backend.core.local_cache import context_cache
+from backend.model.context_builder import assemble_context, estimate_tokens
+from backend.model.llm_client import LLMClient, LLMClientConfig, LLMError
+from backend.model import response_cache
+from backend.model.handbook_cache import HandbookCache, handbook_fingerprint
+from backend.model.handbook_builder import (
+    TaskFold, status_counts, status_rank, insert_task_table
+)
+from backend.rag.chunking import sha256_of
+from backend.model.pdf_renderer import (
+    BASE_DIR, TEMPLATES_DIR, STATIC_DIR,
+    PdfRenderer
+)
 
-# path configs for html template and static css
-BASE_DIR = Path(__file__).resolve().parent.parent
 print(f'Base dir: {BASE_DIR}')
-
-TEMPLATES_DIR = BASE_DIR / "templates"
 print(f'Templates dir: {TEMPLATES_DIR}')
-
-STATIC_DIR = BASE_DIR / "static"
 print(f'Static dir: {STATIC_DIR}')
 
 
+settings = get_settings()
 task_service = TaskService()
-_rag = RAGService()
-http_client: httpx.AsyncClient | None = None
+_rag = AsyncRAGService()
+_single_flight = SingleFlight()
 _redis_client = None
 
 async def ensure_redis_client():
@@ -41,10 +49,10 @@ async def ensure_redis_client():
         _redis_client = await get_redis_client()
 
 async def get_http_client() -> httpx.AsyncClient:
-    global http_client
-    if http_client is None:
-        http_client = httpx.AsyncClient(timeout=15)
-    return http_client
+    return await _llm.pooled_http_client()
+
+async def close_http_client():
+    await _llm.aclose()
 
 
 load_dotenv()
@@ -78,60 +86,255 @@ model_providers = {
     3 : 'deepseek/deepseek-r1:free'
 }
 
+# read timeout (seconds) per provider, the reasoning model takes much longer to answer
+model_timeouts = {
+    1 : 30,
+    2 : 30,
+    3 : 90
+}
+
+# providers tried, in order, when the selected one is saturated (429 / 503 / timeouts)
+model_fallbacks = {
+    1 : [2],
+    2 : [1],
+    3 : [1]
+}
+
+_llm = LLMClient(
+    api_key=OPENROUTER_API_KEY,
+    config=LLMClientConfig(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_CONNECTIONS,
+        max_retries=settings.LLM_MAX_RETRIES,
+        model_timeouts={model_providers[k]: t for k, t in model_timeouts.items()},
+        fallbacks={model_providers[k]: [model_providers[f] for f in fs] for k, fs in model_fallbacks.items()},
+    ),
+    # resolved on every call so the HTTP client can be swapped (tests patch get_http_client)
+    http_client_factory=lambda: get_http_client(),
+)
+
+
+async def complete(model_id: str, system_prompt: str, user_prompt: str, max_tokens: int) -> str:
+    """Run one chat completion through the shared LLM client and return the answer text."""
+    data = await _llm.chat(
+        model_id,
+        [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ],
+        max_tokens=max_tokens
+    )
+    return data["choices"][0]["message"]["content"].strip()
+
+async def _coalesced_load(cache_key: str, read_cache, load):
+    """
+    Cache miss path shared by the context loaders: concurrent misses for the same key
+    wait for one in-flight load (and, if enabled, one load across worker processes).
+    """
+    if settings.CACHE_DISTRIBUTED_LOCK:
+        async def fill():
+            return await load_with_redis_lock(
+                _redis_client, cache_key, read_cache, load, timeout=settings.CACHE_LOCK_TIMEOUT
+            )
+        return await _single_flight.do(cache_key, fill)
+    return await _single_flight.do(cache_key, load)
+
+
+async def _read_through(cache_key: str, read_cache, load, is_hit: Callable[[object], bool]):
+    """
+    Context read path: in-process tier, then Redis, then the (coalesced) loader.
+    Values read from Redis or loaded are kept in the in-process tier unless the
+    key got invalidated meanwhile.
+    """
+    local = context_cache.get(cache_key)
+    if local is not None:
+        return local
+
+    epoch = context_cache.epoch
+    cached = await read_cache()
+    context_cache.record_remote(is_hit(cached))
+    if is_hit(cached):
+        context_cache.put(cache_key, cached, epoch)
+        return cached
+
+    value = await _coalesced_load(cache_key, read_cache, load)
+    if is_hit(value):
+        context_cache.put(cache_key, value, epoch)
+    return value
+
+
 async def get_project_context(project_id: str, user_id: str):
     await ensure_redis_client()
     cache_key = f'user:{user_id}:project:{project_id}:embeddings'
 
-    # look for cached project
-    cached = await _redis_client.get(cache_key)
-    if cached:
-        print(f'cache hit for {cache_key}')
-        return cached
+    async def read_cache():
+        return await _redis_client.get(cache_key)
 
-    print(f'cache missed for {cache_key}')    
-    # if not cached, query RAG
-    project_text = _rag.get_project_by_id(project_id)
+    async def load():
+        # if not cached, query RAG
+        project_text = await _rag.get_project_by_id(project_id)
 
-    # save to cache
-    if project_text:
-        await _redis_client.set(cache_key, project_text, ex=3600) 
+        # save to cache
+        if project_text:
+            await _redis_client.set(cache_key, project_text, ex=3600)
 
-    return project_text
+        return project_text
+
+    return await _read_through(cache_key, read_cache, load, is_hit=bool)
 
 
 async def get_previous_tasks_context(project_id: str):
     await ensure_redis_client()
-    cache_key = f"project:{project_id}:tasks"
-
-    cached = await _redis_client.get(cache_key)
-    if cached:
-        try:
-            tasks = json.loads(cached)
-            print(f'cache hit for {cache_key}')
-            return "\n\n".join(t["text"] if isinstance(t, dict) else t for t in tasks)
-        except json.JSONDecodeError:
-            pass
-
-    print(f'cache miss for {cache_key}')
-    previous_tasks = _rag.get_previous_tasks(project_id)
-    await _redis_client.set(cache_key, json.dumps(previous_tasks), ex=3600)
-
-    return "\n\n".join(previous_tasks)
+    cache_key = task_cache.texts_key(project_id)
+
+    async def read_cache():
+        # only the per-task texts are fetched, no JSON entries are decoded
+        texts = await task_cache.read_texts(_redis_client, project_id)
+        return "\n\n".join(texts) if texts is not None else None
+
+    async def load():
+        previous_tasks = await _rag.get_previous_task_texts(project_id)
+        await task_cache.fill_texts(_redis_client, project_id, previous_tasks)
+        return "\n\n".join(previous_tasks.values())
+
+    return await _read_through(cache_key, read_cache, load, is_hit=lambda v: v is not None)
+
+
+async def get_ranked_task_chunks(project_id: str, new_task_title: str, new_task_user_description: str) -> list[str]:
+    """Previous task chunks ranked by semantic similarity to the new task."""
+    try:
+        retrieved = await _rag.retrieve(
+            RetrieveRequest(
+                projectId=project_id,
+                title=new_task_title,
+                user_description=new_task_user_description,
+                top_k=settings.CONTEXT_TOP_K
+            )
+        )
+    except Exception as e:
+        print(f'Retrieval failed for project {project_id}: {e}')
+        return []
+    return [c.text for c in retrieved.contexts if c.type == "task"]
 
 
 async def get_context(project_id: str, user_id: str, new_task_title: str, new_task_user_description: str):
     project_text = await get_project_context(project_id, user_id)
-    previous_tasks_text = await get_previous_tasks_context(project_id)
 
-    context = (
-        f"PROJECT OVERVIEW:\n{project_text}\n\n"
-        f"PREVIOUS TASKS:\n{previous_tasks_text}\n\n"
-        f"NEW TASK:\ntask_Title: {new_task_title}\nDescription: {new_task_user_description}\n"
+    if settings.CONTEXT_MODE == "full":
+        previous_tasks_text = await get_previous_tasks_context(project_id)
+
+        context = (
+            f"PROJECT OVERVIEW:\n{project_text}\n\n"
+            f"PREVIOUS TASKS:\n{previous_tasks_text}\n\n"
+            f"NEW TASK:\ntask_Title: {new_task_title}\nDescription: {new_task_user_description}\n"
+        )
+
+        return context
+
+    task_chunks = await get_ranked_task_chunks(project_id, new_task_title, new_task_user_description)
+    if not task_chunks:
+        # nothing retrievable (e.g. retrieval error): fall back to the cached task list
+        previous_tasks_text = await get_previous_tasks_context(project_id)
+        task_chunks = [t for t in previous_tasks_text.split("\n\n") if t.strip()]
+
+    context, _ = assemble_context(
+        project_text or "",
+        task_chunks,
+        new_task_title,
+        new_task_user_description,
+        budget=settings.CONTEXT_TOKEN_BUDGET
     )
 
     return context
 
 
+async def lookup_cached_enrichment(
+        project_id: str,
+        model_id: str,
+        context: str,
+        title: str,
+        user_description: str,
+        exclude_task_id: str | None = None
+) -> tuple[str | None, tuple[str, int] | None]:
+    """
+    Look the enrichment up in the response cache, returns (cache key, (ai_description, story_points) or None).
+
+    1. exact match on (model, system prompt, context, project version)
+    2. optional near-duplicate match: the enrichment of a prior task of the same
+       project whose embedding is close enough (LLM_CACHE_SIMILARITY)
+    The key is None when the cache is disabled or unreachable: a failed lookup
+    is a miss, it never fails the enrichment.
+    """
+    if settings.LLM_CACHE_TTL <= 0:
+        return None, None
+
+    try:
+        await ensure_redis_client()
+        version = await response_cache.project_version(_redis_client, project_id)
+        key = response_cache.response_key(project_id, model_id, SYSTEM_PROMPT, context, version)
+        cached = await response_cache.get_response(_redis_client, key)
+    except Exception as e:
+        print(f'Response cache lookup failed for project {project_id}: {e}')
+        response_cache.record("misses")
+        return None, None
+
+    if cached:
+        response_cache.record("exact_hits")
+        return key, (cached["ai_description"], cached["story_points"])
+
+    if settings.LLM_CACHE_SIMILARITY > 0:
+        try:
+            similar = await _rag.find_similar_task(
+                project_id,
+                title,
+                user_description,
+                settings.LLM_CACHE_SIMILARITY,
+                exclude_task_id=exclude_task_id
+            )
+        except Exception as e:
+            print(f'Near-duplicate lookup failed for project {project_id}: {e}')
+            similar = None
+        if similar:
+            response_cache.record("similar_hits")
+            return key, (similar["ai_description"], similar["story_points"])
+
+    response_cache.record("misses")
+    return key, None
+
+
+async def store_enrichment(key: str | None, model_id: str, ai_description: str, story_points: int):
+    """Cache a completed enrichment; a cache failure is logged, the enrichment still succeeds."""
+    if key is None:
+        return
+    try:
+        await response_cache.put_response(
+            _redis_client, key, ai_description, story_points, model_id, ttl=settings.LLM_CACHE_TTL
+        )
+    except Exception as e:
+        print(f'Response cache write failed for {key}: {e}')
+
+
+async def cached_enrichment(
+        project_id: str,
+        model_id: str,
+        context: str,
+        title: str,
+        user_description: str,
+        exclude_task_id: str | None = None
+) -> tuple[str, int]:
+    """Enrich a task through the response cache, returns (ai_description, story_points)."""
+    key, hit = await lookup_cached_enrichment(
+        project_id, model_id, context, title, user_description, exclude_task_id=exclude_task_id
+    )
+    if hit:
+        return hit
+
+    ai_output = await complete(model_id, SYSTEM_PROMPT, context, max_tokens=1000)
+    ai_description, ai_story_points = parse_enriched_output(ai_output)
+    await store_enrichment(key, model_id, ai_description, ai_story_points)
+    return ai_description, ai_story_points
+
+
 """
 Enrich and persist a newly created AI task.
 
@@ -167,53 +370,14 @@ async def enrich_task_details(
         req.user_description
     )
 
-    client = await get_http_client()
-
-    response = await client.post(
-        url="https://openrouter.ai/api/v1/chat/completions",
-        headers={
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-        },
-        data=json.dumps({
-            "model": model_providers[req.selected_model],
-            "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": context}
-            ],
-            "max_tokens": 1000
-        })
-    )
-
-    data = response.json()
-
-    if response.status_code != 200:
-        print(f'OpenRouter error: {data}')
-        raise RuntimeError(f'Openrouter API Error: {data}')
-
-    if 'choices' not in data:
-        print('Unexpected Openrouter error')
-        raise RuntimeError('Unexpected Openrouter response')
-
-    ai_output = data["choices"][0]["message"]["content"].strip()
-
-    
-    # also extract story points
-    match = re.search(
-        r"(?:\*\*)?\s*Story\s*Points?\s*[:\-–—]\**\s*(\d+)\s*(?:\*\*)?",
-        ai_output,
-        re.IGNORECASE | re.MULTILINE
+    ai_description, ai_story_points = await cached_enrichment(
+        req.projectId,
+        model_providers[req.selected_model],
+        context,
+        req.task_title,
+        req.user_description
     )
 
-    ai_story_points = int(match.group(1)) if match else DEFAULT_STORY_POINTS
-
-    ai_description = re.sub(
-        r"\*{0,2}\s*Story\s*Points?\s*[:\-–—]\**\s*\d+\s*\*{0,2}",
-        "",
-        ai_output,
-        flags=re.IGNORECASE
-    ).strip()
-
     pretty_description = (
         ai_description
         .replace("**", "")
@@ -265,37 +429,27 @@ async def enrich_edited_task(
         new_task_user_description=new_task_user_description or ''
     )
 
-    client = await get_http_client()
-
-    response = await client.post(
-        url="https://openrouter.ai/api/v1/chat/completions",
-        headers={
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-        },
-        data=json.dumps({
-            "model": model_providers[1], # hardcoded model provider used of the automatic regeneration
-            "messages": [
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": context}
-            ],
-            "max_tokens": 1000
-        })
+    # hardcoded model provider used of the automatic regeneration
+    ai_description, ai_story_points = await cached_enrichment(
+        projectId,
+        model_providers[1],
+        context,
+        new_task_title or '',
+        new_task_user_description or '',
+        exclude_task_id=taskId
     )
 
-    data = response.json()
-
-    if response.status_code != 200:
-        print(f'OpenRouter error: {data}')
-        raise RuntimeError(f'Openrouter API Error: {data}')
+    return ai_description, ai_story_points
 
-    if 'choices' not in data:
-        print('Unexpected Openrouter error')
-        raise RuntimeError('Unexpected Openrouter response')
+# story points line, only once the number is complete (followed by a non-digit)
+STORY_POINTS_STREAM_RE = re.compile(
+    r"Story\s*Points?\s*[:\-–—]\**\s*(\d+)(?=\D)",
+    re.IGNORECASE
+)
 
-    ai_output = data["choices"][0]["message"]["content"].strip()
 
-    # also extract story points
+def parse_enriched_output(ai_output: str) -> tuple[str, int]:
+    """Split the LLM output into (ai_description, story_points)."""
     match = re.search(
         r"(?:\*\*)?\s*Story\s*Points?\s*[:\-–—]\**\s*(\d+)\s*(?:\*\*)?",
         ai_output,
@@ -311,23 +465,119 @@ async def enrich_edited_task(
         flags=re.IGNORECASE
     ).strip()
 
-    pretty_description = (
-        ai_description
-        .replace("**", "")
-        .replace("\\n", "\n")
-        .replace("\n\n", "\n")
-        .strip()
+    return ai_description, ai_story_points
+
+
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def stream_task_enrichment(req: IndexTaskRequest):
+    """
+    Streaming variant of enrich_task_details, as Server-Sent Events.
+
+    Proxies the OpenRouter tokens as they are generated (`token` events), sends
+    a `story_points` event as soon as the estimate appears in the stream, and
+    once the completion is over persists the task and sends `done`.
+    Failures are reported as an `error` event, since the HTTP status is already sent.
+    """
+    try:
+        context = await get_context(
+            req.projectId,
+            req.userId,
+            req.task_title,
+            req.user_description
+        )
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Context loading failed: {e}"})
+        return
+
+    model_id = model_providers[req.selected_model]
+    cache_key, hit = await lookup_cached_enrichment(
+        req.projectId, model_id, context, req.task_title, req.user_description
     )
 
-    pretty_context_text = (
-        context
-        .replace("\\n", "\n")
-        .replace("\n\n", "\n")
-        .replace("**", "")
-        .strip()
+    ai_output = ""
+    streamed_points = None
+
+    if hit:
+        # served from the response cache: the whole description arrives as one token
+        ai_description, ai_story_points = hit
+        yield sse_event("token", {"text": ai_description})
+    else:
+        try:
+            async with _llm.stream_chat(
+                model_id,
+                [
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": context}
+                ],
+                max_tokens=1000
+            ) as response:
+                async for line in response.aiter_lines():
+                    # OpenRouter also sends ": OPENROUTER PROCESSING" keep-alive comments
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        break
+                    try:
+                        chunk = json.loads(payload)
+                    except json.JSONDecodeError:
+                        continue
+                    if "error" in chunk:
+                        yield sse_event("error", {"detail": f"Openrouter API Error: {chunk['error']}"})
+                        return
+
+                    choices = chunk.get("choices") or [{}]
+                    delta = (choices[0].get("delta") or {}).get("content") or ""
+                    if not delta:
+                        continue
+
+                    ai_output += delta
+                    yield sse_event("token", {"text": delta})
+
+                    if streamed_points is None:
+                        match = STORY_POINTS_STREAM_RE.search(ai_output)
+                        if match:
+                            streamed_points = int(match.group(1))
+                            yield sse_event("story_points", {"story_points": streamed_points})
+        except LLMError as e:
+            print(f'OpenRouter stream error: {e}')
+            yield sse_event("error", {"detail": str(e)})
+            return
+        except httpx.HTTPError as e:
+            yield sse_event("error", {"detail": f"Openrouter request failed: {e}"})
+            return
+
+        if not ai_output.strip():
+            yield sse_event("error", {"detail": "Empty Openrouter response"})
+            return
+
+        ai_description, ai_story_points = parse_enriched_output(ai_output.strip())
+        await store_enrichment(cache_key, model_id, ai_description, ai_story_points)
+
+    if streamed_points is None:
+        yield sse_event("story_points", {"story_points": ai_story_points})
+
+    saved = await task_service.create_task(
+        IndexEnrichedTaskRequest(
+            projectId=req.projectId,
+            taskId=None,
+            task_title=req.task_title,
+            user_description=req.user_description,
+            ai_description=ai_description,
+            status=req.status,
+            story_points=ai_story_points
+        )
     )
 
-    return ai_description, ai_story_points
+    yield sse_event("done", {
+        "saved": bool(saved),
+        "ai_description": ai_description,
+        "story_points": ai_story_points,
+    })
+
 
 HANDBOOK_SYSTEM_PROMPT = (
     "You are an experienced technical writer and project manager.\n"
@@ -362,19 +612,24 @@ HANDBOOK_SYSTEM_PROMPT = (
     "## 7. Future Work / Roadmap\n\n"
 
     "Task table rules:\n"
-    "- In section \"4. Task Breakdown and Status\", use a single Markdown table\n"
-    "- The table MUST contain exactly one row per task\n"
-    "- DO NOT omit any tasks\n"
-    "- Fill ALL columns for each task\n"
-    "- If a value is missing or null, write \"—\"\n"
-    "- The table columns MUST be exactly:\n"
-    "  ID | Title | Status | Story Points\n\n"
-
-    "Example task table format:\n"
-    "| ID | Title | Status | Story Points |\n"
-    "|----|-------|--------|--------------|\n"
-    "| 123 | Login API | In Progress | 3 |\n"
-    "| 124 | Dashboard UI | Done | 5 |\n"
+    "- Always include section \"4. Task Breakdown and Status\"\n"
+    "- In section 4, summarize progress per status in a few bullets (counts, story points, notable work)\n"
+    "- Do NOT write a task table: the complete table (ID | Title | Status | Story Points) "
+    "is inserted automatically at the end of section 4\n"
+)
+
+HANDBOOK_MAP_PROMPT = (
+    "You are an experienced technical writer and project manager.\n"
+    "You receive JSON with a subset of the tasks of a software project, or summaries of such subsets.\n"
+    "Summarize them for a later pass that writes the project handbook.\n\n"
+
+    "Rules:\n"
+    "- Markdown bullet lists only, no headings, no tables\n"
+    "- Cover: features and components involved, dependencies between tasks, "
+    "risks and open questions, remaining work\n"
+    "- Mention task ids when referring to specific tasks\n"
+    "- Stay under 250 words\n"
+    "- Do NOT invent information that is not present in the input\n"
 )
 
 
@@ -401,42 +656,117 @@ async def load_project_from_supabase(project_id: str, user_id: str) -> dict:
     return response.data
 
 
-async def load_tasks_from_supabase(project_id: str) -> list[dict]:
+# task column projections, cheapest that serves the caller
+TASK_COLUMNS = "id, project_id, title, description, ai_description, status, story_points, created_at, updated_at"
+TASK_HANDBOOK_COLUMNS = "id, title, description, ai_description, status, story_points"
+TASK_FINGERPRINT_COLUMNS = "id, updated_at"
+
+
+async def iter_tasks_from_supabase(
+        project_id: str,
+        columns: str = TASK_COLUMNS,
+        page_size: int | None = None
+) -> AsyncIterator[dict]:
     """
-    Load all tasks for a project from Supabase (source of truth).
+    Stream the tasks of a project from Supabase, one page of `page_size` rows at a time.
+    Keyset pagination on (created_at, id): every page starts right after the last row
+    of the previous one, so there are no OFFSET scans and rows inserted meanwhile
+    do not shift the pages. The cursor columns are always selected.
     """
-    supabase = await get_supabase_client()
-    response = (
-        supabase
-        .table("tasks")
-        .select("id, project_id, title, description, ai_description, status, story_points, created_at, updated_at")
-        .eq("project_id", project_id)
-        .order("created_at")
-    )
-    response = await response.execute()
+    page_size = page_size or settings.SUPABASE_PAGE_SIZE
+    selected = [c.strip() for c in columns.split(",")]
+    selected += [c for c in ("created_at", "id") if c not in selected]
 
-    return response.data or []
+    supabase = await get_supabase_client()
+    cursor = None
+    while True:
+        query = (
+            supabase
+            .table("tasks")
+            .select(", ".join(selected))
+            .eq("project_id", project_id)
+        )
+        if cursor is not None:
+            created_at, task_id = cursor
+            query = query.or_(
+                f'created_at.gt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.gt."{task_id}")'
+            )
+        response = await (
+            query
+            .order("created_at")
+            .order("id")
+            .limit(page_size)
+            .execute()
+        )
+        rows = response.data or []
+        for row in rows:
+            yield row
+
+        if len(rows) < page_size:
+            return
+        cursor = (rows[-1]["created_at"], rows[-1]["id"])
+
+
+async def load_tasks_from_supabase(project_id: str, columns: str = TASK_COLUMNS) -> list[dict]:
+    """
+    Load all tasks for a project from Supabase (source of truth).
+    Prefer iter_tasks_from_supabase when the rows can be processed one by one.
+    """
+    return [row async for row in iter_tasks_from_supabase(project_id, columns)]
 
 
-def markdown_to_html(md_text: str) -> str:
-    return markdown.markdown(
-        md_text,
-        extensions=[
-            "extra",        # tables, fenced code
-            "sane_lists",
-            "toc",
-        ],
-        output_format="html5",
+async def recently_active_project_ids(limit: int, scan_rows: int = 2000) -> list[str]:
+    """Projects of the most recently updated tasks, most recent first (at most `limit`)."""
+    supabase = await get_supabase_client()
+    response = await (
+        supabase.table("tasks")
+        .select("project_id")
+        .order("updated_at", desc=True)
+        .limit(scan_rows)
+        .execute()
     )
+    project_ids: dict[str, None] = {}
+    for row in response.data or []:
+        if row.get("project_id") is not None:
+            project_ids.setdefault(str(row["project_id"]), None)
+            if len(project_ids) >= limit:
+                break
+    return list(project_ids)
 
-async def generate_project_handbook_text(req: ProjectHandbookRequest) -> str:
+
+async def prewarm_collections() -> int:
+    """
+    Open the Chroma collections of the most recently active projects (called on app start up),
+    so their first requests skip the catalog lookup.
+    """
+    if settings.COLLECTION_PREWARM <= 0:
+        return 0
+    try:
+        project_ids = await recently_active_project_ids(settings.COLLECTION_PREWARM)
+        loaded = await _rag.prewarm_collections(project_ids)
+        print(f'Prewarmed {loaded} collections')
+        return loaded
+    except Exception as e:
+        print(f'Collection prewarm failed: {e}')
+        return 0
+
+
+async def generate_project_handbook_text(
+        req: ProjectHandbookRequest,
+        project_row: dict | None = None,
+        task_rows: Iterable[dict] | None = None
+) -> str:
     """
     Build a structured project handbook using the LLM, based only on Supabase data.
     Returns markdown/plain text (no PDF here).
+    The tasks are streamed from Supabase page by page and folded as they come
+    (see TaskFold): only their table columns are kept for every task. Rows
+    already loaded by the caller can be passed in.
     """
     # load project + tasks from Supabase
-    project_row = await load_project_from_supabase(req.projectId, req.userId)
-    task_rows = await load_tasks_from_supabase(req.projectId)
+    if project_row is None:
+        project_row = await load_project_from_supabase(req.projectId, req.userId)
     # build structured context
     project_context = {
         "id": project_row.get("id"),
@@ -448,94 +778,186 @@ async def generate_project_handbook_text(req: ProjectHandbookRequest) -> str:
         "updated_at": project_row.get("updated_at"),
     }
 
-    tasks_context = []
-    for row in task_rows:
-        # you can filter out archived tasks here if you want
-        tasks_context.append({
-            "id": row.get("id"),
-            "title": row.get("title", ""),
-            "status": row.get("status", ""),
-            "story_points": row.get("story_points"),
-            "user_description": row.get("description") or "",
-            "ai_description": row.get("ai_description") or "",
-            "created_at": row.get("created_at"),
-            "updated_at": row.get("updated_at"),
-        })
-
-
-    if not project_context["description"] and not tasks_context:
-        raise RuntimeError("No meaningful project or task data found for this project.")
-
-    context = {
-        "project": project_context,
-        "tasks": tasks_context,
-    }
+    model_id = model_providers[req.selected_model]
+    semaphore = asyncio.Semaphore(settings.HANDBOOK_MAP_CONCURRENCY)
+    # map step: (status rank, summary task), started as soon as a partition is full
+    summaries: list[tuple[int, asyncio.Task]] = []
+
+    async def summarize(prompt: str) -> str:
+        async with semaphore:
+            return await complete(model_id, HANDBOOK_MAP_PROMPT, prompt, max_tokens=600)
+
+    def map_partition(contexts: list[dict]) -> None:
+        prompt = (
+            f"Tasks with status: {contexts[0].get('status') or 'unknown'}\n\n"
+            f"{json.dumps(contexts, ensure_ascii=False)}"
+        )
+        summaries.append((status_rank(contexts[0]["status"]), asyncio.create_task(summarize(prompt))))
+
+    fold = TaskFold(settings.HANDBOOK_SINGLE_PASS_TOKENS, settings.HANDBOOK_PARTITION_TOKENS, map_partition)
+    try:
+        if task_rows is None:
+            async for row in iter_tasks_from_supabase(req.projectId, TASK_HANDBOOK_COLUMNS):
+                fold.add(row)
+        else:
+            for row in task_rows:
+                fold.add(row)
 
-    # create prompt with JSON context
-    prompt = (
-        "Below is JSON with the project and its tasks.\n"
-        "Use it to generate a well-structured project handbook as described in the system prompt.\n\n"
-        f"{json.dumps(context, ensure_ascii=False, indent=2)}"
-    )
+        # you can filter out archived tasks here if you want
+        if not project_context["description"] and not fold.table_rows:
+            raise RuntimeError("No meaningful project or task data found for this project.")
+
+        if fold.single_pass:
+            # create prompt with JSON context
+            prompt = (
+                "Below is JSON with the project and its tasks.\n"
+                "Use it to generate a well-structured project handbook as described in the system prompt.\n\n"
+                f"{json.dumps({'project': project_context, 'tasks': fold.contexts}, ensure_ascii=False)}"
+            )
+            if estimate_tokens(prompt) > settings.HANDBOOK_SINGLE_PASS_TOKENS:
+                fold.spill()
+
+        if fold.single_pass:
+            handbook = await complete(model_id, HANDBOOK_SYSTEM_PROMPT, prompt, max_tokens=2000)
+        else:
+            fold.finish()
+            print(f'handbook map step: {len(fold.table_rows)} tasks, {len(summaries)} partitions')
+            summaries.sort(key=lambda item: item[0])
+            mapped = list(await asyncio.gather(*(task for _, task in summaries)))
+            handbook = await reduce_handbook(model_id, project_context, status_counts(fold.table_rows), mapped, summarize)
+    finally:
+        # an error or a cancellation must not leave map calls running
+        for _, task in summaries:
+            task.cancel()
 
-    client = await get_http_client()
-
-    response = await client.post(
-        url="https://openrouter.ai/api/v1/chat/completions",
-        headers={
-            "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-            "Content-Type": "application/json",
-        },
-        data=json.dumps({
-            "model": model_providers[req.selected_model],
-            "messages": [
-                {"role": "system", "content": HANDBOOK_SYSTEM_PROMPT},
-                {"role": "user", "content": prompt},
-            ],
-            "max_tokens": 2000,
-        })
+    pretty_handbook = (
+        handbook
+        .replace("\\n", "\n")
+        .strip()
     )
 
-    data = response.json()
+    # the task table comes from the rows, never from the LLM: no omitted or invented tasks
+    return insert_task_table(pretty_handbook, fold.table_rows)
 
-    if response.status_code != 200:
-        print(f"OpenRouter handbook error: {data}")
-        raise RuntimeError(f"OpenRouter API Error (handbook): {data}")
 
-    if "choices" not in data:
-        print("Unexpected OpenRouter handbook response")
-        raise RuntimeError("Unexpected OpenRouter handbook response")
+async def reduce_handbook(
+        model_id: str,
+        project_context: dict,
+        counts: dict,
+        summaries: list[str],
+        summarize: Callable[[str], Awaitable[str]]
+) -> str:
+    """
+    Handbook of a project too large for one prompt, from the summaries of its task
+    partitions (map step, see generate_project_handbook_text).
 
-    handbook = data["choices"][0]["message"]["content"].strip()
+    reduce: summaries are merged until they fit HANDBOOK_SINGLE_PASS_TOKENS, then
+            one composition call writes the handbook from them
+    """
+    # merge summaries while they do not fit in the composition prompt
+    while len(summaries) > 1 and estimate_tokens("\n\n".join(summaries)) > settings.HANDBOOK_SINGLE_PASS_TOKENS:
+        groups, current, used = [], [], 0
+        for summary in summaries:
+            t = estimate_tokens(summary)
+            if current and used + t > settings.HANDBOOK_PARTITION_TOKENS:
+                groups.append(current)
+                current, used = [], 0
+            current.append(summary)
+            used += t
+        groups.append(current)
+        if len(groups) == len(summaries):
+            # every summary is already as large as a partition: merge pairwise
+            groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+        summaries = list(await asyncio.gather(*(
+            summarize("Summaries of task groups:\n\n" + "\n\n".join(group)) for group in groups
+        )))
 
-    pretty_handbook = (
-        handbook
-        .replace("\\n", "\n")
-        .strip()
+    prompt = (
+        "Below is JSON with the project, the task counts per status, and summaries of its tasks.\n"
+        "Use it to generate a well-structured project handbook as described in the system prompt.\n\n"
+        f"{json.dumps({'project': project_context, 'tasks_per_status': counts}, ensure_ascii=False)}\n\n"
+        "TASK SUMMARIES:\n\n" + "\n\n".join(summaries)
     )
+    return await complete(model_id, HANDBOOK_SYSTEM_PROMPT, prompt, max_tokens=2000)
 
-    return pretty_handbook
 
-
-env = Environment(
-    loader=FileSystemLoader(str(TEMPLATES_DIR))
+handbook_renderer = PdfRenderer(
+    workers=settings.HANDBOOK_RENDER_WORKERS,
+    max_concurrency=settings.HANDBOOK_RENDER_MAX_CONCURRENCY
 )
 
-def render_handbook_pdf(markdown_text: str) -> bytes:
-    html_body = markdown_to_html(markdown_text)
 
-    template = env.get_template("handbook.html")
-    html = template.render(
-        title="Project Handbook",
-        content=html_body,
-        generated_at=datetime.utcnow().strftime("%Y-%m-%d"),
-    )
+handbook_cache = HandbookCache(settings.HANDBOOK_CACHE_DIR, max_bytes=settings.HANDBOOK_CACHE_MAX_BYTES)
+_handbook_render_digest: str | None = None
 
-    pdf = HTML(
-        string=html, 
-        base_url=str(BASE_DIR)
-    ).write_pdf(
-        stylesheets=[CSS(str(STATIC_DIR / "handbook.css"))]
+
+def handbook_render_digest() -> str:
+    """Digest of the template and stylesheet, so a layout change does not serve old PDFs."""
+    global _handbook_render_digest
+    if _handbook_render_digest is None:
+        parts = []
+        for path in (TEMPLATES_DIR / "handbook.html", STATIC_DIR / "handbook.css"):
+            try:
+                parts.append(path.read_text(encoding="utf-8"))
+            except OSError:
+                parts.append("")
+        _handbook_render_digest = sha256_of("\n".join(parts))
+    return _handbook_render_digest
+
+
+async def get_handbook_fingerprint(req: ProjectHandbookRequest) -> tuple[str, dict]:
+    """
+    Fingerprint the Supabase rows of the handbook, returns (fingerprint, project_row).
+    Only task ids and timestamps are fetched: the task texts are loaded when
+    the handbook actually has to be generated.
+    """
+    project_row = await load_project_from_supabase(req.projectId, req.userId)
+    task_rows = await load_tasks_from_supabase(req.projectId, TASK_FINGERPRINT_COLUMNS)
+    fingerprint = handbook_fingerprint(
+        project_row,
+        task_rows,
+        model_providers[req.selected_model],
+        sha256_of(HANDBOOK_SYSTEM_PROMPT + HANDBOOK_MAP_PROMPT),
+        handbook_render_digest()
     )
+    return fingerprint, project_row
+
 
-    return pdf
\ No newline at end of file
+async def open_handbook_pdf(
+        req: ProjectHandbookRequest,
+        fingerprint: str,
+        project_row: dict
+) -> BinaryIO:
+    """
+    Open the handbook PDF for the given fingerprint, to be streamed by the caller (who closes it).
+    From the disk cache when the project data did not change, otherwise generated
+    (LLM + WeasyPrint) straight into the cache; the PDF is never loaded whole in memory.
+    """
+    pdf_file = await asyncio.to_thread(handbook_cache.open_pdf, fingerprint)
+    if pdf_file is not None:
+        print(f'handbook cache hit for {fingerprint}')
+        return pdf_file
+
+    # the markdown survives a PDF eviction / template change, skipping the LLM call
+    markdown_text = await asyncio.to_thread(handbook_cache.get_markdown, fingerprint)
+    if markdown_text is None:
+        markdown_text = await generate_project_handbook_text(req, project_row)
+        await asyncio.to_thread(handbook_cache.put_markdown, fingerprint, markdown_text)
+
+    tmp_path = handbook_cache.temp_path(fingerprint, "pdf")
+    try:
+        await handbook_renderer.render_to_file(markdown_text, tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # open before publishing, so an eviction right after cannot take the file away
+    pdf_file = open(tmp_path, "rb")
+    try:
+        await asyncio.to_thread(handbook_cache.commit, fingerprint, "pdf", tmp_path)
+    except OSError as e:
+        # still served from the open handle, just not cached
+        print(f'Handbook cache write failed for {fingerprint}: {e}')
+        os.remove(tmp_path)
+    return pdf_file
@@ -0,0 +1,233 @@
+"""
+Handbook PDF rendering (markdown -> Jinja -> WeasyPrint) in a process pool.
+
+WeasyPrint layout is CPU-bound and holds the GIL for seconds, so it runs in
+separate worker processes. Each worker loads the Jinja environment, the
+handbook stylesheet and the fonts once, in its initializer, and reuses them
+for every render.
+"""
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import markdown
+from jinja2 import Environment, FileSystemLoader
+
+
+# path configs for html template and static css
+BASE_DIR = Path(__file__).resolve().parent.parent
+TEMPLATES_DIR = BASE_DIR / "templates"
+STATIC_DIR = BASE_DIR / "static"
+
+# per worker process, filled by _init_worker
+_worker: Dict[str, object] = {}
+
+
+def markdown_to_html(md_text: str) -> str:
+    return markdown.markdown(
+        md_text,
+        extensions=[
+            "extra",        # tables, fenced code
+            "sane_lists",
+            "toc",
+        ],
+        output_format="html5",
+    )
+
+
+def _init_worker() -> None:
+    """Process pool initializer: load templates, stylesheet and fonts once per worker."""
+    from weasyprint import CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    font_config = FontConfiguration()
+    env = Environment(loader=FileSystemLoader(str(TEMPLATES_DIR)))
+    _worker["template"] = env.get_template("handbook.html")
+    _worker["font_config"] = font_config
+    _worker["css"] = CSS(filename=str(STATIC_DIR / "handbook.css"), font_config=font_config)
+    # warm up the markdown extensions as well
+    markdown_to_html("")
+
+
+def _layout(markdown_text: str, timings: Dict[str, float]):
+    """markdown -> HTML -> laid out WeasyPrint document, timing each stage."""
+    from weasyprint import HTML
+
+    if not _worker:
+        _init_worker()
+
+    t = time.perf_counter()
+
+    html_body = markdown_to_html(markdown_text)
+    timings["markdown"], t = (time.perf_counter() - t) * 1000, time.perf_counter()
+
+    html = _worker["template"].render(
+        title="Project Handbook",
+        content=html_body,
+        generated_at=datetime.utcnow().strftime("%Y-%m-%d"),
+    )
+    timings["template"], t = (time.perf_counter() - t) * 1000, time.perf_counter()
+
+    document = HTML(
+        string=html,
+        base_url=str(BASE_DIR)
+    ).render(
+        stylesheets=[_worker["css"]],
+        font_config=_worker["font_config"],
+    )
+    timings["layout"] = (time.perf_counter() - t) * 1000
+    return document
+
+
+def _warm_up() -> None:
+    """Runs once per worker at start up, so its initializer does not delay the first render."""
+
+
+def render_pdf_to_file(markdown_text: str, path: str) -> Dict[str, float]:
+    """
+    Render the handbook PDF straight into `path`, returns milliseconds per stage.
+    The bytes are never sent back through the pool, nor held by the web process.
+    """
+    timings: Dict[str, float] = {}
+    document = _layout(markdown_text, timings)
+    t = time.perf_counter()
+    document.write_pdf(target=path)
+    timings["pdf"] = (time.perf_counter() - t) * 1000
+    return timings
+
+
+def _report_warm_up(future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        print(f'Handbook renderer warm up failed: {future.exception()}')
+
+
+class PdfRenderer:
+    """
+    Async front of the rendering process pool.
+
+    At most `max_concurrency` renders are submitted at once, the others wait in
+    the event loop. Per-stage timings (plus queue wait and total) are aggregated
+    for the health endpoint.
+    """
+
+    def __init__(self, workers: int = 2, max_concurrency: int = 2):
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._stats_lock = threading.Lock()
+        self._stats: Dict[str, float] = {"renders": 0, "failures": 0, "waiting": 0, "running": 0}
+        self._totals: Dict[str, float] = {}
+        self._max: Dict[str, float] = {}
+
+
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # spawn: the parent runs threads (Chroma, ONNX, asyncio), forking them is unsafe
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                    )
+        return self._executor
+
+
+    def warm_up(self) -> List[Future]:
+        """
+        Start every worker now (called on app start up, not awaited): the pool
+        spawns its processes on demand, and each loads WeasyPrint and the fonts
+        before its first render.
+        """
+        executor = self.executor()
+        futures = [executor.submit(_warm_up) for _ in range(self.workers)]
+        for future in futures:
+            future.add_done_callback(_report_warm_up)
+        return futures
+
+
+    def _drop_executor(self, executor: ProcessPoolExecutor) -> None:
+        """Forget a broken pool (a worker died), the next render starts a new one."""
+        with self._executor_lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+
+    def shutdown(self) -> None:
+        """Stop the worker processes (called on app shutdown)."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+
+    def _record(self, timings: Dict[str, float]) -> None:
+        with self._stats_lock:
+            self._stats["renders"] += 1
+            for stage, ms in timings.items():
+                self._totals[stage] = self._totals.get(stage, 0.0) + ms
+                self._max[stage] = max(self._max.get(stage, 0.0), ms)
+
+
+    def _bump(self, **deltas: float) -> None:
+        with self._stats_lock:
+            for k, v in deltas.items():
+                self._stats[k] += v
+
+
+    async def render_to_file(self, markdown_text: str, path: str) -> None:
+        """Render the handbook PDF into `path` on a worker process."""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        started = time.perf_counter()
+        self._bump(waiting=1)
+        async with self._semaphore:
+            self._bump(waiting=-1, running=1)
+            queued_ms = (time.perf_counter() - started) * 1000
+            executor = self.executor()
+            try:
+                loop = asyncio.get_running_loop()
+                timings = await loop.run_in_executor(executor, render_pdf_to_file, markdown_text, path)
+            except BrokenProcessPool:
+                # a worker died (out of memory, crash in WeasyPrint)
+                self._bump(failures=1)
+                self._drop_executor(executor)
+                raise
+            except Exception:
+                self._bump(failures=1)
+                raise
+            finally:
+                self._bump(running=-1)
+
+        timings["queue_wait"] = queued_ms
+        timings["total"] = (time.perf_counter() - started) * 1000
+        self._record(timings)
+        print(f'handbook rendered: {", ".join(f"{k}={v:.0f}ms" for k, v in timings.items())}')
+
+
+    def stats(self) -> Dict[str, object]:
+        with self._stats_lock:
+            s = dict(self._stats)
+            totals, maxima = dict(self._totals), dict(self._max)
+        renders = int(s["renders"])
+        return {
+            "workers": self.workers,
+            "max_concurrency": self.max_concurrency,
+            "renders": renders,
+            "failures": int(s["failures"]),
+            "waiting": int(s["waiting"]),
+            "running": int(s["running"]),
+            "avg_ms": {k: round(v / renders, 1) for k, v in totals.items()} if renders else {},
+            "max_ms": {k: round(v, 1) for k, v in maxima.items()},
+        }
@@ -0,0 +1,87 @@
+"""
+LLM response cache for task enrichment, in Redis.
+
+  project:{id}:version          bumped every time the project text changes
+  project:{id}:llm:{sha256}     JSON {ai_description, story_points, model}
+
+The exact-match key hashes (model, system prompt, normalized context, project
+version), so editing the project makes every older entry unreachable; they
+then expire on their own.
+
+Cache errors are never fatal: a Redis failure is a miss and the LLM is called.
+"""
+from __future__ import annotations
+import json
+import threading
+from typing import Dict, Optional
+
+from redis import asyncio as aioredis
+
+from backend.rag.chunking import normalize_text, sha256_of
+
+
+RESPONSE_CACHE_TTL = 86400
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, int] = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "errors": 0}
+
+
+def version_key(project_id: str) -> str:
+    return f"project:{project_id}:version"
+
+
+def response_key(project_id: str, model: str, system_prompt: str, context: str, version: str) -> str:
+    digest = sha256_of("\x1f".join([model, system_prompt, normalize_text(context), str(version)]))
+    return f"project:{project_id}:llm:{digest}"
+
+
+def record(event: str) -> None:
+    with _stats_lock:
+        _stats[event] += 1
+
+
+def stats() -> Dict[str, object]:
+    with _stats_lock:
+        s = dict(_stats)
+    lookups = s["exact_hits"] + s["similar_hits"] + s["misses"]
+    s["hit_rate"] = round((s["exact_hits"] + s["similar_hits"]) / lookups, 3) if lookups else None
+    return s
+
+
+async def project_version(redis: aioredis.Redis, project_id: str) -> str:
+    try:
+        return await redis.get(version_key(project_id)) or "0"
+    except Exception as e:
+        print(f'Project version lookup failed for {project_id}: {e}')
+        record("errors")
+        return "0"
+
+
+async def bump_project_version(redis: aioredis.Redis, project_id: str) -> None:
+    """Invalidate every cached response of the project (called when the project text changes)."""
+    await redis.incr(version_key(project_id))
+
+
+async def get_response(redis: aioredis.Redis, key: str) -> Optional[dict]:
+    try:
+        raw = await redis.get(key)
+    except Exception as e:
+        print(f'Response cache lookup failed for {key}: {e}')
+        record("errors")
+        return None
+    if not raw:
+        return None
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        return None
+
+
+async def put_response(redis: aioredis.Redis, key: str, ai_description: str, story_points: int,
+                       model: str, ttl: int = RESPONSE_CACHE_TTL) -> None:
+    value = json.dumps({"ai_description": ai_description, "story_points": story_points, "model": model})
+    try:
+        await redis.set(key, value, ex=ttl)
+    except Exception as e:
+        print(f'Response cache write failed for {key}: {e}')
+        record("errors")
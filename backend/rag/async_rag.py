@@ -0,0 +1,162 @@
+from __future__ import annotations
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from backend.core.config import get_settings
+from .retriever import RAGService
+from ..types.types import (
+    IndexProjectRequest, IndexEnrichedTaskRequest,
+    RetrieveRequest, RetrieveResponse
+)
+
+
+settings = get_settings()
+
+
+class AsyncRAGService:
+    """
+    Async facade over RAGService for the async services and routes.
+
+    Every call (ONNX embedding, Chroma SQLite I/O) runs on a bounded thread pool
+    shared by the whole process, so a slow index no longer blocks the event loop.
+    Queue depth and timings are available through `stats()`.
+    """
+
+    _executor: Optional[ThreadPoolExecutor] = None
+    _executor_lock = threading.Lock()
+    _stats_lock = threading.Lock()
+    _stats: Dict[str, float] = {
+        "submitted": 0, "completed": 0, "failed": 0,
+        "queued": 0, "running": 0, "max_queued": 0,
+        "wait_ms_total": 0.0, "run_ms_total": 0.0,
+    }
+
+    def __init__(self, rag: Optional[RAGService] = None):
+        self.rag = rag or RAGService()
+
+
+    @classmethod
+    def executor(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ThreadPoolExecutor(
+                        max_workers=settings.RAG_MAX_WORKERS, thread_name_prefix="rag"
+                    )
+        return cls._executor
+
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """Stop the worker threads (called on app shutdown)."""
+        with cls._executor_lock:
+            if cls._executor is not None:
+                cls._executor.shutdown(wait=True, cancel_futures=True)
+                cls._executor = None
+
+
+    @classmethod
+    def stats(cls) -> Dict[str, object]:
+        with cls._stats_lock:
+            s = dict(cls._stats)
+        done = s["completed"] + s["failed"]
+        return {
+            "max_workers": settings.RAG_MAX_WORKERS,
+            "submitted": int(s["submitted"]),
+            "completed": int(s["completed"]),
+            "failed": int(s["failed"]),
+            "queued": int(s["queued"]),
+            "running": int(s["running"]),
+            "max_queued": int(s["max_queued"]),
+            "avg_wait_ms": round(s["wait_ms_total"] / done, 2) if done else None,
+            "avg_run_ms": round(s["run_ms_total"] / done, 2) if done else None,
+        }
+
+
+    @classmethod
+    def _bump(cls, **deltas: float) -> None:
+        with cls._stats_lock:
+            for k, v in deltas.items():
+                cls._stats[k] += v
+            cls._stats["max_queued"] = max(cls._stats["max_queued"], cls._stats["queued"])
+
+
+    async def _run(self, fn: Callable, *args, **kwargs):
+        submitted_at = time.perf_counter()
+        self._bump(submitted=1, queued=1)
+
+        def job():
+            started_at = time.perf_counter()
+            self._bump(queued=-1, running=1, wait_ms_total=(started_at - submitted_at) * 1000)
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                self._bump(
+                    running=-1,
+                    completed=1 if ok else 0,
+                    failed=0 if ok else 1,
+                    run_ms_total=(time.perf_counter() - started_at) * 1000,
+                )
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor(), job)
+
+
+    async def index_project(self, req: IndexProjectRequest, incremental: bool = True):
+        return await self._run(self.rag.index_project, req, incremental=incremental)
+
+
+    async def index_task(self, req: IndexEnrichedTaskRequest, incremental: bool = True):
+        return await self._run(self.rag.index_task, req, incremental=incremental)
+
+
+    async def index_tasks_batch(self, reqs: List[IndexEnrichedTaskRequest], batch_size: Optional[int] = None,
+                                workers: Optional[int] = None):
+        return await self._run(self.rag.index_tasks_batch, reqs, batch_size=batch_size, workers=workers)
+
+
+    async def index_projects_batch(self, reqs: List[IndexProjectRequest], batch_size: Optional[int] = None,
+                                   workers: Optional[int] = None):
+        return await self._run(self.rag.index_projects_batch, reqs, batch_size=batch_size, workers=workers)
+
+
+    async def retrieve(self, req: RetrieveRequest) -> RetrieveResponse:
+        return await self._run(self.rag.retrieve, req)
+
+
+    async def get_project_by_id(self, projectId: str) -> str:
+        return await self._run(self.rag.get_project_by_id, projectId)
+
+
+    async def get_previous_tasks(self, projectId: str):
+        return await self._run(self.rag.get_previous_tasks, projectId)
+
+
+    async def get_previous_task_texts(self, projectId: str) -> Dict[str, str]:
+        return await self._run(self.rag.get_previous_task_texts, projectId)
+
+
+    async def find_similar_task(self, projectId: str, title: str, user_description: str,
+                                min_similarity: float, exclude_task_id: Optional[str] = None):
+        return await self._run(
+            self.rag.find_similar_task, projectId, title, user_description,
+            min_similarity, exclude_task_id=exclude_task_id
+        )
+
+
+    async def delete_task(self, projectId: str, taskId: str) -> int:
+        return await self._run(self.rag.delete_task, projectId=projectId, taskId=taskId)
+
+
+    async def delete_project(self, projectId: str) -> None:
+        return await self._run(self.rag.delete_project, projectId=projectId)
+
+
+    async def prewarm_collections(self, projectIds: List[str]) -> int:
+        return await self._run(self.rag.prewarm_collections, projectIds)
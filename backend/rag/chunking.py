@@ -1,9 +1,18 @@
 from __future__ import annotations
 import re, hashlib
-from typing import List
+import multiprocessing
+import threading
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Tuple
 
 _SENT_SPLIT = re.compile(r"(?<=[.!?])\s+")
 _WS = re.compile(r"\s+")
+# sentence ends in normalized text (single spaces only): no lookbehind, much faster to scan
+_SENT_END = re.compile(r"[.!?] ")
 
 def normalize_text(text: str) -> str:
     """
@@ -11,7 +20,8 @@ def normalize_text(text: str) -> str:
     Makes sure words are separated by only one space.
     """
     text = text or ""
-    return _WS.sub(" ", text.strip())
+    # str.split() and \s use the same definition of whitespace: same result as _WS.sub, faster
+    return " ".join(text.split())
 
 def sha256_of(text: str) -> str:
     """
@@ -20,6 +30,61 @@ def sha256_of(text: str) -> str:
     """
     return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
+def _iter_sentences(text: str) -> Iterator[str]:
+    """Sentences of a normalized text, same as _SENT_SPLIT.split but lazy."""
+    start = 0
+    for m in _SENT_END.finditer(text):
+        yield text[start:m.start() + 1]
+        start = m.end()
+    if start < len(text):
+        yield text[start:]
+
+
+def _pack(units: Iterable[Tuple[str, int]], max_size: int, overlap_size: int) -> Iterator[str]:
+    """
+    Greedy packing of (sentence, size) into chunks of at most `max_size`,
+    consecutive chunks sharing trailing sentences up to `overlap_size`.
+
+    Sizes are kept in a compact array and the current chunk is a deque of
+    sentence indexes: the overlap is what stays in the deque after popping
+    from the left, so each chunk costs time linear in its own size.
+    """
+    sents: List[str] = []
+    sizes = array("I")
+
+    window: Deque[int] = deque()
+    used = 0
+    for i, (sent, size) in enumerate(units):
+        sents.append(sent)
+        sizes.append(size)
+        if used + size > max_size and window:
+            yield " ".join(sents[j] for j in window)
+            # overlap: the longest run of trailing sentences that fits in overlap_size
+            keep, used = 0, 0
+            for j in reversed(window):
+                if used + sizes[j] > overlap_size:
+                    break
+                keep += 1
+                used += sizes[j]
+            while len(window) > keep:
+                window.popleft()
+        window.append(i)
+        used += size
+    if window:
+        yield " ".join(sents[j] for j in window)
+
+
+def iter_chunks(text: str, max_words: int = 220, overlap_words: int = 40) -> Iterator[str]:
+    """
+    Same chunks as chunk_text, yielded one at a time.
+    Every sentence is counted once: the text is normalized, so its words are its spaces + 1.
+    """
+    text = normalize_text(text)
+    if not text:
+        return
+    yield from _pack(((s, s.count(" ") + 1) for s in _iter_sentences(text)), max_words, overlap_words)
+
+
 def chunk_text(text: str, max_words: int = 220, overlap_words: int = 40) -> List[str]:
     """
     Split long text into smaller chunks so the AI can process them easily.
@@ -27,28 +92,157 @@ def chunk_text(text: str, max_words: int = 220, overlap_words: int = 40) -> List
     Each chunk has a maximum number of words.
     Some overlap is kept between chunks to preserve meaning.
     """
+    return list(iter_chunks(text, max_words, overlap_words))
+
+
+@lru_cache(maxsize=1)
+def embedding_tokenizer() -> Any:
+    """
+    The wordpiece tokenizer of the default Chroma embedding model (all-MiniLM-L6-v2),
+    loaded once, without the truncation / padding the embedding function applies.
+    """
+    from tokenizers import Tokenizer
+    from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+
+    path = ONNXMiniLM_L6_V2.DOWNLOAD_PATH / ONNXMiniLM_L6_V2.EXTRACTED_FOLDER_NAME / "tokenizer.json"
+    if not path.exists():
+        ONNXMiniLM_L6_V2()._download_model_if_not_exists()
+    tokenizer = Tokenizer.from_file(str(path))
+    tokenizer.no_truncation()
+    tokenizer.no_padding()
+    return tokenizer
+
+
+def _split_long_sentence(sent: str, encoding: Any, max_tokens: int) -> Iterator[Tuple[str, int]]:
+    """Cut a sentence over the token limit into pieces, at word boundaries when possible."""
+    offsets, words = encoding.offsets, encoding.word_ids
+    n, start = len(offsets), 0
+    while start < n:
+        end = min(start + max_tokens, n)
+        if end < n:
+            cut = end
+            while cut > start + 1 and words[cut] == words[cut - 1]:
+                cut -= 1
+            # a single word longer than the limit is cut inside the word
+            end = cut if words[cut] != words[cut - 1] else end
+        yield sent[offsets[start][0]:offsets[end - 1][1]], end - start
+        start = end
+
+
+def iter_token_chunks(
+        text: str,
+        max_tokens: int = 256,
+        overlap_tokens: int = 48,
+        tokenizer: Optional[Any] = None
+) -> Iterator[str]:
+    """
+    Chunks sized in tokens of the embedding model instead of words.
+
+    `max_tokens` is the model input limit: 2 tokens are left for [CLS] / [SEP],
+    so no chunk gets truncated by the embedding function, and chunks are packed
+    up to the limit. Sentences are tokenized once, in a batch; a BERT-style
+    tokenizer splits on whitespace first, so the tokens of a chunk are the sum
+    of the tokens of its sentences.
+    """
     text = normalize_text(text)
     if not text:
-        return []
-    sents = [s.strip() for s in _SENT_SPLIT.split(text) if s.strip()]
-    chunks: List[str] = []
-    cur: List[str] = []
-    cur_words = 0
-    for sent in sents:
-        w = len(sent.split())
-        if cur_words + w > max_words and cur:
-            chunks.append(" ".join(cur))
-            # overlap
-            overlap, ow = [], 0
-            for t in reversed(cur):
-                tw = len(t.split())
-                if ow + tw > overlap_words: break
-                overlap.insert(0, t); ow += tw
-            cur = overlap + [sent]
-            cur_words = sum(len(t.split()) for t in cur)
-        else:
-            cur.append(sent)
-            cur_words += w
-    if cur:
-        chunks.append(" ".join(cur))
-    return chunks
+        return
+    if tokenizer is None:
+        tokenizer = embedding_tokenizer()
+    budget = max(1, max_tokens - 2)
+    overlap = min(overlap_tokens, budget)
+
+    sents = list(_iter_sentences(text))
+    encodings = tokenizer.encode_batch(sents, add_special_tokens=False)
+
+    def units() -> Iterator[Tuple[str, int]]:
+        for sent, enc in zip(sents, encodings):
+            if len(enc.ids) > budget:
+                yield from _split_long_sentence(sent, enc, budget)
+            else:
+                yield sent, len(enc.ids)
+
+    yield from _pack(units(), budget, overlap)
+
+
+def chunk_by_tokens(
+        text: str,
+        max_tokens: int = 256,
+        overlap_tokens: int = 48,
+        tokenizer: Optional[Any] = None
+) -> List[str]:
+    """Split text into chunks that fit the embedding model input (see iter_token_chunks)."""
+    return list(iter_token_chunks(text, max_tokens, overlap_tokens, tokenizer))
+
+
+def chunk_and_hash(text: str, mode: str = "words", max_tokens: int = 256, overlap_tokens: int = 48) -> List[Tuple[str, str]]:
+    """[(chunk, sha256 of the chunk)] of a text, in the given CHUNK_MODE."""
+    if mode == "tokens":
+        chunks = chunk_by_tokens(text, max_tokens, overlap_tokens)
+    else:
+        chunks = chunk_text(text)
+    return [(ch, sha256_of(ch)) for ch in chunks]
+
+
+def _chunk_and_hash_job(args: Tuple[str, str, int, int]) -> List[Tuple[str, str]]:
+    return chunk_and_hash(*args)
+
+
+def chunk_and_hash_many(
+        texts: List[str],
+        mode: str = "words",
+        max_tokens: int = 256,
+        overlap_tokens: int = 48,
+        workers: int = 0
+) -> List[List[Tuple[str, str]]]:
+    """
+    chunk_and_hash of many texts, in order.
+    With `workers` > 1 the texts are spread over a process pool (worth it for
+    thousands of documents: chunking and hashing are CPU-bound and hold the GIL).
+    """
+    jobs = [(text, mode, max_tokens, overlap_tokens) for text in texts]
+    if workers <= 1 or len(texts) < 2 * workers:
+        return [_chunk_and_hash_job(job) for job in jobs]
+    pool = _chunk_pool(workers)
+    try:
+        return list(pool.map(_chunk_and_hash_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+    except BrokenProcessPool:
+        # a worker died: the next call starts a new pool
+        _drop_chunk_pool(pool)
+        raise
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _chunk_pool(workers: int) -> ProcessPoolExecutor:
+    """The chunking pool, started once and kept: spawning workers costs an interpreter start each."""
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is not None and _pool_workers != workers:
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            # spawn: the parent runs threads (Chroma, ONNX, asyncio), forking them is unsafe
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def _drop_chunk_pool(pool: ProcessPoolExecutor) -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+def shutdown_chunk_pool() -> None:
+    """Stop the chunking worker processes (called on app shutdown)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,112 @@
+"""
+Bounded cache of Chroma collection handles, keyed by collection name.
+
+`get_or_create_collection` reads Chroma's SQLite catalog and binds the
+embedding function again on every call; every VectorStore read and write
+starts with one. The handle of a collection stays valid until the collection
+is dropped, so the handles of the most recently used ones are kept.
+"""
+from __future__ import annotations
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional
+
+
+class CollectionCache:
+    """
+    LRU of collection handles. `loader(name)` opens a handle on a miss.
+
+    Misses are loaded under the lock, and `drop` runs the deletion under it
+    too: a handle opened by a concurrent miss cannot outlive the collection
+    it points to.
+    """
+
+    def __init__(self, loader: Callable[[str], object], max_entries: int = 256):
+        self._loader = loader
+        self.max_entries = max_entries
+        self._handles: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {
+            "hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "prewarmed": 0,
+        }
+
+
+    def get(self, name: str):
+        key = str(name)
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None:
+                self._handles.move_to_end(key)
+                self._counts["hits"] += 1
+                return handle
+            self._counts["misses"] += 1
+            handle = self._loader(key)
+            self._store(key, handle)
+            return handle
+
+
+    def _store(self, key: str, handle: object) -> None:
+        if self.max_entries <= 0:
+            return
+        self._handles[key] = handle
+        self._handles.move_to_end(key)
+        while len(self._handles) > self.max_entries:
+            self._handles.popitem(last=False)
+            self._counts["evictions"] += 1
+
+
+    def drop(self, name: str, delete: Optional[Callable[[], None]] = None) -> None:
+        """Forget a handle; `delete` (dropping its collection) runs under the lock."""
+        with self._lock:
+            if self._handles.pop(str(name), None) is not None:
+                self._counts["invalidations"] += 1
+            if delete is not None:
+                delete()
+
+
+    def prewarm(self, names: Iterable[str], opener: Callable[[str], Optional[object]]) -> int:
+        """
+        Cache the handles of existing collections, most important first.
+        `opener` returns None for collections that do not exist (nothing is created).
+        Returns how many handles were loaded.
+        """
+        loaded = 0
+        for name in names:
+            key = str(name)
+            if loaded >= self.max_entries:
+                break
+            with self._lock:
+                if key in self._handles:
+                    continue
+                handle = opener(key)
+                if handle is None:
+                    continue
+                self._store(key, handle)
+                # hottest come first: the later (colder) ones are evicted first
+                self._handles.move_to_end(key, last=False)
+                loaded += 1
+                self._counts["prewarmed"] += 1
+        return loaded
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._handles.clear()
+
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            c = dict(self._counts)
+            entries = len(self._handles)
+        lookups = c["hits"] + c["misses"]
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            # every hit is a catalog lookup (get_or_create_collection) avoided
+            "catalog_lookups_avoided": c["hits"],
+            "catalog_lookups": c["misses"],
+            "hit_rate": round(c["hits"] / lookups, 3) if lookups else None,
+            "evictions": c["evictions"],
+            "invalidations": c["invalidations"],
+            "prewarmed": c["prewarmed"],
+        }
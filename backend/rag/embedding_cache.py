@@ -0,0 +1,253 @@
+from __future__ import annotations
+import os, json, atexit, hashlib, threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from filelock import FileLock, Timeout
+from chromadb.api.types import Documents, Embeddings, EmbeddingFunction
+from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+from chromadb.utils.embedding_functions.onnx_mini_lm_l6_v2 import ONNXMiniLM_L6_V2
+
+from .chunking import sha256_of
+
+
+# locks of the cache directories claimed by this process, held until it exits
+_claimed: List[FileLock] = []
+
+
+def claim_cache_dir(base_dir: str, max_workers: int = 64) -> str:
+    """
+    A directory of `base_dir` for this process alone: worker-{n} for the first n
+    whose lock no other process holds. EmbeddingCache keeps its index in
+    memory, so two processes (uvicorn workers) sharing one directory would
+    overwrite each other's vectors. A restarted worker takes a free directory
+    back, with the vectors its previous owner left there.
+    """
+    os.makedirs(base_dir, exist_ok=True)
+    for n in range(max_workers):
+        lock = FileLock(os.path.join(base_dir, f"worker-{n}.lock"))
+        try:
+            lock.acquire(timeout=0)
+        except Timeout:
+            continue
+        _claimed.append(lock)
+        return os.path.join(base_dir, f"worker-{n}")
+    raise RuntimeError(f"No free embedding cache directory in {base_dir} ({max_workers} processes use it)")
+
+
+class EmbeddingCache:
+    """
+    File-backed LRU cache of embedding vectors, keyed by the sha256 of the text.
+
+    Vectors live in a float32 memory-mapped array (one row per slot),
+    the index (hash -> slot, in LRU order) is a small JSON file next to it.
+    When the cache is full the least recently used slot is reused.
+    One process per directory (see claim_cache_dir).
+
+    The index is only flushed every `flush_every` puts, so after a crash it
+    can point a key at a slot that was reused since. Each slot therefore
+    also records a tag of the key it holds (a second memory-mapped array,
+    written with the vector), and a lookup whose tag does not match is a miss.
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    KEYS_FILE = "keys.bin"
+    INDEX_FILE = "index.json"
+    TAG_SIZE = 16
+
+    def __init__(self, path: str, max_entries: int = 50_000, flush_every: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        self.flush_every = flush_every
+        self.dim: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._free: List[int] = []
+        self._vectors: Optional[np.memmap] = None
+        self._tags: Optional[np.memmap] = None
+        self._dirty = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.path, exist_ok=True)
+        self._load()
+        atexit.register(self.flush)
+
+
+    def _load(self) -> None:
+        """Reopen a cache left by a previous run (ignored if it does not match the settings)."""
+        index_path = os.path.join(self.path, self.INDEX_FILE)
+        if not os.path.exists(index_path):
+            return
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if index.get("max_entries") != self.max_entries or not index.get("dim"):
+            return
+        try:
+            self._open_vectors(int(index["dim"]), mode="r+")
+        except (OSError, ValueError):
+            self.dim, self._vectors, self._tags = None, None, None
+            return
+        for key, slot in index.get("entries", []):
+            self._lru[key] = int(slot)
+        used = set(self._lru.values())
+        self._free = [s for s in range(self.max_entries - 1, -1, -1) if s not in used]
+
+
+    def _open_vectors(self, dim: int, mode: str) -> None:
+        self.dim = dim
+        self._vectors = np.memmap(
+            os.path.join(self.path, self.VECTORS_FILE),
+            dtype=np.float32, mode=mode, shape=(self.max_entries, dim),
+        )
+        self._tags = np.memmap(
+            os.path.join(self.path, self.KEYS_FILE),
+            dtype=np.uint8, mode=mode, shape=(self.max_entries, self.TAG_SIZE),
+        )
+        if mode == "w+":
+            self._free = list(range(self.max_entries - 1, -1, -1))
+
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors for the keys that are present."""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                slot = self._lru.get(key)
+                if slot is not None and bytes(self._tags[slot]) != self._tag(key):
+                    # the slot was reused after the index on disk was written
+                    del self._lru[key]
+                    self._free.append(slot)
+                    slot = None
+                if slot is None:
+                    self.misses += 1
+                    continue
+                self._lru.move_to_end(key)
+                found[key] = np.array(self._vectors[slot], dtype=np.float32)
+                self.hits += 1
+        return found
+
+
+    def put_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        """Store vectors, evicting the least recently used entries when full."""
+        if not vectors:
+            return
+        with self._lock:
+            for key, vec in vectors.items():
+                vec = np.asarray(vec, dtype=np.float32).ravel()
+                if self._vectors is None:
+                    self._open_vectors(vec.shape[0], mode="w+")
+                if vec.shape[0] != self.dim:
+                    continue
+                slot = self._lru.get(key)
+                if slot is None:
+                    if self._free:
+                        slot = self._free.pop()
+                    else:
+                        _, slot = self._lru.popitem(last=False)
+                        self.evictions += 1
+                # clear the tag first: a crash mid-write leaves a miss, not a wrong vector
+                self._tags[slot] = 0
+                self._vectors[slot] = vec
+                self._tags[slot] = np.frombuffer(self._tag(key), dtype=np.uint8)
+                self._lru[key] = slot
+                self._lru.move_to_end(key)
+                self._dirty += 1
+            if self._dirty >= self.flush_every:
+                self._flush_locked()
+
+
+    @classmethod
+    def _tag(cls, key: str) -> bytes:
+        return hashlib.blake2b(key.encode("utf-8"), digest_size=cls.TAG_SIZE).digest()
+
+
+    def flush(self) -> None:
+        """Persist the vectors and the LRU index to disk."""
+        with self._lock:
+            self._flush_locked()
+
+
+    def _flush_locked(self) -> None:
+        if self._vectors is None:
+            return
+        self._vectors.flush()
+        self._tags.flush()
+        index = {
+            "dim": self.dim,
+            "max_entries": self.max_entries,
+            "entries": [[k, s] for k, s in self._lru.items()],
+        }
+        tmp_path = os.path.join(self.path, self.INDEX_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, os.path.join(self.path, self.INDEX_FILE))
+        self._dirty = 0
+
+
+    def stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._lru),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+        }
+
+
+class CachedEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Default (all-MiniLM-L6-v2) embedding function with an EmbeddingCache in front.
+
+    It reports the "default" name/config so existing collections accept it,
+    and only the texts missing from the cache are sent to the model.
+    (It must not subclass DefaultEmbeddingFunction: Chroma ignores those
+    and rebuilds the default one from the collection config.)
+    """
+
+    def __init__(self, cache: EmbeddingCache, inner=None) -> None:
+        # one model instance for the process instead of a new ONNX session per call
+        self.inner = inner or ONNXMiniLM_L6_V2()
+        self.cache = cache
+
+
+    def __call__(self, input: Documents) -> Embeddings:
+        keys = [sha256_of(text) for text in input]
+        found = self.cache.get_many(keys)
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, input):
+            if key not in found and key not in missing:
+                missing[key] = text
+
+        if missing:
+            computed = self.inner(list(missing.values()))
+            fresh = {key: np.asarray(vec, dtype=np.float32) for key, vec in zip(missing, computed)}
+            self.cache.put_many(fresh)
+            found.update(fresh)
+
+        return [found[key] for key in keys]
+
+
+    @staticmethod
+    def name() -> str:
+        return DefaultEmbeddingFunction.name()
+
+
+    def get_config(self) -> Dict[str, Any]:
+        return {}
+
+
+    @staticmethod
+    def build_from_config(config: Dict[str, Any]) -> "EmbeddingFunction[Documents]":
+        return DefaultEmbeddingFunction()
+
+
+    def max_tokens(self) -> int:
+        return self.inner.max_tokens()
@@ -0,0 +1,253 @@
+"""
+In-process BM25 index of the chunks of each project, for hybrid retrieval.
+
+Task titles full of identifiers (ticket keys, API names, error codes) are poorly
+served by MiniLM embeddings; exact term matching finds them. The index of a
+project is built from its Chroma collection the first time it is searched,
+then kept up to date by the VectorStore writes of this process, and rebuilt
+when another process wrote to the project (see write_generations).
+"""
+from __future__ import annotations
+import heapq
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+# identifiers stay whole (abc-123, get_user, v2.1, e1001) and are also split in parts
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_PART = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+# metadata kept per chunk, enough to apply the retrieval filters
+FILTER_FIELDS = ("type", "status", "taskId")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase terms of a text: words and identifiers, plus the parts of each identifier."""
+    terms: List[str] = []
+    for m in _TOKEN.finditer((text or "").lower()):
+        token = m.group(0)
+        if token in STOP_WORDS:
+            continue
+        terms.append(token)
+        parts = _PART.findall(token)
+        if len(parts) > 1:
+            terms.extend(p for p in parts if p not in STOP_WORDS)
+    return terms
+
+
+class BM25Index:
+    """
+    Inverted index (term -> {chunk id: term frequency}) with Okapi BM25 scoring.
+    Adding a chunk id that already exists replaces it.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, max_df: float = 0.5, prune_min_docs: int = 1000):
+        self.k1 = k1
+        self.b = b
+        # in large indexes, terms in more than `max_df` of the chunks are skipped at query
+        # time: their idf is close to 0 and their postings are the longest to score
+        self.max_df = max_df
+        self.prune_min_docs = prune_min_docs
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_terms: Dict[str, Tuple[str, ...]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._metadata: Dict[str, Dict[str, object]] = {}
+        self._total_len = 0
+        # write generation of the project this index reflects
+        self.generation = 0
+        self._lock = threading.Lock()
+
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, object]] = None) -> None:
+        terms = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[doc_id] = tf
+            self._doc_terms[doc_id] = tuple(terms)
+            length = sum(terms.values())
+            self._doc_len[doc_id] = length
+            self._total_len += length
+            self._metadata[doc_id] = {k: (metadata or {}).get(k) for k in FILTER_FIELDS}
+
+
+    def update_metadata(self, doc_id: str, metadata: Dict[str, object]) -> None:
+        with self._lock:
+            if doc_id in self._metadata:
+                self._metadata[doc_id].update({k: v for k, v in metadata.items() if k in FILTER_FIELDS})
+
+
+    def remove(self, doc_ids: Iterable[str]) -> None:
+        with self._lock:
+            for doc_id in doc_ids:
+                self._remove(doc_id)
+
+
+    def _remove(self, doc_id: str) -> None:
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+        self._metadata.pop(doc_id, None)
+
+
+    def search(
+            self,
+            query: str,
+            k: int = 12,
+            accept: Optional[Callable[[Dict[str, object]], bool]] = None
+    ) -> List[Tuple[str, float]]:
+        """Top `k` (chunk id, BM25 score), best first, among the chunks whose metadata `accept`s."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._doc_len)
+            if not n or not terms:
+                return []
+            avg_len = self._total_len / n or 1.0
+            k1, b, doc_len = self.k1, self.b, self._doc_len
+            max_postings = self.max_df * n if n >= self.prune_min_docs else n
+            scores: Dict[str, float] = {}
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting or len(posting) > max_postings:
+                    continue
+                idf = math.log(1.0 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = k1 * (1.0 - b + b * doc_len[doc_id] / avg_len)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm)
+            if accept is not None:
+                metadata = self._metadata
+                candidates = ((d, s) for d, s in scores.items() if accept(metadata[d]))
+            else:
+                candidates = scores.items()
+            return heapq.nlargest(k, candidates, key=lambda item: item[1])
+
+
+class LexicalIndexes:
+    """
+    LRU of the BM25 indexes of the projects searched by this process.
+
+    Only projects that were loaded (searched once) are maintained: writes to
+    other projects are ignored, their index is built from Chroma when needed.
+    """
+
+    def __init__(self, max_projects: int = 64) -> None:
+        self.max_projects = max_projects
+        self._indexes: "OrderedDict[str, BM25Index]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+
+    def get(self, project_id: str) -> Optional[BM25Index]:
+        key = str(project_id)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None:
+                self._indexes.move_to_end(key)
+            return index
+
+
+    def _peek(self, project_id: str) -> Optional[BM25Index]:
+        # writes keep the index up to date without making it recently used
+        with self._lock:
+            return self._indexes.get(str(project_id))
+
+
+    def load(
+            self,
+            project_id: str,
+            docs: Iterable[Tuple[str, str, Dict[str, object]]],
+            generation: int = 0,
+    ) -> BM25Index:
+        """Build (or rebuild) the index of a project from its (id, text, metadata) chunks."""
+        index = BM25Index()
+        index.generation = generation
+        for doc_id, text, metadata in docs:
+            index.add(doc_id, text, metadata)
+        if self.max_projects <= 0:
+            return index
+        key = str(project_id)
+        with self._lock:
+            self._indexes[key] = index
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_projects:
+                self._indexes.popitem(last=False)
+                self._evictions += 1
+        return index
+
+
+    def drop(self, project_id: str) -> None:
+        with self._lock:
+            self._indexes.pop(str(project_id), None)
+
+
+    def advance(self, project_id: str, generation: int) -> None:
+        """
+        A write of this process (already applied to the index) moved the project
+        to `generation`: the index stays current, unless another process wrote
+        in between and the index missed it.
+        """
+        index = self._peek(project_id)
+        if index is not None and index.generation == generation - 1:
+            index.generation = generation
+
+
+    def upsert(self, project_id: str, items: List[Dict[str, object]]) -> None:
+        index = self._peek(project_id)
+        if index is not None:
+            for it in items:
+                index.add(str(it["id"]), str(it["text"]), it.get("metadata"))
+
+
+    def update_metadatas(self, project_id: str, items: List[Dict[str, object]]) -> None:
+        index = self._peek(project_id)
+        if index is not None:
+            for it in items:
+                index.update_metadata(str(it["id"]), it.get("metadata") or {})
+
+
+    def delete(self, project_id: str, ids: Iterable[str]) -> None:
+        index = self._peek(project_id)
+        if index is not None:
+            index.remove(str(i) for i in ids)
+
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            indexes = dict(self._indexes)
+            evictions = self._evictions
+        return {
+            "projects": len(indexes),
+            "max_projects": self.max_projects,
+            "evictions": evictions,
+            "chunks": sum(len(i) for i in indexes.values()),
+        }
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked id lists: score(id) = sum over the lists of 1 / (k + rank), rank from 1.
+    Best first; ties keep the order of first appearance.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
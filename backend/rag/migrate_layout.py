@@ -0,0 +1,87 @@
+"""
+Copy the vector data of every project from one storage layout to another.
+
+    python -m backend.rag.migrate_layout --to sharded --shards 64
+    python -m backend.rag.migrate_layout --from sharded --to per_project --delete-source
+
+Chunks are copied with their stored embeddings (nothing is embedded again)
+and upserted, so an interrupted run can simply be started again. Both
+layouts live side by side in CHROMA_DIR: set VECTOR_LAYOUT (and VECTOR_SHARDS)
+to the target once the copy is done, then run again with --delete-source,
+or delete the source layout by hand.
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import Dict, Iterable, Optional
+
+from backend.core.config import get_settings
+from .vector_layout import PER_PROJECT, SHARDED
+from .vector_store import VectorStore, VSConfig
+
+
+settings = get_settings()
+
+
+def migrate_layout(
+        source: VectorStore,
+        target: VectorStore,
+        project_ids: Optional[Iterable[str]] = None,
+        page_size: int = 1000,
+        delete_source: bool = False,
+) -> Dict[str, object]:
+    """
+    Copy the chunks of `project_ids` (default: every project of `source`) into `target`.
+    Returns {"projects", "chunks", "elapsed_s"}.
+    """
+    started = time.perf_counter()
+    project_ids = list(project_ids) if project_ids is not None else source.project_ids()
+    page_size = min(page_size, target.max_batch_size())
+    chunks = 0
+    for n, project_id in enumerate(project_ids, start=1):
+        for items, embeddings in source.export_project(project_id, page_size=page_size):
+            chunks += target.upsert_texts(project_id, items, embeddings=embeddings)
+        if delete_source:
+            source.delete_project(project_id)
+        if n % 500 == 0:
+            print(f'Migrated {n}/{len(project_ids)} projects, {chunks} chunks')
+    return {
+        "projects": len(project_ids),
+        "chunks": chunks,
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    }
+
+
+def _store(layout: str, shards: int) -> VectorStore:
+    # nothing is embedded, the embedding cache stays with the app
+    return VectorStore(VSConfig(
+        persist_dir=settings.CHROMA_DIR,
+        collection_cache_size=settings.COLLECTION_CACHE_SIZE,
+        layout=layout,
+        shards=shards,
+    ))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from", dest="source", choices=[PER_PROJECT, SHARDED], default=settings.VECTOR_LAYOUT)
+    parser.add_argument("--to", dest="target", choices=[PER_PROJECT, SHARDED], required=True)
+    parser.add_argument("--shards", type=int, default=settings.VECTOR_SHARDS, help="shards of the target layout")
+    parser.add_argument("--source-shards", type=int, default=settings.VECTOR_SHARDS)
+    parser.add_argument("--project", action="append", help="only these projects (repeatable)")
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--delete-source", action="store_true", help="drop each project from the source once copied")
+    args = parser.parse_args()
+
+    if args.source == args.target and (args.target == PER_PROJECT or args.shards == args.source_shards):
+        parser.error("source and target layouts are the same")
+
+    source = _store(args.source, args.source_shards)
+    target = _store(args.target, args.shards)
+    stats = migrate_layout(source, target, args.project, args.page_size, args.delete_source)
+    print(f'Migrated {stats["projects"]} projects ({stats["chunks"]} chunks) '
+          f'from {args.source} to {args.target} in {stats["elapsed_s"]} s')
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,28 @@
 from __future__ import annotations
-from typing import List, Dict, Optional
+import time
+from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass, field
-from .chunking import chunk_text, normalize_text, sha256_of
+import numpy as np
+from .chunking import chunk_by_tokens, chunk_and_hash_many, chunk_text, normalize_text, sha256_of
 from .vector_store import VectorStore
+from .lexical_index import reciprocal_rank_fusion
+from ..core.config import get_settings
 from ..types.types import (
     IndexProjectRequest, IndexEnrichedTaskRequest,
     RetrieveRequest, RetrieveResponse, ContextChunk
 )
 
 
+settings = get_settings()
+
+
+def chunk(text: str) -> List[str]:
+    """Chunk a text for embedding, by words or by model tokens (Settings.CHUNK_MODE)."""
+    if settings.CHUNK_MODE == "tokens":
+        return chunk_by_tokens(text, settings.EMBED_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS)
+    return chunk_text(text)
+
+
 @dataclass
 class RAGService:
 # before
@@ -32,31 +46,172 @@ class RAGService:
         return cls._instance
 
 
-    def index_project(self, req: IndexProjectRequest):
-        """Save a new project in the vector store."""
-        text = f"{req.name}. {req.description}"
-        chunks = chunk_text(text)
-        items = [{
+    def index_project(self, req: IndexProjectRequest, incremental: bool = True):
+        """
+        Save a new project in the vector store.
+        With `incremental`, chunks whose hash did not change are not embedded again.
+        """
+        items = self._project_items(req)
+
+        if not incremental:
+            inserted = self.vs.upsert_texts(req.projectId, items)
+            return {"chunks_indexed": inserted, "skipped": 0}
+
+        return self._sync_chunks(req.projectId, items, where={"type": "project"})
+
+
+    def index_task(self, req: IndexEnrichedTaskRequest, incremental: bool = True):
+        """
+        Save or update a task with all its details.
+        With `incremental`, chunks whose hash did not change are not embedded again.
+        """
+        items = self._task_items(req)
+
+        if not incremental or not req.taskId:
+            inserted = self.vs.upsert_texts(req.projectId, items)
+            return {"chunks_indexed": inserted, "skipped": 0}
+
+        return self._sync_chunks(req.projectId, items, where={"taskId": req.taskId})
+
+
+    def index_tasks_batch(
+            self,
+            reqs: List[IndexEnrichedTaskRequest],
+            batch_size: Optional[int] = None,
+            workers: Optional[int] = None
+    ):
+        """
+        Index many tasks at once (bulk import, project reindex).
+        All tasks are chunked and hashed in one pass (over `workers` processes,
+        default Settings.INDEX_CHUNK_WORKERS) and written to Chroma in batches of
+        `batch_size` (default: the largest batch Chroma accepts), so the embedding
+        model runs once per batch instead of once per task.
+        As in index_task, unchanged chunks are not embedded again and task
+        chunks that no longer exist (shorter text) are removed.
+        """
+        chunked = self._chunk_many([self._task_text(req) for req in reqs], workers)
+
+        by_project: Dict[str, Dict[str, Dict]] = {}
+        task_ids: Dict[str, Dict[str, None]] = {}
+        for req, chunks in zip(reqs, chunked):
+            items = by_project.setdefault(req.projectId, {})
+            # a task listed twice: the last version wins (Chroma rejects duplicate ids in a write)
+            for it in self._task_items(req, chunks):
+                items[it["id"]] = it
+            if req.taskId:
+                task_ids.setdefault(req.projectId, {})[req.taskId] = None
+
+        # the stored chunks of every task of the batch, in one lookup per project
+        wheres = {pid: {"taskId": {"$in": list(ids)}} for pid, ids in task_ids.items()}
+        return self._sync_batches({pid: list(items.values()) for pid, items in by_project.items()}, wheres, batch_size)
+
+
+    def index_projects_batch(
+            self,
+            reqs: List[IndexProjectRequest],
+            batch_size: Optional[int] = None,
+            workers: Optional[int] = None
+    ):
+        """
+        Index the project texts of many projects at once (see index_tasks_batch).
+        Unchanged chunks are skipped, project chunks that no longer exist
+        (shorter description) are removed.
+        """
+        chunked = self._chunk_many([self._project_text(req) for req in reqs], workers)
+        by_project = {req.projectId: self._project_items(req, chunks) for req, chunks in zip(reqs, chunked)}
+        wheres = {pid: {"type": "project"} for pid in by_project}
+        return self._sync_batches(by_project, wheres, batch_size)
+
+
+    def _chunk_many(self, texts: List[str], workers: Optional[int] = None) -> List[List[Tuple[str, str]]]:
+        """[(chunk, hash)] per text, in a process pool when more than one worker is configured."""
+        workers = settings.INDEX_CHUNK_WORKERS if workers is None else workers
+        if workers > 1:
+            return chunk_and_hash_many(
+                texts, settings.CHUNK_MODE, settings.EMBED_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS, workers
+            )
+        return [[(ch, sha256_of(ch)) for ch in chunk(text)] for text in texts]
+
+
+    def _sync_batches(
+            self,
+            by_project: Dict[str, List[Dict]],
+            wheres: Dict[str, Dict[str, object]],
+            batch_size: Optional[int] = None
+    ):
+        """
+        _sync_chunks for many projects: the stored chunks matching `wheres[project]`
+        are compared by hash, only new or changed chunks are embedded (in batches).
+        """
+        to_write: Dict[str, List[Dict]] = {}
+        skipped = 0
+        for project_id, items in by_project.items():
+            where = wheres.get(project_id)
+            existing = self.vs.get_chunk_metadatas(project_id, where=where) if where else {}
+            to_embed, to_refresh, orphans = self._diff_chunks(existing, items)
+            self.vs.update_metadatas(project_id, to_refresh)
+            self.vs.delete_ids(project_id, orphans)
+            to_write[project_id] = to_embed
+            skipped += len(items) - len(to_embed)
+
+        result = self._write_batches(to_write, batch_size)
+        result["skipped"] = skipped
+        return result
+
+
+    def _write_batches(self, by_project: Dict[str, List[Dict]], batch_size: Optional[int] = None):
+        """
+        Upsert the items of each project in batches of `batch_size`.
+        Identical chunks of a batch (copied descriptions, templated tasks) are embedded once.
+        """
+        batch_size = batch_size or self.vs.max_batch_size()
+
+        inserted, embedded = 0, 0
+        for project_id, items in by_project.items():
+            for start in range(0, len(items), batch_size):
+                batch = items[start:start + batch_size]
+                unique: Dict[str, str] = {}
+                for it in batch:
+                    unique.setdefault(it["metadata"]["hash"], it["text"])
+                vectors = dict(zip(unique, self.vs.embed_texts(list(unique.values()))))
+                inserted += self.vs.upsert_texts(
+                    project_id, batch, embeddings=[vectors[it["metadata"]["hash"]] for it in batch]
+                )
+                embedded += len(unique)
+        return {"chunks_indexed": inserted, "deduplicated": inserted - embedded}
+
+
+    @staticmethod
+    def _project_text(req: IndexProjectRequest) -> str:
+        return f"{req.name}. {req.description}"
+
+
+    def _project_items(self, req: IndexProjectRequest, chunks: Optional[List[Tuple[str, str]]] = None) -> List[Dict]:
+        """Chunk a project and build the vector store items (id, text, metadata)."""
+        if chunks is None:
+            chunks = [(ch, sha256_of(ch)) for ch in chunk(self._project_text(req))]
+        return [{
             "id": f"proj-{req.projectId}-{i}",
             "text": ch,
             "metadata": {
                 "projectId": req.projectId, "type": "project",
                 "taskId": None, "title": req.name,
                 "status": req.status, "epic": None,
-                "hash": sha256_of(ch),
+                "hash": h,
             },
-        } for i, ch in enumerate(chunks)]
-        inserted = self.vs.upsert_texts(req.projectId, items)
+        } for i, (ch, h) in enumerate(chunks)]
 
-        return {"chunks_indexed": inserted, "skipped": 0}
 
+    @staticmethod
+    def _task_text(req: IndexEnrichedTaskRequest) -> str:
+        return " \n".join([f for f in [req.task_title, req.user_description, req.ai_description] if f])
 
-    def index_task(self, req: IndexEnrichedTaskRequest):
-        """Save or update a task with all its details."""
 
-        merged = " \n".join([f for f in [req.task_title, req.user_description, req.ai_description] if f])
-        chunks = chunk_text(merged)
-        items = [{
+    def _task_items(self, req: IndexEnrichedTaskRequest, chunks: Optional[List[Tuple[str, str]]] = None) -> List[Dict]:
+        """Chunk a task and build the vector store items (id, text, metadata)."""
+        if chunks is None:
+            chunks = [(ch, sha256_of(ch)) for ch in chunk(self._task_text(req))]
+        return [{
             "id": f"task-{req.taskId}-{i}",
             "text": ch,
             "metadata": {
@@ -69,17 +224,59 @@ class RAGService:
                 "user_description": req.user_description,
                 "ai_description": req.ai_description,
                 "story_points": req.story_points,
-                "hash": sha256_of(ch),
+                "hash": h,
             },
-        } for i, ch in enumerate(chunks)]
+        } for i, (ch, h) in enumerate(chunks)]
+
+
+    def _sync_chunks(self, projectId: str, items: List[Dict], where: Dict[str, object]):
+        """
+        Incremental indexing: compare the new chunks with the stored ones by hash.
+
+        - new or changed chunks are embedded and upserted
+        - unchanged chunks only get their metadata refreshed (no embedding)
+        - trailing chunks that no longer exist (text got shorter) are deleted
+        """
+        existing = self.vs.get_chunk_metadatas(projectId, where=where)
+        to_embed, to_refresh, orphans = self._diff_chunks(existing, items)
+
+        inserted = self.vs.upsert_texts(projectId, to_embed)
+        self.vs.update_metadatas(projectId, to_refresh)
+        self.vs.delete_ids(projectId, orphans)
+
+        return {"chunks_indexed": inserted, "skipped": len(items) - len(to_embed)}
 
-        inserted = self.vs.upsert_texts(req.projectId, items)
-        return {"chunks_indexed": inserted, "skipped": 0}
+
+    @staticmethod
+    def _diff_chunks(existing: Dict[str, Dict], items: List[Dict]) -> Tuple[List[Dict], List[Dict], List[str]]:
+        """(items to embed, items whose metadata changed, ids of stored chunks no longer in `items`)."""
+        to_embed, to_refresh = [], []
+        for it in items:
+            old_md = existing.get(it["id"])
+            if not old_md or old_md.get("hash") != it["metadata"]["hash"]:
+                to_embed.append(it)
+                continue
+            new_md = {k: v for k, v in it["metadata"].items() if v is not None}
+            if new_md == old_md:
+                continue
+            if set(old_md) - set(new_md):
+                # a field was cleared; metadata update merges keys, so rewrite the chunk
+                to_embed.append(it)
+            else:
+                to_refresh.append(it)
+
+        new_ids = {it["id"] for it in items}
+        orphans = [cid for cid in existing if cid not in new_ids]
+        return to_embed, to_refresh, orphans
 
     def retrieve(self, req: RetrieveRequest) -> RetrieveResponse:
         """
         Search the vector store for text that is similar to a given task.
         Used to give the AI extra context about the project.
+
+        In "hybrid" mode (Settings.RETRIEVAL_MODE) the vector ranking is fused
+        with a BM25 ranking of the same chunks, so exact identifiers in the
+        title (ticket keys, API names, error codes) are found as well.
         """
         query = normalize_text("\n".join([
             req.title,
@@ -87,22 +284,35 @@ class RAGService:
             f"Epic: {req.epic}" if req.epic else "",
             "Goal: estimate story points & expand acceptance criteria."
         ]))
+        k = max(12, 2 * req.top_k)
         raw = self.vs.query(
             project_id=req.projectId,
             query_text=query,
-            k=12,
+            k=k,
             where={"status": {"$ne": "archived"}},
         )
-        ids = raw.get("ids", [[]])[0]
+        ids = [str(cid) for cid in raw.get("ids", [[]])[0]]
         docs = raw.get("documents", [[]])[0]
         metas = raw.get("metadatas", [[]])[0]
-        k_final = min(6, len(ids))
+        stats: Dict[str, object] = {
+            "collection": self.vs.collection_name(req.projectId),
+            "took_ms": raw.get("timings", {}).get("query", None),
+        }
+
+        if settings.RETRIEVAL_MODE == "hybrid":
+            found = {cid: (doc, md or {}) for cid, doc, md in zip(ids, docs, metas)}
+            ranked, stats["fused"], stats["lexical_ms"] = self._fuse(req, ids, k)
+            missing = [cid for cid in ranked[:req.top_k] if cid not in found]
+            found.update(self.vs.get_documents(req.projectId, missing))
+            selected = [(cid, *found[cid]) for cid in ranked[:req.top_k] if cid in found]
+        else:
+            selected = list(zip(ids, docs, (md or {} for md in metas)))[:req.top_k]
+
         contexts: List[ContextChunk] = []
-        for i in range(k_final):
-            md = metas[i] or {}
+        for cid, doc, md in selected:
             contexts.append(ContextChunk(
-                doc_id=str(ids[i]),
-                text=str(docs[i]),
+                doc_id=cid,
+                text=str(doc),
                 type=md.get("type", "task"),
                 taskId=md.get("taskId"),
                 status=md.get("status"),
@@ -111,13 +321,35 @@ class RAGService:
             ))
         return RetrieveResponse(
             contexts=contexts,
-            retrieval_stats={
-                "k": len(contexts),
-                "collection": f"proj_{req.projectId}",
-                "took_ms": raw.get("timings", {}).get("query", None),
-            },
+            retrieval_stats={"k": len(contexts), **stats},
         )
-    
+
+
+    def _fuse(self, req: RetrieveRequest, vector_ids: List[str], k: int):
+        """
+        Reciprocal rank fusion of the vector ranking with the BM25 ranking.
+        Returns (fused chunk ids best first, fused scores of the top_k, lexical search ms).
+        """
+        started = time.perf_counter()
+        lexical_query = " ".join([req.title, req.user_description, req.epic or ""])
+        hits = self.vs.lexical_index(req.projectId).search(
+            lexical_query, k, accept=lambda md: md.get("status") != "archived"
+        )
+        lexical_ids = [cid for cid, _ in hits]
+        lexical_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        fused = reciprocal_rank_fusion([vector_ids, lexical_ids], k=settings.RRF_K)
+        vector_rank = {cid: r for r, cid in enumerate(vector_ids, start=1)}
+        lexical_rank = {cid: r for r, cid in enumerate(lexical_ids, start=1)}
+        scores = [{
+            "doc_id": cid,
+            "score": round(score, 6),
+            "vector_rank": vector_rank.get(cid),
+            "lexical_rank": lexical_rank.get(cid),
+        } for cid, score in fused[:req.top_k]]
+        return [cid for cid, _ in fused], scores, lexical_ms
+
+
     """
     Deterministric project retrieval
     
@@ -126,14 +358,8 @@ class RAGService:
         """
         Retrieve the project chunks (deterministically) for a given projectId.
         """
-        
-        raw = self.vs.query(
-            project_id=projectId,
-            query_text="",  # no semantic filter
-            k=50,
-            where={"type": "project"}
-        )
-        docs = raw.get("documents", [[]])[0]
+        res = self.vs.get(projectId, where={"type": "project"}, include=["documents"])
+        docs = res.get("documents") or []
         text = "\n".join(docs) if docs else ""
         return text
     
@@ -145,17 +371,92 @@ class RAGService:
 
     def get_previous_tasks(self, projectId: str):
         """
-        Retrieve all previously indexed task chunks under the given projectId.
+        Retrieve all previously indexed task chunks under the given projectId,
+        ordered by task and chunk.
         """
+        res = self.vs.get(projectId, where={"type": "task"}, include=["documents"])
+        docs = res.get("documents") or []
+        return docs  # return as a list of text chunks
+
+
+    def get_previous_task_texts(self, projectId: str) -> Dict[str, str]:
+        """
+        Retrieve the indexed task chunks under the given projectId, joined per task.
+        Returns {taskId: text}.
+        """
+        res = self.vs.get(projectId, where={"type": "task"})
+        ids = res.get("ids") or []
+        docs = res.get("documents") or []
+        metas = res.get("metadatas") or [None] * len(docs)
+
+        parts: Dict[str, List[tuple]] = {}
+        for cid, doc, md in zip(ids, docs, metas):
+            task_id = str((md or {}).get("taskId") or cid)
+            idx = int(cid.rsplit("-", 1)[-1]) if cid.rsplit("-", 1)[-1].isdigit() else 0
+            parts.setdefault(task_id, []).append((idx, doc))
+        return {tid: "\n".join(doc for _, doc in sorted(chunks)) for tid, chunks in parts.items()}
 
+
+    def find_similar_task(self, projectId: str, title: str, user_description: str,
+                          min_similarity: float, exclude_task_id: Optional[str] = None,
+                          candidates: int = 5) -> Optional[Dict[str, object]]:
+        """
+        Find an already enriched task that is a near duplicate of the given one.
+
+        The stored task chunks also hold the AI description, which the new task
+        does not have yet, so their distance to the query understates how close
+        two tasks are. They only pick the `candidates` nearest tasks; those are
+        scored by the cosine similarity of the same text on both sides (title +
+        user description, embedded through the embedding cache).
+        Returns {taskId, similarity, ai_description, story_points} or None.
+        """
+        query = self._similarity_text(title, user_description)
+        if not query:
+            return None
         raw = self.vs.query(
             project_id=projectId,
-            query_text="",  # return all
-            k=50,
-            where={"type": "task"}
+            query_text=query,
+            k=candidates,
+            where={"type": "task"},
         )
-        docs = raw.get("documents", [[]])[0]
-        return docs  # return as a list of text chunks
+
+        found: Dict[str, Tuple[Dict, str]] = {}
+        for md in raw.get("metadatas", [[]])[0] or []:
+            md = md or {}
+            task_id = md.get("taskId")
+            if task_id is None or task_id in found:
+                continue
+            if exclude_task_id is not None and str(task_id) == str(exclude_task_id):
+                continue
+            if not md.get("ai_description") or md.get("story_points") is None:
+                continue
+            text = self._similarity_text(md.get("title"), md.get("user_description"))
+            if text:
+                found[task_id] = (md, text)
+        if not found:
+            return None
+
+        vectors = np.asarray(self.vs.embed_texts([query] + [text for _, text in found.values()]), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1)
+        norms[norms == 0] = 1.0
+        similarities = (vectors[1:] @ vectors[0]) / (norms[1:] * norms[0])
+        best = int(np.argmax(similarities))
+        similarity = float(similarities[best])
+        if similarity < min_similarity:
+            return None
+
+        md, _ = list(found.values())[best]
+        return {
+            "taskId": md.get("taskId"),
+            "similarity": round(similarity, 4),
+            "ai_description": md["ai_description"],
+            "story_points": int(md["story_points"]),
+        }
+
+
+    @staticmethod
+    def _similarity_text(title: Optional[str], user_description: Optional[str]) -> str:
+        return normalize_text(" \n".join([f for f in [title, user_description] if f]))
 
 
     def delete_task(self, projectId: str, taskId: str) -> int:
@@ -171,3 +472,10 @@ class RAGService:
         Delete all RAG data associated with a specific project.
         """
         self.vs.delete_project(project_id=projectId)
+
+
+    def prewarm_collections(self, projectIds: List[str]) -> int:
+        """
+        Open the collections of the given projects (hottest first) ahead of their first request.
+        """
+        return self.vs.prewarm_collections(projectIds)
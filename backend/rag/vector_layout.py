@@ -0,0 +1,140 @@
+"""
+Storage layouts of the project chunks in Chroma.
+
+per_project  one collection per project (proj_{projectId}), the default.
+sharded      a fixed number of shared collections; a project lives in the
+             shard picked by a stable hash of its id, its chunks carry the
+             projectId metadata every read filters on, and their ids are
+             prefixed with the project id so they stay unique in the shard.
+
+With tens of thousands of projects, the per-project layout means as many
+HNSW indexes and segment directories (start up time, open files, memory);
+the sharded one keeps them at the shard count.
+
+The layouts translate between what VectorStore callers see (project id,
+chunk ids, filters) and what is stored, so nothing above VectorStore
+depends on the layout.
+"""
+from __future__ import annotations
+import hashlib
+from typing import Dict, Iterable, List, Optional
+
+
+PER_PROJECT = "per_project"
+SHARDED = "sharded"
+
+
+class PerProjectLayout:
+    """One collection per project, chunks stored as is."""
+
+    name = PER_PROJECT
+    # deleting a project drops its collection
+    collection_per_project = True
+
+
+    def collection_name(self, project_id: str) -> str:
+        return f"proj_{project_id}"
+
+
+    def where(self, project_id: str, where: Optional[Dict[str, object]] = None) -> Optional[Dict[str, object]]:
+        return where or None
+
+
+    def store_id(self, project_id: str, chunk_id: str) -> str:
+        return str(chunk_id)
+
+
+    def chunk_id(self, project_id: str, store_id: str) -> str:
+        return str(store_id)
+
+
+    def metadata(self, project_id: str, metadata: Dict[str, object]) -> Dict[str, object]:
+        return metadata
+
+
+    def project_ids(self, client) -> List[str]:
+        """Projects stored in this layout (one per proj_ collection)."""
+        return sorted(
+            c.name[len("proj_"):] for c in client.list_collections() if c.name.startswith("proj_")
+        )
+
+
+class ShardedLayout:
+    """`shards` shared collections, projects routed by a hash of their id."""
+
+    name = SHARDED
+    collection_per_project = False
+    _SEP = "::"
+
+
+    def __init__(self, shards: int = 64):
+        if shards < 1:
+            raise ValueError(f"shards must be >= 1, got {shards}")
+        self.shards = shards
+
+
+    def shard_of(self, project_id: str) -> int:
+        """Stable across processes and restarts (unlike hash())."""
+        digest = hashlib.blake2b(str(project_id).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big") % self.shards
+
+
+    def collection_name(self, project_id: str) -> str:
+        # the shard count is part of the name: changing it needs a migration, not a silent re-route
+        return self.shard_name(self.shard_of(project_id))
+
+
+    def shard_name(self, shard: int) -> str:
+        return f"shard{self.shards}_{shard:04d}"
+
+
+    def where(self, project_id: str, where: Optional[Dict[str, object]] = None) -> Dict[str, object]:
+        scope = {"projectId": str(project_id)}
+        return {"$and": [scope, where]} if where else scope
+
+
+    def store_id(self, project_id: str, chunk_id: str) -> str:
+        return f"{project_id}{self._SEP}{chunk_id}"
+
+
+    def chunk_id(self, project_id: str, store_id: str) -> str:
+        prefix = f"{project_id}{self._SEP}"
+        store_id = str(store_id)
+        return store_id[len(prefix):] if store_id.startswith(prefix) else store_id
+
+
+    def metadata(self, project_id: str, metadata: Dict[str, object]) -> Dict[str, object]:
+        # the filter value is always a string, whatever type the caller used
+        return {**(metadata or {}), "projectId": str(project_id)}
+
+
+    def project_ids(self, client, page_size: int = 1000) -> List[str]:
+        """Projects stored in this layout (distinct projectId of every shard)."""
+        names = {self.shard_name(i) for i in range(self.shards)}
+        found = set()
+        for coll in client.list_collections():
+            if coll.name not in names:
+                continue
+            coll = client.get_collection(coll.name)
+            offset = 0
+            while True:
+                page = coll.get(include=["metadatas"], limit=page_size, offset=offset)
+                metas = page.get("metadatas") or []
+                found.update(str(md["projectId"]) for md in metas if md and md.get("projectId") is not None)
+                if len(metas) < page_size:
+                    break
+                offset += len(metas)
+        return sorted(found)
+
+
+def make_layout(name: str, shards: int = 64):
+    """Layout from its settings name."""
+    if name == SHARDED:
+        return ShardedLayout(shards)
+    if name == PER_PROJECT:
+        return PerProjectLayout()
+    raise ValueError(f"Unknown vector layout {name!r}, expected {PER_PROJECT!r} or {SHARDED!r}")
+
+
+def chunk_ids(layout, project_id: str, store_ids: Iterable[str]) -> List[str]:
+    return [layout.chunk_id(project_id, sid) for sid in store_ids]
@@ -1,66 +1,251 @@
 from __future__ import annotations
-from typing import List, Optional, Dict
+import os
+from typing import List, Optional, Dict, Sequence, Tuple
 from dataclasses import dataclass
 import chromadb
 from chromadb.utils import embedding_functions
 from backend.core.config import get_settings
+from .embedding_cache import EmbeddingCache, CachedEmbeddingFunction, claim_cache_dir
+from .lexical_index import BM25Index, LexicalIndexes
+from .collection_cache import CollectionCache
+from .vector_layout import PER_PROJECT, chunk_ids, make_layout
+from .write_generations import WriteGenerations
 
 
 settings = get_settings()
 
 
+def chunk_sort_key(chunk_id: str) -> Tuple[str, int, str]:
+    """Order of chunk ids: by document, then by chunk index as a number."""
+    prefix, _, index = chunk_id.rpartition("-")
+    if index.isdigit():
+        return prefix, int(index), ""
+    return chunk_id, -1, chunk_id
+
+
 @dataclass
 class VSConfig:
     """Configuration for Chroma (the AI vector database)."""
     persist_dir: str
+    embedding_cache_dir: Optional[str] = None
+    embedding_cache_max_entries: int = 50_000
+    collection_cache_size: int = 256
+    layout: str = PER_PROJECT
+    shards: int = 64
+    lexical_index_max_projects: int = 64
 
 class VectorStore:
     """
     A small helper class to communicate with ChromaDB.
 
     It stores text chunks and can search them by similarity.
-    Each project has its own "collection" (memory shelf).
+    Each project has its own "collection" (memory shelf), or shares one of a
+    fixed number of shard collections in the "sharded" layout (see vector_layout).
     """
     
     def __init__(self, cfg: Optional[VSConfig] = None):
-        self.cfg = cfg or VSConfig(persist_dir=settings.CHROMA_DIR)
+        self.cfg = cfg or VSConfig(
+            persist_dir=settings.CHROMA_DIR,
+            embedding_cache_dir=settings.EMBEDDING_CACHE_DIR or None,
+            embedding_cache_max_entries=settings.EMBEDDING_CACHE_MAX_ENTRIES,
+            collection_cache_size=settings.COLLECTION_CACHE_SIZE,
+            layout=settings.VECTOR_LAYOUT,
+            shards=settings.VECTOR_SHARDS,
+            lexical_index_max_projects=settings.LEXICAL_INDEX_MAX_PROJECTS,
+        )
+        self.layout = make_layout(self.cfg.layout, self.cfg.shards)
         self.client = chromadb.PersistentClient(path=self.cfg.persist_dir)
-        self.embed = embedding_functions.DefaultEmbeddingFunction()
+        self.embedding_cache: Optional[EmbeddingCache] = None
+        if self.cfg.embedding_cache_dir:
+            self.embedding_cache = EmbeddingCache(
+                claim_cache_dir(self.cfg.embedding_cache_dir), max_entries=self.cfg.embedding_cache_max_entries
+            )
+            self.embed = CachedEmbeddingFunction(self.embedding_cache)
+        else:
+            self.embed = embedding_functions.DefaultEmbeddingFunction()
+        # BM25 indexes of the projects searched in hybrid mode, kept in sync by the writes below
+        self.lexical = LexicalIndexes(max_projects=self.cfg.lexical_index_max_projects)
+        # per-project write counters shared with the other processes on this CHROMA_DIR
+        self.generations = WriteGenerations(os.path.join(self.cfg.persist_dir, "write_generations"))
+        # handles of the recently used collections, skipping the catalog lookup of each call
+        self.collections = CollectionCache(self._open_collection, max_entries=self.cfg.collection_cache_size)
+
+
+    def embedding_cache_stats(self) -> Dict[str, object]:
+        """Hit/miss counters of the embedding cache (empty when disabled)."""
+        return self.embedding_cache.stats() if self.embedding_cache else {}
+
+
+    def _open_collection(self, name: str):
+        return self.client.get_or_create_collection(name=name, embedding_function=self.embed)
+
+
+    def collection_name(self, project_id: str) -> str:
+        return self.layout.collection_name(project_id)
 
 
     def _collection(self, project_id: str):
-        """Get or create the Chroma collection for this project."""
-        return self.client.get_or_create_collection(
-            name=f"proj_{project_id}", embedding_function=self.embed
-        )
+        """Get or create the Chroma collection for this project (cached handle)."""
+        return self.collections.get(self.collection_name(project_id))
 
 
-    def upsert_texts(self, project_id: str, items: List[Dict[str, object]]) -> int:
+    def _where(self, project_id: str, where: Optional[Dict[str, object]] = None) -> Optional[Dict[str, object]]:
+        """`where` scoped to the project (only needed when collections are shared)."""
+        return self.layout.where(project_id, where)
+
+
+    def _store_ids(self, project_id: str, ids) -> List[str]:
+        return [self.layout.store_id(project_id, str(i)) for i in ids]
+
+
+    def _written(self, project_id: str) -> None:
+        """Count a write to the project, after the local BM25 index got it."""
+        self.lexical.advance(project_id, self.generations.bump(project_id))
+
+
+    def prewarm_collections(self, project_ids: Sequence[str]) -> int:
+        """
+        Load the handles of the given projects' collections, hottest first.
+        Projects without a collection are skipped, none is created.
+        Returns how many handles were loaded.
+        """
+        def open_existing(name: str):
+            try:
+                return self.client.get_collection(name=name, embedding_function=self.embed)
+            except Exception:
+                return None
+
+        names = list(dict.fromkeys(self.collection_name(pid) for pid in project_ids))
+        return self.collections.prewarm(names, open_existing)
+
+
+    def upsert_texts(self, project_id: str, items: List[Dict[str, object]], embeddings: Optional[List] = None) -> int:
         """
         Save or update multiple text chunks at once.
         If the chunk already exists, it gets updated (upsert).
+        Precomputed `embeddings` (one per item) skip the embedding function.
         """
         if not items:
             return 0
         coll = self._collection(project_id)
         coll.upsert(
-            ids=[str(it["id"]) for it in items],
+            ids=self._store_ids(project_id, (it["id"] for it in items)),
             documents=[str(it["text"]) for it in items],
-            metadatas=[it["metadata"] for it in items],
+            metadatas=[self.layout.metadata(project_id, it["metadata"]) for it in items],
+            **({"embeddings": embeddings} if embeddings is not None else {}),
         )
+        self.lexical.upsert(project_id, items)
+        self._written(project_id)
         return len(items)
 
 
+    def embed_texts(self, texts: List[str]) -> List:
+        """Embed texts with the collections' embedding function (and its cache)."""
+        return list(self.embed(texts)) if texts else []
+
+
+    def max_batch_size(self) -> int:
+        """Largest number of records Chroma accepts in one write."""
+        return self.client.get_max_batch_size()
+
+
+    def update_metadatas(self, project_id: str, items: List[Dict[str, object]]) -> int:
+        """
+        Update only the metadata of existing chunks.
+        Documents are not sent, so nothing gets embedded again.
+        """
+        if not items:
+            return 0
+        coll = self._collection(project_id)
+        coll.update(
+            ids=self._store_ids(project_id, (it["id"] for it in items)),
+            metadatas=[self.layout.metadata(project_id, it["metadata"]) for it in items],
+        )
+        self.lexical.update_metadatas(project_id, items)
+        self._written(project_id)
+        return len(items)
+
+
+    def get(
+            self,
+            project_id: str,
+            where: Optional[Dict[str, object]] = None,
+            limit: Optional[int] = None,
+            offset: int = 0,
+            include: Sequence[str] = ("documents", "metadatas"),
+            page_size: int = 1000,
+    ) -> Dict[str, list]:
+        """
+        Deterministic read of the chunks matching `where`: no embedding, no similarity search.
+
+        Chunks are ordered by id, chunk index compared as a number (task-T1-2
+        before task-T1-10), and `limit` / `offset` page through that order.
+        Only the ids are listed first; documents / metadatas are then fetched
+        for the requested page, `page_size` ids per Chroma call.
+        Returns {"ids": [...], "documents": [...], "metadatas": [...]} (the included keys).
+        """
+        coll = self._collection(project_id)
+        where = self._where(project_id, where)
+        filters = {"where": where} if where else {}
+
+        store_ids: List[str] = []
+        while True:
+            page = coll.get(include=[], limit=page_size, offset=len(store_ids), **filters)
+            page_ids = [str(cid) for cid in page.get("ids") or []]
+            store_ids.extend(page_ids)
+            if len(page_ids) < page_size:
+                break
+        ids = sorted(chunk_ids(self.layout, project_id, store_ids), key=chunk_sort_key)
+        ids = ids[offset:] if limit is None else ids[offset:offset + limit]
+
+        out: Dict[str, list] = {"ids": ids, **{key: [] for key in include}}
+        if not ids or not include:
+            return out
+        for start in range(0, len(ids), page_size):
+            page_ids = ids[start:start + page_size]
+            page = coll.get(ids=self._store_ids(project_id, page_ids), include=list(include))
+            for key in include:
+                by_id = dict(zip(chunk_ids(self.layout, project_id, page.get("ids") or []), page.get(key) or []))
+                out[key].extend(by_id.get(cid) for cid in page_ids)
+        return out
+
+
+    def get_chunk_metadatas(self, project_id: str, where: Dict[str, object]) -> Dict[str, Dict[str, object]]:
+        """
+        Return {chunk_id: metadata} for every chunk matching `where`.
+        Only metadata is fetched (no documents or embeddings).
+        """
+        coll = self._collection(project_id)
+        results = coll.get(where=self._where(project_id, where), include=["metadatas"])
+        ids = chunk_ids(self.layout, project_id, results.get("ids") or [])
+        metas = results.get("metadatas") or []
+        return {cid: (md or {}) for cid, md in zip(ids, metas)}
+
+
+    def delete_ids(self, project_id: str, ids: List[str]) -> int:
+        """Remove the given chunk ids from the project collection."""
+        if not ids:
+            return 0
+        coll = self._collection(project_id)
+        coll.delete(ids=self._store_ids(project_id, ids))
+        self.lexical.delete(project_id, ids)
+        self._written(project_id)
+        return len(ids)
+
+
     def delete_by_task(self, project_id: str, task_id: str) -> int:
-        """Remove all chunks related to a specific task."""
+        """
+        Remove all chunks related to a specific task.
+        Only the ids matching the taskId filter are fetched, so the cost
+        depends on the task's chunk count, not on the collection size.
+        """
         coll = self._collection(project_id)
-        results = coll.get()
-        ids_to_del: List[str] = []
-        for i, md in enumerate(results.get("metadatas", [])):
-            if md and md.get("taskId") == task_id:
-                ids_to_del.append(results["ids"][i])
+        results = coll.get(where=self._where(project_id, {"taskId": task_id}), include=[])
+        ids_to_del: List[str] = list(results.get("ids") or [])
         if ids_to_del:
             coll.delete(ids=ids_to_del)
+            self.lexical.delete(project_id, chunk_ids(self.layout, project_id, ids_to_del))
+            self._written(project_id)
         return len(ids_to_del)
 
 
@@ -71,17 +256,122 @@ class VectorStore:
         Used when AI wants context about a task or project.
         """
         coll = self._collection(project_id)
-        return coll.query(query_texts=[query_text], n_results=k, where=where or {})
+        raw = coll.query(query_texts=[query_text], n_results=k, where=self._where(project_id, where) or {})
+        if not self.layout.collection_per_project:
+            raw["ids"] = [chunk_ids(self.layout, project_id, row) for row in raw.get("ids") or []]
+        return raw
+
+
+    def lexical_index(self, project_id: str, page_size: int = 1000) -> BM25Index:
+        """
+        BM25 index of the project chunks, built from the collection on first use.
+        It is rebuilt when the write generation of the project moved without it
+        (another process wrote to the project).
+        """
+        # read before the chunks: a write during the build makes the next call rebuild
+        generation = self.generations.get(project_id)
+        index = self.lexical.get(project_id)
+        if index is not None and index.generation == generation:
+            return index
+        coll = self._collection(project_id)
+        where = self._where(project_id)
+        filters = {"where": where} if where else {}
+
+        def documents():
+            offset = 0
+            while True:
+                page = coll.get(include=["documents", "metadatas"], limit=page_size, offset=offset, **filters)
+                ids = page.get("ids") or []
+                yield from zip(
+                    chunk_ids(self.layout, project_id, ids), page.get("documents") or [], page.get("metadatas") or []
+                )
+                if len(ids) < page_size:
+                    return
+                offset += len(ids)
+
+        return self.lexical.load(project_id, documents(), generation)
+
+
+    def get_documents(self, project_id: str, ids: List[str]) -> Dict[str, tuple]:
+        """Return {chunk_id: (document, metadata)} for the given ids."""
+        if not ids:
+            return {}
+        coll = self._collection(project_id)
+        results = coll.get(ids=self._store_ids(project_id, ids), include=["documents", "metadatas"])
+        return {
+            cid: (doc, md or {})
+            for cid, doc, md in zip(
+                chunk_ids(self.layout, project_id, results.get("ids") or []),
+                results.get("documents") or [],
+                results.get("metadatas") or [],
+            )
+        }
+
+
+    def count(self, project_id: str) -> int:
+        """
+        Number of chunks of the project.
+        In the sharded layout this lists the project ids (no count by filter in
+        Chroma), so it stays out of the query path.
+        """
+        coll = self._collection(project_id)
+        if self.layout.collection_per_project:
+            return coll.count()
+        return len(coll.get(where=self._where(project_id), include=[]).get("ids") or [])
+
+
+    def project_ids(self) -> List[str]:
+        """Ids of the projects stored in this layout."""
+        return self.layout.project_ids(self.client)
+
+
+    def export_project(self, project_id: str, page_size: int = 1000):
+        """
+        Yield the project chunks as (items, embeddings) pages, items as taken by
+        upsert_texts: stored embeddings are kept, nothing gets embedded again.
+        """
+        coll = self._collection(project_id)
+        where = self._where(project_id)
+        filters = {"where": where} if where else {}
+        offset = 0
+        while True:
+            page = coll.get(
+                include=["documents", "metadatas", "embeddings"], limit=page_size, offset=offset, **filters
+            )
+            ids = page.get("ids") or []
+            if ids:
+                items = [
+                    {"id": cid, "text": doc, "metadata": md or {}}
+                    for cid, doc, md in zip(
+                        chunk_ids(self.layout, project_id, ids), page.get("documents") or [], page.get("metadatas") or []
+                    )
+                ]
+                yield items, list(page.get("embeddings"))
+            if len(ids) < page_size:
+                return
+            offset += len(ids)
 
 
     def delete_project(self, project_id: str) -> None:
         """
         Delete all vector data for a given project by dropping its collection.
         """
-        collection_name = f"proj_{project_id}"
-        try:
-            self.client.delete_collection(name=collection_name)
-        except Exception:
-            # Ignore if collection is missing or Chroma errors.
-            pass
+        collection_name = self.collection_name(project_id)
+        self.lexical.drop(project_id)
+        if not self.layout.collection_per_project:
+            # shared shard: only the project's chunks go
+            self._collection(project_id).delete(where=self._where(project_id))
+            self._written(project_id)
+            return
+
+        def delete():
+            try:
+                self.client.delete_collection(name=collection_name)
+            except Exception:
+                # Ignore if collection is missing or Chroma errors.
+                pass
+
+        # the cached handle would point to the dropped collection
+        self.collections.drop(collection_name, delete)
+        self._written(project_id)
 
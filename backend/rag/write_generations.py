@@ -0,0 +1,75 @@
+"""
+Per-project write counters shared by every process using the same CHROMA_DIR.
+
+Each VectorStore write bumps the counter of its project. A process holding
+state derived from a project's chunks (the BM25 index of hybrid retrieval)
+compares the counter it saw when building that state with the current one:
+any write from any process, including the ones that keep the chunk count
+(metadata updates, re-upserted text), shows up as a different value.
+
+The counters live in a small memory-mapped file: reading one is a memory
+access, bumping one takes a file lock. Projects are hashed to a fixed number
+of slots; two projects sharing a slot only cause extra rebuilds.
+"""
+from __future__ import annotations
+import hashlib
+import mmap
+import os
+import struct
+import threading
+from typing import Optional
+
+from filelock import FileLock
+
+
+_SLOT = struct.Struct("<Q")
+
+
+class WriteGenerations:
+    """Write counters in `path` (created on first use), `slots` 8-byte slots."""
+
+    def __init__(self, path: str, slots: int = 65536):
+        if slots < 1:
+            raise ValueError(f"slots must be >= 1, got {slots}")
+        self.path = path
+        self.slots = slots
+        self._map: Optional[mmap.mmap] = None
+        self._file_lock = FileLock(f"{path}.lock")
+        self._lock = threading.Lock()
+
+
+    def _offset(self, project_id: str) -> int:
+        # stable across processes (unlike hash())
+        digest = hashlib.blake2b(str(project_id).encode("utf-8"), digest_size=8).digest()
+        return (int.from_bytes(digest, "big") % self.slots) * _SLOT.size
+
+
+    def _mapped(self) -> mmap.mmap:
+        if self._map is None:
+            with self._lock:
+                if self._map is None:
+                    os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                    size = self.slots * _SLOT.size
+                    with self._file_lock:
+                        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                        try:
+                            if os.fstat(fd).st_size < size:
+                                os.ftruncate(fd, size)
+                            self._map = mmap.mmap(fd, size)
+                        finally:
+                            os.close(fd)
+        return self._map
+
+
+    def get(self, project_id: str) -> int:
+        return _SLOT.unpack_from(self._mapped(), self._offset(project_id))[0]
+
+
+    def bump(self, project_id: str) -> int:
+        """Count a write to the project; returns the new value."""
+        mapped = self._mapped()
+        offset = self._offset(project_id)
+        with self._file_lock:
+            value = _SLOT.unpack_from(mapped, offset)[0] + 1
+            _SLOT.pack_into(mapped, offset, value)
+        return value
@@ -6,14 +6,17 @@ from backend.types.types import (
     EditProjectRequest,
     DeleteProjectRequest
 )
-from backend.rag.retriever import RAGService
+from backend.rag.async_rag import AsyncRAGService
 from backend.core.config import get_redis_client
+from backend.core.local_cache import context_invalidation
+from backend.model import response_cache
+from backend.service import task_cache
 
 
 class ProjectService:
 
     def __init__(self) -> None:
-        self._rag = RAGService()
+        self._rag = AsyncRAGService()
         self._supabase_client = None
         self._redis_client = None
 
@@ -43,7 +46,7 @@ class ProjectService:
 
             if response.data:
                 new_id = response.data[0]['id']
-                self._rag.index_project(
+                await self._rag.index_project(
                     IndexProjectRequest(
                         projectId=new_id,
                         userId=req.userId,
@@ -54,7 +57,7 @@ class ProjectService:
 
                 # cache newly created project
                 cache_key = f'user:{req.userId}:project:{new_id}:embeddings'
-                project_text = self._rag.get_project_by_id(new_id)
+                project_text = await self._rag.get_project_by_id(new_id)
                 await self._redis_client.setex(cache_key, 1800, project_text)                
 
                 return True
@@ -86,7 +89,7 @@ class ProjectService:
             if response.data:
                 row = response.data[0]
                 # resync project in RAG with latest update
-                self._rag.index_project(
+                await self._rag.index_project(
                     IndexProjectRequest(
                         projectId=row["id"],
                         userId=row.get("user_id", req.userId),
@@ -96,13 +99,24 @@ class ProjectService:
                     )
                 )
 
-                # invalidate cache before saving edited project
+                # the update is committed from here on: cache failures are logged, not returned
+                try:
+                    # enrichments generated with the old project text are stale now
+                    await response_cache.bump_project_version(self._redis_client, req.projectId)
+                except Exception as e:
+                    print(f'Response cache invalidation failed for project {req.projectId}: {e}')
+
                 cache_key=f'user:{req.userId}:project:{req.projectId}:embeddings'
-                await self._redis_client.delete(cache_key)
+                try:
+                    # invalidate cache before saving edited project
+                    await self._redis_client.delete(cache_key)
 
-                # cache edited project
-                edited_project_text = self._rag.get_project_by_id(req.projectId)
-                await self._redis_client.setex(cache_key, 1800, edited_project_text)
+                    # cache edited project
+                    edited_project_text = await self._rag.get_project_by_id(req.projectId)
+                    await self._redis_client.setex(cache_key, 1800, edited_project_text)
+                except Exception as e:
+                    print(f'Project cache refresh failed for project {req.projectId}: {e}')
+                await context_invalidation.publish(self._redis_client, cache_key)
 
                 return True
             else:
@@ -135,9 +149,13 @@ class ProjectService:
             print("Supabase delete response:", response.data)
 
         
-            self._rag.delete_project(str(req.projectId))
+            await self._rag.delete_project(str(req.projectId))
             cache_key = f"user:{req.userId}:project:{req.projectId}:embeddings"
-            await self._redis_client.delete(cache_key)
+            tasks_key = task_cache.texts_key(req.projectId)
+            await self._redis_client.delete(
+                cache_key, tasks_key, response_cache.version_key(req.projectId)
+            )
+            await context_invalidation.publish(self._redis_client, cache_key, tasks_key)
 
             return True
 
@@ -0,0 +1,76 @@
+"""
+Per-project task cache in Redis, stored as a hash keyed by taskId:
+
+  project:{id}:task_texts    taskId -> plain text used to build the LLM context
+
+Writes touch only the field of the task that changed, atomically, and the
+context reader fetches the texts without decoding any JSON.
+"""
+from __future__ import annotations
+from typing import Dict, List, Optional
+
+from redis import asyncio as aioredis
+
+
+TASK_CACHE_TTL = 1800
+
+# empty field keeping a "no tasks yet" hash alive, so it is not mistaken for a miss
+_EMPTY_FIELD = "_"
+
+# Insert / update task texts only if the project is cached. On a cold cache the
+# next read rebuilds the whole hash from RAG; writing just one task would
+# leave a partial list that looks like a hit.
+_UPSERT_IF_CACHED = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+for i = 2, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+def texts_key(project_id: str) -> str:
+    return f"project:{project_id}:task_texts"
+
+
+def build_entry(task_id, title: str, user_description: str | None, ai_description: str | None) -> dict:
+    """The cached form of a task: its id and its context text."""
+    text = "\n".join([title or "", user_description or "", ai_description or ""]).strip()
+    return {"taskId": task_id, "text": text}
+
+
+async def upsert_tasks(redis: aioredis.Redis, project_id: str, entries: List[dict], ttl: int = TASK_CACHE_TTL) -> bool:
+    """Insert or replace task texts in one atomic step. Returns False when the project is not cached."""
+    if not entries:
+        return False
+    args: List[object] = [ttl]
+    for e in entries:
+        args.extend([str(e["taskId"]).strip(), e["text"]])
+    script = redis.register_script(_UPSERT_IF_CACHED)
+    return bool(await script(keys=[texts_key(project_id)], args=args))
+
+
+async def remove_task(redis: aioredis.Redis, project_id: str, task_id) -> None:
+    """Drop one task from the cache."""
+    await redis.hdel(texts_key(project_id), str(task_id).strip())
+
+
+async def read_texts(redis: aioredis.Redis, project_id: str) -> Optional[List[str]]:
+    """Return the cached task texts, or None on a cache miss."""
+    values = await redis.hvals(texts_key(project_id))
+    if not values:
+        return None
+    return [v for v in values if v]
+
+
+async def fill_texts(redis: aioredis.Redis, project_id: str, texts: Dict[str, str], ttl: int = TASK_CACHE_TTL) -> None:
+    """Replace the context texts of a project after loading them from RAG."""
+    key = texts_key(project_id)
+    pipe = redis.pipeline(transaction=True)
+    pipe.delete(key)
+    pipe.hset(key, mapping={**{_EMPTY_FIELD: ""}, **texts})
+    pipe.expire(key, ttl)
+    await pipe.execute()
@@ -1,20 +1,24 @@
 from __future__ import annotations
-import json
+import time
+from typing import AsyncIterator, List
 from backend.types.types import (
     IndexEnrichedTaskRequest,
     EditEnrichedTaskRequest,
-    DeleteEnrichedTaskRequest
+    DeleteEnrichedTaskRequest,
+    BulkImportTask
 )
 
-from backend.rag.retriever import RAGService
+from backend.rag.async_rag import AsyncRAGService
 from backend.core.config import get_supabase_client
 from backend.core.config import get_redis_client
+from backend.core.local_cache import context_invalidation
+from backend.service import task_cache
 
 
 class TaskService:
 
     def __init__(self):
-        self._rag = RAGService()
+        self._rag = AsyncRAGService()
         self._supabase_client = None
         self._redis_client = None
 
@@ -49,7 +53,7 @@ class TaskService:
                 new_id = response.data[0]["id"]
 
                 # save newly created task in RAG
-                self._rag.index_task(
+                await self._rag.index_task(
                     IndexEnrichedTaskRequest(
                         taskId=new_id,
                         projectId=req.projectId,
@@ -62,36 +66,15 @@ class TaskService:
                     )
                 )
 
-                # cache newly created task
-                cache_key = f'project:{req.projectId}:tasks'
-                new_task_entry = {
-                    "taskId": new_id,
-                    "title": req.task_title,
-                    "user_description": req.user_description or "",
-                    "ai_description": req.ai_description or "",
-                    "text": "\n".join([
-                        req.task_title,
-                        req.user_description or "",
-                        req.ai_description or ""
-                    ]).strip(),
-                    "story_points": req.story_points
-                }
-
-                # get previously cached tasks
-                cached = await self._redis_client.get(cache_key)
-
-                if cached:
-                    try:
-                        tasks = json.loads(cached)
-                    except json.JSONDecodeError:
-                        # first task to be cached
-                        tasks = []
-                else:
-                    tasks = []
-
-                # append and re-cache
-                tasks.append(new_task_entry)
-                await self._redis_client.set(cache_key, json.dumps(tasks), ex=1800)
+                # cache newly created task (single hash field, no read-modify-write)
+                new_task_entry = task_cache.build_entry(
+                    new_id,
+                    req.task_title,
+                    req.user_description,
+                    req.ai_description
+                )
+                await task_cache.upsert_tasks(self._redis_client, req.projectId, [new_task_entry])
+                await context_invalidation.publish(self._redis_client, task_cache.texts_key(req.projectId))
 
                 return True
 
@@ -102,6 +85,100 @@ class TaskService:
             print(f"Unhandled exception in insert task: {e}")
             return False
 
+    async def bulk_import_tasks(self, project_id: str, tasks: AsyncIterator[BulkImportTask], batch_size: int = 500):
+        """
+        Import a stream of already written tasks (e.g. migrated from another tracker).
+
+        Tasks are inserted into Supabase `batch_size` rows at a time, each batch is
+        chunked and embedded in one go, and the project task cache is rebuilt once at the end.
+
+        `failed` counts tasks that could not be inserted. Tasks inserted but not
+        indexed count as `imported` and `index_failed`; their ids are listed in
+        `unindexed_ids` so they can be indexed again (retrying the import would
+        insert them twice).
+        """
+        await self.ensure_clients()
+        started = time.perf_counter()
+        stats = {"imported": 0, "failed": 0, "index_failed": 0, "unindexed_ids": [], "chunks_indexed": 0}
+        cache_entries: List[dict] = []
+
+        batch: List[BulkImportTask] = []
+        async for task in tasks:
+            batch.append(task)
+            if len(batch) >= batch_size:
+                await self._import_batch(project_id, batch, stats, cache_entries)
+                batch = []
+        if batch:
+            await self._import_batch(project_id, batch, stats, cache_entries)
+
+        if cache_entries:
+            # one atomic write; on a cold cache the next read rebuilds it from RAG, which has every task
+            await task_cache.upsert_tasks(self._redis_client, project_id, cache_entries)
+            await context_invalidation.publish(self._redis_client, task_cache.texts_key(project_id))
+
+        elapsed = time.perf_counter() - started
+        stats["elapsed_s"] = round(elapsed, 3)
+        stats["tasks_per_s"] = round(stats["imported"] / elapsed, 1) if elapsed > 0 else None
+        return stats
+
+
+    async def _import_batch(self, project_id: str, batch: List[BulkImportTask], stats: dict, cache_entries: List[dict]):
+        try:
+            response = (
+                self._supabase_client
+                .table("tasks")
+                .insert([
+                    {
+                        "project_id": project_id,
+                        "title": t.title,
+                        "description": t.description,
+                        "ai_description": t.ai_description,
+                        "story_points": t.story_points,
+                        "status": t.status,
+                    }
+                    for t in batch
+                ])
+            )
+            response = await response.execute()
+            rows = response.data or []
+        except Exception as e:
+            print(f"Unhandled exception in bulk import batch insert: {e}")
+            stats["failed"] += len(batch)
+            return
+
+        # rows come back in insertion order
+        reqs = [
+            IndexEnrichedTaskRequest(
+                taskId=row["id"],
+                projectId=project_id,
+                task_title=t.title,
+                user_description=t.description,
+                ai_description=t.ai_description,
+                epic=t.epic,
+                status=t.status,
+                story_points=t.story_points
+            )
+            for row, t in zip(rows, batch)
+        ]
+        # the rows exist in Supabase from here on, whatever happens to the indexing
+        stats["imported"] += len(reqs)
+        stats["failed"] += len(batch) - len(reqs)
+
+        try:
+            indexed = await self._rag.index_tasks_batch(reqs)
+        except Exception as e:
+            print(f"Unhandled exception in bulk import batch indexing: {e}")
+            stats["index_failed"] += len(reqs)
+            stats["unindexed_ids"].extend(r.taskId for r in reqs)
+            return
+
+        stats["chunks_indexed"] += indexed["chunks_indexed"]
+        cache_entries.extend(
+            task_cache.build_entry(r.taskId, r.task_title, r.user_description, r.ai_description)
+            for r in reqs
+        )
+
+
     # it doesn't overwrite the id/project_id in update data. After DB update -> it will call _rag.index_task with the latest row.
     # index_task uses upsert -> RAG is updated.
     async def update_task(self, req: EditEnrichedTaskRequest):
@@ -152,7 +229,7 @@ class TaskService:
                 if response.data and len(response.data) > 0:
                     row = response.data[0]
                     # Re-sync updated task in RAG
-                    self._rag.index_task(
+                    await self._rag.index_task(
                         IndexEnrichedTaskRequest(
                             taskId=row["id"],
                             projectId=row["project_id"],
@@ -165,36 +242,15 @@ class TaskService:
                         )
                     )
 
-                    # cache edited task
-                    cache_key = f'project:{req.projectId}:tasks'
-                    # get previously cached tasks
-                    cached = await self._redis_client.get(cache_key)
-                    tasks = json.loads(cached) if cached else []
-
-                    new_task_entry = {
-                        "taskId": req.taskId,
-                        "title": row.get("title", req.task_title or ""),
-                        "user_description": row.get("description", req.user_description or ""),
-                        "ai_description": row.get("ai_description", req.ai_description or ""),
-                    }
-                    new_task_entry['text'] = "\n".join([
-                        new_task_entry['title'],
-                        new_task_entry['user_description'],
-                        new_task_entry['ai_description'],
-                    ]).strip()
-
-                    task_id = str(req.taskId).strip()
-
-                    for i, t in enumerate(tasks):
-                        cached_id = str(t.get("taskId")).strip() if t.get("taskId") else ""
-                        if cached_id == task_id:
-                            tasks[i] = new_task_entry
-                    
-                            break
-                    else:
-                        tasks.append(new_task_entry)
-
-                    await self._redis_client.set(cache_key, json.dumps(tasks), ex=1800)
+                    # cache edited task (replaces only this task's hash fields)
+                    new_task_entry = task_cache.build_entry(
+                        req.taskId,
+                        row.get("title", req.task_title or ""),
+                        row.get("description", req.user_description or ""),
+                        row.get("ai_description", req.ai_description or "")
+                    )
+                    await task_cache.upsert_tasks(self._redis_client, req.projectId, [new_task_entry])
+                    await context_invalidation.publish(self._redis_client, task_cache.texts_key(req.projectId))
                     return True
 
                 print(f"Update task {req.taskId} or User has no permission on given task")
@@ -223,23 +279,13 @@ class TaskService:
 
             print("delete_task supabase response:", response)
 
-            self._rag.delete_task(
+            await self._rag.delete_task(
                     projectId=req.projectId,
                     taskId=req.taskId
                 )
 
-            cache_key = f'project:{req.projectId}:tasks'
-            deleted_task_id = req.taskId
-
-            cached = await self._redis_client.get(cache_key)
-            if cached:
-                tasks = json.loads(cached)
-                updated_tasks = [t for t in tasks if t.get('taskId') != deleted_task_id]
-
-                if updated_tasks:
-                    await self._redis_client.set(cache_key, json.dumps(updated_tasks), ex=1800)
-                else:
-                    await self._redis_client.delete(cache_key)
+            await task_cache.remove_task(self._redis_client, req.projectId, req.taskId)
+            await context_invalidation.publish(self._redis_client, task_cache.texts_key(req.projectId))
 
             return True
 
@@ -0,0 +1,24 @@
+import os
+import shutil
+import tempfile
+
+
+_data_dir = None
+
+
+def pytest_configure(config):
+    """
+    Point the on-disk stores at a temporary directory before any backend module
+    is imported: the module level RAG / handbook singletons would otherwise
+    create .chroma, .embedding_cache and .handbook_cache in the working directory.
+    """
+    global _data_dir
+    _data_dir = tempfile.mkdtemp(prefix="backend-tests-")
+    os.environ["CHROMA_DIR"] = os.path.join(_data_dir, "chroma")
+    os.environ["EMBEDDING_CACHE_DIR"] = os.path.join(_data_dir, "embedding_cache")
+    os.environ["HANDBOOK_CACHE_DIR"] = os.path.join(_data_dir, "handbook_cache")
+
+
+def pytest_unconfigure(config):
+    if _data_dir is not None:
+        shutil.rmtree(_data_dir, ignore_errors=True)
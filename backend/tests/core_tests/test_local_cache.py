@@ -0,0 +1,118 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.core.local_cache import CacheInvalidation, LocalCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = LocalCache(ttl=30, clock=clock)
+    cache.put("k", "v")
+
+    clock.now = 29.9
+    assert cache.get("k") == "v"
+    clock.now = 30.0
+    assert cache.get("k") is None
+    assert cache.stats()["local"]["expired"] == 1
+    assert cache.bytes == 0
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = LocalCache(max_entries=2, max_bytes=1000)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+
+    # "b" was the least recently used
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+    small = LocalCache(max_entries=10, max_bytes=8)
+    small.put("a", "xxxx")
+    small.put("b", "yyyy")
+    assert small.get("a") is None
+    assert small.get("b") == "yyyy"
+    # never stored when larger than the whole budget
+    assert small.put("c", "z" * 20) is False
+
+
+def test_put_refused_after_invalidation_since_read():
+    cache = LocalCache()
+    epoch = cache.epoch
+    cache.invalidate("k")
+
+    assert cache.put("k", "stale", epoch) is False
+    assert cache.put("k", "fresh", cache.epoch) is True
+
+
+def test_disabled_with_zero_ttl():
+    cache = LocalCache(ttl=0)
+
+    assert cache.put("k", "v") is False
+    assert cache.get("k") is None
+
+
+@pytest.mark.asyncio
+async def test_publish_drops_locally_and_notifies_other_processes():
+    cache = LocalCache()
+    cache.put("k1", "v1")
+    cache.put("k2", "v2")
+    redis = MagicMock()
+    redis.publish = AsyncMock()
+    inv = CacheInvalidation(cache, AsyncMock(return_value=redis))
+
+    await inv.publish(redis, "k1")
+
+    assert cache.get("k1") is None
+    assert cache.get("k2") == "v2"
+    channel, payload = redis.publish.await_args[0]
+    assert channel == inv.channel
+    assert json.loads(payload) == ["k1"]
+
+    # what another process does with the message
+    inv.handle(payload.replace("k1", "k2"))
+    assert cache.get("k2") is None
+    inv.handle("not json")
+    assert inv.received == 1
+
+
+@pytest.mark.asyncio
+async def test_project_context_reads_local_then_redis_then_rag():
+    from backend.model import model
+
+    cache = LocalCache()
+    redis = MagicMock()
+    redis.get = AsyncMock(side_effect=[None, "PROJECT TEXT"])
+    redis.set = AsyncMock()
+    rag = MagicMock()
+    rag.get_project_by_id = AsyncMock(return_value="PROJECT TEXT")
+
+    with patch.object(model, "context_cache", cache), \
+         patch.object(model, "ensure_redis_client", new=AsyncMock()), \
+         patch.object(model, "_redis_client", redis), \
+         patch.object(model, "_rag", rag), \
+         patch.object(model.settings, "CACHE_DISTRIBUTED_LOCK", False):
+        first = await model.get_project_context("P1", "U1")
+        second = await model.get_project_context("P1", "U1")
+
+        # another worker updated the project
+        cache.invalidate("user:U1:project:P1:embeddings")
+        third = await model.get_project_context("P1", "U1")
+
+    assert first == second == third == "PROJECT TEXT"
+    rag.get_project_by_id.assert_awaited_once()
+    # the second read never left the process
+    assert redis.get.await_count == 2
+    stats = cache.stats()
+    assert stats["local"]["hits"] == 1
+    assert stats["redis"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
@@ -0,0 +1,83 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.core.singleflight import SingleFlight, load_with_redis_lock
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_loads():
+    sf = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "PROJECT TEXT"
+
+    results = await asyncio.gather(*[sf.do("project:P1", load) for _ in range(10)])
+
+    assert results == ["PROJECT TEXT"] * 10
+    assert calls == 1
+    assert sf.stats() == {"in_flight": 0, "leaders": 1, "coalesced": 9}
+
+
+@pytest.mark.asyncio
+async def test_single_flight_shares_errors_and_recovers():
+    sf = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("chroma down")
+
+    results = await asyncio.gather(sf.do("k", failing), sf.do("k", failing), return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    # the key is released, the next miss loads again
+    assert await sf.do("k", AsyncMock(return_value="ok")) == "ok"
+
+
+@pytest.mark.asyncio
+async def test_redis_lock_rechecks_cache_after_acquiring():
+    lock = MagicMock()
+    lock.acquire = AsyncMock(return_value=True)
+    lock.release = AsyncMock()
+    redis = MagicMock()
+    redis.lock.return_value = lock
+
+    read_cache = AsyncMock(return_value="filled by another worker")
+    load = AsyncMock(return_value="loaded")
+
+    result = await load_with_redis_lock(redis, "project:P1:tasks", read_cache, load)
+
+    assert result == "filled by another worker"
+    load.assert_not_awaited()
+    redis.lock.assert_called_once()
+    assert redis.lock.call_args[0][0] == "lock:project:P1:tasks"
+    lock.release.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_leader_does_not_cancel_followers():
+    sf = SingleFlight()
+    calls = 0
+
+    async def load():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return "PROJECT TEXT"
+
+    leader = asyncio.create_task(sf.do("k", load))
+    await asyncio.sleep(0)
+    follower = asyncio.create_task(sf.do("k", load))
+    await asyncio.sleep(0)
+
+    # e.g. the leader's client disconnected
+    leader.cancel()
+
+    assert await follower == "PROJECT TEXT"
+    assert leader.cancelled()
+    assert calls == 1
+    assert sf.stats()["in_flight"] == 0
@@ -0,0 +1,46 @@
+from backend.model.context_builder import (
+    assemble_context, dedupe_chunks, estimate_tokens, truncate_to_tokens
+)
+
+
+def test_estimate_tokens_counts_words_and_punctuation():
+    assert estimate_tokens("Fix AUTH-123: login fails.") == 8
+    assert estimate_tokens("") == 0
+
+
+def test_dedupe_chunks_removes_overlapping_sentences():
+    chunks = [
+        "Add login form. Validate the email.",
+        "Validate the email. Show an error banner.",   # overlap window of the first chunk
+        "Add login form.",                              # fully contained
+    ]
+
+    deduped, dropped = dedupe_chunks(chunks)
+
+    assert deduped == ["Add login form. Validate the email.", "Show an error banner."]
+    assert dropped == 1
+
+
+def test_truncate_to_tokens_keeps_whole_sentences():
+    text = "One two three. Four five six. Seven eight nine."
+    assert truncate_to_tokens(text, 9) == "One two three. Four five six."
+
+
+def test_assemble_context_respects_budget_and_rank_order():
+    task_chunks = [f"Task {i} does something useful here." for i in range(50)]
+
+    context, stats = assemble_context(
+        project_text="Project about payments. " * 100,
+        task_chunks=task_chunks,
+        new_task_title="New task",
+        new_task_user_description="Describe it",
+        budget=200,
+    )
+
+    assert stats.total_tokens <= 200
+    assert stats.truncated is True
+    assert 0 < stats.chunks_used < 50
+    # most relevant (first) chunks are kept
+    assert "Task 0 does" in context
+    assert "Task 49 does" not in context
+    assert context.rstrip().endswith("Description: Describe it")
@@ -32,7 +32,8 @@ async def test_enrich_edited_task_success():
 
         fake_http_client.post.return_value = fake_response
 
-        with patch("backend.model.model.get_http_client", return_value=fake_http_client):
+        with patch("backend.model.model.get_http_client", return_value=fake_http_client), \
+             patch("backend.model.model.settings.LLM_CACHE_TTL", 0):
 
             
             ai_description, ai_story_points = await enrich_edited_task(
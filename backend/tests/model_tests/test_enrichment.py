@@ -47,7 +47,8 @@ async def test_enrich_task_details_success():
 
         fake_http_client.post.return_value = fake_response
 
-        with patch("backend.model.model.get_http_client", return_value=fake_http_client):
+        with patch("backend.model.model.get_http_client", return_value=fake_http_client), \
+             patch("backend.model.model.settings.LLM_CACHE_TTL", 0):
 
             # --------------------------
             # mock task_service.create_task()
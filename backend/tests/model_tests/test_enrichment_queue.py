@@ -0,0 +1,299 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.model import enrichment_queue as eq
+from backend.model.enrichment_queue import EnrichmentQueue, job_key, queue_key
+from backend.types.types import IndexTaskRequest
+
+
+def _fake_redis():
+    """Just enough of the Redis commands used by the queue; the Lua scripts are run in Python."""
+    strings, hashes, lists, sets = {}, {}, {}, {}
+    redis = MagicMock()
+
+    async def set_(key, value, nx=False, ex=None):
+        if nx and key in strings:
+            return None
+        strings[key] = value
+        return True
+
+    async def hset(key, mapping):
+        hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+
+    def lrem(key, count, value):
+        items = lists.get(key, [])
+        if value in items:
+            items.remove(value)
+            return 1
+        return 0
+
+    async def blmove(src, dst, timeout, wherefrom, whereto):
+        if not lists.get(src):
+            await asyncio.sleep(0.01)
+            return None
+        value = lists[src].pop()
+        lists.setdefault(dst, []).insert(0, value)
+        return value
+
+    redis.set = AsyncMock(side_effect=set_)
+    redis.get = AsyncMock(side_effect=lambda k: strings.get(k))
+    redis.delete = AsyncMock(side_effect=lambda k: strings.pop(k, None))
+    redis.hset = AsyncMock(side_effect=hset)
+    redis.hget = AsyncMock(side_effect=lambda k, f: hashes.get(k, {}).get(f))
+    redis.hgetall = AsyncMock(side_effect=lambda k: dict(hashes.get(k, {})))
+    redis.lrem = AsyncMock(side_effect=lrem)
+    redis.blmove = AsyncMock(side_effect=blmove)
+    redis.sadd = AsyncMock(side_effect=lambda k, v: sets.setdefault(k, set()).add(v))
+    redis.smembers = AsyncMock(side_effect=lambda k: set(sets.get(k, set())))
+
+    def enqueue(keys, args):
+        dedup, key, queue = keys
+        job_id, ttl, request, prefix, failed, queued, now = args
+        existing = strings.get(dedup)
+        status = hashes.get(prefix + existing, {}).get("status") if existing else None
+        if status and status != failed:
+            return [existing, 1]
+        strings[dedup] = job_id
+        hashes[key] = {"status": queued, "request": request, "dedup": dedup, "queue": queue,
+                       "attempts": "0", "created_at": now, "updated_at": now}
+        lists.setdefault(queue, []).insert(0, job_id)
+        return [job_id, 0]
+
+    def requeue(keys, args):
+        processing, queue = keys
+        (job_id,) = args
+        if not lrem(processing, 1, job_id):
+            return 0
+        lists.setdefault(queue, []).append(job_id)
+        return 1
+
+    def recover(keys, args):
+        processing, workers, alive = keys
+        worker_id, prefix, max_attempts, now = args
+        if alive in strings:
+            return 0
+        requeued = 0
+        for job_id in lists.pop(processing, []):
+            job = hashes.get(prefix + job_id)
+            if job is None:
+                continue
+            job["attempts"] = str(int(job.get("attempts", 0)) + 1)
+            if int(job["attempts"]) >= max_attempts or "queue" not in job:
+                job.update(status="failed", error="enrichment worker lost")
+            else:
+                job["status"] = "queued"
+                lists.setdefault(job["queue"], []).append(job_id)
+                requeued += 1
+        sets.get(workers, set()).discard(worker_id)
+        return requeued
+
+    scripts = {eq._ENQUEUE: enqueue, eq._REQUEUE: requeue, eq._RECOVER: recover}
+    redis.register_script.side_effect = lambda src: AsyncMock(
+        side_effect=lambda keys, args: scripts[src](keys, args)
+    )
+
+    def pipeline(transaction=True):
+        ops = []
+        pipe = MagicMock()
+        pipe.hset.side_effect = lambda k, mapping: ops.append(hset(k, mapping))
+
+        async def execute():
+            for op in ops:
+                await op
+
+        pipe.execute = execute
+        return pipe
+
+    redis.pipeline = pipeline
+    redis.strings, redis.lists, redis.sets = strings, lists, sets
+    return redis, hashes, lists
+
+
+def _req(title="Login page", description="User can log in", model=1):
+    return IndexTaskRequest(
+        userId="U1", projectId="P1", task_title=title,
+        user_description=description, selected_model=model, status="todo"
+    )
+
+
+@pytest.mark.asyncio
+async def test_enqueue_deduplicates_identical_tasks():
+    redis, hashes, lists = _fake_redis()
+    queue = EnrichmentQueue(enrich=AsyncMock())
+    queue._redis_client = redis
+
+    job_id, dedup = await queue.enqueue(_req())
+    same_id, same_dedup = await queue.enqueue(_req(title="  login   PAGE "))
+    other_id, _ = await queue.enqueue(_req(description="Something else"))
+
+    assert (dedup, same_dedup) == (False, True)
+    assert same_id == job_id
+    assert other_id != job_id
+    assert lists[queue_key(1)] == [other_id, job_id]
+    assert hashes[job_key(job_id)]["status"] == "queued"
+
+
+@pytest.mark.asyncio
+async def test_failed_job_can_be_resubmitted():
+    redis, hashes, _ = _fake_redis()
+    queue = EnrichmentQueue(enrich=AsyncMock(side_effect=RuntimeError("Openrouter API Error")))
+    queue._redis_client = redis
+
+    job_id, _ = await queue.enqueue(_req())
+    await queue.run_job(job_id)
+
+    job = await queue.get_job(job_id)
+    assert job["status"] == "failed"
+    assert "Openrouter" in job["error"]
+
+    retry_id, dedup = await queue.enqueue(_req())
+    assert dedup is False and retry_id != job_id
+
+
+@pytest.mark.asyncio
+async def test_run_job_stores_result():
+    redis, _, _ = _fake_redis()
+    enrich = AsyncMock(return_value={"ai_description": "Build it.", "story_points": 3})
+    queue = EnrichmentQueue(enrich=enrich)
+    queue._redis_client = redis
+
+    job_id, _ = await queue.enqueue(_req())
+    await queue.run_job(job_id)
+
+    job = await queue.get_job(job_id)
+    assert job["status"] == "done"
+    assert job["result"]["story_points"] == 3
+    assert enrich.await_args.args[0].task_title == "Login page"
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded_per_model():
+    redis, _, _ = _fake_redis()
+    running = {1: 0, 2: 0}
+    peak = {1: 0, 2: 0}
+
+    async def enrich(req):
+        running[req.selected_model] += 1
+        peak[req.selected_model] = max(peak[req.selected_model], running[req.selected_model])
+        await asyncio.sleep(0.01)
+        running[req.selected_model] -= 1
+        return {}
+
+    queue = EnrichmentQueue(enrich=enrich, max_per_model=2)
+    queue._redis_client = redis
+
+    ids = [(await queue.enqueue(_req(title=f"t{i}", model=1 + i % 2)))[0] for i in range(10)]
+    await asyncio.gather(*(queue.run_job(i) for i in ids))
+
+    assert peak == {1: 2, 2: 2}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_resubmissions_of_a_failed_job_create_one_job():
+    redis, hashes, lists = _fake_redis()
+    queue = EnrichmentQueue(enrich=AsyncMock(side_effect=RuntimeError("down")))
+    queue._redis_client = redis
+
+    job_id, _ = await queue.enqueue(_req())
+    await queue.run_job(job_id)
+
+    (a, a_dedup), (b, b_dedup) = await asyncio.gather(queue.enqueue(_req()), queue.enqueue(_req()))
+
+    assert a == b != job_id
+    assert sorted([a_dedup, b_dedup]) == [False, True]
+    assert lists[queue_key(1)].count(a) == 1
+
+
+@pytest.mark.asyncio
+async def test_stop_fails_running_job_and_allows_resubmission():
+    redis, hashes, lists = _fake_redis()
+    started = asyncio.Event()
+
+    async def enrich(req):
+        started.set()
+        await asyncio.sleep(10)
+
+    queue = EnrichmentQueue(enrich=enrich, lease=30)
+    queue._redis_client = redis
+    job_id, _ = await queue.enqueue(_req())
+
+    queue.start()
+    await asyncio.wait_for(started.wait(), 1)
+    await queue.stop()
+
+    assert hashes[job_key(job_id)]["status"] == "failed"
+    assert not lists.get(queue.processing_key)
+    retry_id, dedup = await queue.enqueue(_req())
+    assert dedup is False and retry_id != job_id
+
+
+@pytest.mark.asyncio
+async def test_busy_model_does_not_hold_back_other_models_and_keeps_order():
+    redis, hashes, lists = _fake_redis()
+    release = asyncio.Event()
+    done = []
+
+    async def enrich(req):
+        if req.selected_model == 1:
+            await release.wait()
+        done.append(req.task_title)
+        return {}
+
+    queue = EnrichmentQueue(enrich=enrich, max_per_model=1, models=[1, 2])
+    queue._redis_client = redis
+    ids = {}
+    for title, model in [("slow 1", 1), ("slow 2", 1), ("fast", 2)]:
+        ids[title], _ = await queue.enqueue(_req(title=title, model=model))
+
+    queue.start()
+    for _ in range(100):
+        if "fast" in done:
+            break
+        await asyncio.sleep(0.01)
+    # model 1 is at its limit: its next job waits in its own queue, untouched
+    assert done == ["fast"]
+    assert lists[queue_key(1)] == [ids["slow 2"]]
+    assert queue.stats()["workers"] == 2
+
+    release.set()
+    for _ in range(100):
+        if len(done) == 3:
+            break
+        await asyncio.sleep(0.01)
+    await queue.stop()
+    assert done == ["fast", "slow 1", "slow 2"]
+
+
+@pytest.mark.asyncio
+async def test_enqueue_rejects_unknown_model():
+    redis, _, _ = _fake_redis()
+    queue = EnrichmentQueue(enrich=AsyncMock(), models=[1, 2])
+    queue._redis_client = redis
+
+    with pytest.raises(ValueError):
+        await queue.enqueue(_req(model=9))
+
+
+@pytest.mark.asyncio
+async def test_jobs_of_a_dead_worker_process_are_recovered():
+    redis, hashes, lists = _fake_redis()
+    queue = EnrichmentQueue(enrich=AsyncMock(return_value={}))
+    queue._redis_client = redis
+    job_id, _ = await queue.enqueue(_req())
+
+    # another process took the job, then died (its heartbeat key expired)
+    lists[eq.processing_key("dead")] = [lists[queue_key(1)].pop()]
+    redis.sets[eq.WORKERS_KEY] = {"dead", queue.worker_id}
+
+    assert await queue.recover_lost_jobs() == 1
+    assert lists[queue_key(1)] == [job_id]
+    assert redis.sets[eq.WORKERS_KEY] == {queue.worker_id}
+    assert hashes[job_key(job_id)]["attempts"] == "1"
+
+    # a job that keeps killing its worker ends up failed
+    hashes[job_key(job_id)]["attempts"] = str(eq.MAX_ATTEMPTS - 1)
+    lists[eq.processing_key("dead")] = [lists[queue_key(1)].pop()]
+    redis.sets[eq.WORKERS_KEY].add("dead")
+    assert await queue.recover_lost_jobs() == 0
+    assert hashes[job_key(job_id)]["status"] == "failed"
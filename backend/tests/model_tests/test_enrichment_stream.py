@@ -0,0 +1,151 @@
+import json
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, patch, MagicMock
+
+from backend.model.model import store_enrichment, stream_task_enrichment
+from backend.types.types import IndexTaskRequest
+
+
+def _fake_stream_client(lines, status_code=200):
+    response = MagicMock()
+    response.status_code = status_code
+
+    async def aiter_lines():
+        for line in lines:
+            yield line
+
+    response.aiter_lines = aiter_lines
+    response.aread = AsyncMock(return_value=b'{"error": "rate limited"}')
+
+    @asynccontextmanager
+    async def stream(*args, **kwargs):
+        yield response
+
+    client = MagicMock()
+    client.stream = MagicMock(side_effect=stream)
+    return client
+
+
+def _delta(text):
+    return "data: " + json.dumps({"choices": [{"delta": {"content": text}}]})
+
+
+def _events(raw_events):
+    parsed = []
+    for raw in raw_events:
+        event_line, data_line = raw.strip().split("\n")
+        parsed.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    return parsed
+
+
+@pytest.mark.asyncio
+async def test_stream_task_enrichment_proxies_tokens_and_saves_task():
+    req = IndexTaskRequest(
+        userId="u1",
+        projectId="p1",
+        task_title="Create login page",
+        user_description="User wants a login page",
+        selected_model=1,
+        status="todo"
+    )
+
+    client = _fake_stream_client([
+        ": OPENROUTER PROCESSING",
+        _delta("Implement login "),
+        _delta("page UI.\n**Story Points: 1"),
+        _delta("3**"),
+        "data: [DONE]",
+    ])
+
+    with patch("backend.model.model.get_context", new=AsyncMock(return_value="FAKE_CONTEXT")), \
+         patch("backend.model.model.get_http_client", return_value=client), \
+         patch("backend.model.model.settings.LLM_CACHE_TTL", 0), \
+         patch("backend.model.model.task_service.create_task", new_callable=AsyncMock) as mock_create:
+        mock_create.return_value = True
+        events = _events([e async for e in stream_task_enrichment(req)])
+
+    names = [name for name, _ in events]
+    assert names == ["token", "token", "token", "story_points", "done"]
+
+    # "1" alone must not be reported: the number is only complete after "3"
+    assert events[3][1] == {"story_points": 13}
+
+    assert events[-1][1]["saved"] is True
+    assert events[-1][1]["ai_description"] == "Implement login page UI."
+
+    sent = json.loads(client.stream.call_args.kwargs["content"])
+    assert sent["stream"] is True
+
+    mock_create.assert_awaited_once()
+    assert mock_create.call_args[0][0].story_points == 13
+
+
+@pytest.mark.asyncio
+async def test_stream_task_enrichment_reports_api_error():
+    req = IndexTaskRequest(
+        userId="u1",
+        projectId="p1",
+        task_title="t",
+        user_description="d",
+        selected_model=1,
+        status="todo"
+    )
+
+    client = _fake_stream_client([], status_code=429)
+
+    with patch("backend.model.model.get_context", new=AsyncMock(return_value="CTX")), \
+         patch("backend.model.model.get_http_client", return_value=client), \
+         patch("backend.model.model.settings.LLM_CACHE_TTL", 0), \
+         patch("backend.model.llm_client.asyncio.sleep", new_callable=AsyncMock), \
+         patch("backend.model.model.task_service.create_task", new_callable=AsyncMock) as mock_create:
+        events = _events([e async for e in stream_task_enrichment(req)])
+
+    assert [name for name, _ in events] == ["error"]
+    assert "rate limited" in events[0][1]["detail"]
+    mock_create.assert_not_awaited()
+
+    # retried, then fell back to the other provider before giving up
+    models = [json.loads(c.kwargs["content"])["model"] for c in client.stream.call_args_list]
+    assert len(set(models)) == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_task_enrichment_survives_response_cache_failures():
+    req = IndexTaskRequest(
+        userId="u1",
+        projectId="p1",
+        task_title="Create login page",
+        user_description="User wants a login page",
+        selected_model=1,
+        status="todo"
+    )
+
+    client = _fake_stream_client([
+        _delta("Implement login page UI.\n**Story Points: 3**"),
+        "data: [DONE]",
+    ])
+
+    with patch("backend.model.model.get_context", new=AsyncMock(return_value="FAKE_CONTEXT")), \
+         patch("backend.model.model.get_http_client", return_value=client), \
+         patch("backend.model.model.settings.LLM_CACHE_TTL", 3600), \
+         patch("backend.model.model.ensure_redis_client", new=AsyncMock()), \
+         patch("backend.model.model.response_cache.project_version",
+               new=AsyncMock(side_effect=ConnectionError("redis down"))), \
+         patch("backend.model.model.task_service.create_task", new_callable=AsyncMock) as mock_create:
+        mock_create.return_value = True
+        events = _events([e async for e in stream_task_enrichment(req)])
+
+    # the lookup failure is a miss: the model is called and the task saved
+    assert [name for name, _ in events][-1] == "done"
+    assert events[-1][1]["story_points"] == 3
+    client.stream.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_store_enrichment_ignores_cache_write_failures():
+    with patch("backend.model.model.response_cache.put_response",
+               new=AsyncMock(side_effect=ConnectionError("redis down"))) as put:
+        await store_enrichment("key", "model", "desc", 3)
+
+    put.assert_awaited_once()
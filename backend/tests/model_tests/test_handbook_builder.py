@@ -0,0 +1,157 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+
+from backend.model.handbook_builder import (
+    TaskFold, insert_task_table, render_task_table, status_counts
+)
+from backend.types.types import ProjectHandbookRequest
+
+
+PROJECT = {"id": "P1", "name": "Demo", "status": "active", "description": "A demo project", "user_id": "U1"}
+
+
+def _tasks(n, status="todo", text="x"):
+    return [
+        {"id": i, "title": f"Task {i}", "status": status, "story_points": i % 5 or None, "description": text}
+        for i in range(n)
+    ]
+
+
+def test_task_table_has_every_task_and_escapes_cells():
+    rows = _tasks(3) + [{"id": 9, "title": "a | b", "status": None, "story_points": None}]
+
+    table = render_task_table(rows).split("\n")
+
+    assert table[0] == "| ID | Title | Status | Story Points |"
+    assert len(table) == 2 + len(rows)
+    assert table[2] == "| 0 | Task 0 | todo | — |"
+    assert table[-1] == "| 9 | a \\| b | — | — |"
+
+
+def _fold(rows, single_pass_tokens, partition_tokens):
+    partitions = []
+    fold = TaskFold(single_pass_tokens, partition_tokens, partitions.append)
+    for row in rows:
+        fold.add(row)
+    fold.finish()
+    return fold, partitions
+
+
+def test_task_fold_partitions_follow_status_and_token_budget():
+    text = "lorem ipsum " * 50
+    rows = _tasks(10, "done", text) + _tasks(10, "todo", text)
+
+    fold, parts = _fold(rows, single_pass_tokens=1000, partition_tokens=300)
+
+    assert not fold.single_pass
+    assert len(fold.table_rows) == 20
+    assert sum(len(p) for p in parts) == 20
+    assert len(parts) > 2
+    # every partition has a single status; the last partial ones come in workflow order
+    assert all(len({r["status"] for r in p}) == 1 for p in parts)
+    assert [p[0]["status"] for p in parts[-2:]] == ["todo", "done"]
+
+
+def test_task_fold_keeps_a_small_project_for_a_single_pass():
+    fold, parts = _fold(_tasks(5), single_pass_tokens=10_000, partition_tokens=300)
+
+    assert fold.single_pass
+    assert parts == []
+    assert [c["title"] for c in fold.contexts] == [f"Task {i}" for i in range(5)]
+
+
+def test_status_counts_in_workflow_order():
+    rows = _tasks(2, "done") + _tasks(3, "todo")
+
+    assert list(status_counts(rows)) == ["todo", "done"]
+    assert status_counts(rows)["todo"]["tasks"] == 3
+
+
+def test_insert_replaces_llm_table_in_section_4():
+    handbook = (
+        "## 3. Architecture\n\ntext\n\n"
+        "## 4. Task Breakdown and Status\n\nMostly done.\n\n| ID | Title |\n|--|--|\n| 1 | made up |\n\n"
+        "## 5. Dependencies\n\nnone\n"
+    )
+
+    out = insert_task_table(handbook, _tasks(2))
+
+    assert "made up" not in out
+    assert "Mostly done." in out
+    assert out.index("| 1 | Task 1 | todo | 1 |") < out.index("## 5. Dependencies")
+
+
+def test_insert_adds_missing_section_4():
+    out = insert_task_table("## 1. Overview\n\nhi\n\n## 6. Risks\n\nnone\n", _tasks(1))
+
+    assert out.index("## 4. Task Breakdown and Status") < out.index("## 6. Risks")
+
+
+@pytest.mark.asyncio
+async def test_large_project_uses_bounded_map_reduce():
+    from backend.model import model
+
+    rows = _tasks(40, "todo", "z" * 300) + _tasks(40, "done", "z" * 300)
+    running, peak, calls = 0, 0, []
+
+    async def complete(model_id, system_prompt, user_prompt, max_tokens=2000):
+        nonlocal running, peak
+        calls.append(system_prompt)
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        if system_prompt == model.HANDBOOK_MAP_PROMPT:
+            return "- summary"
+        return "## 1. Overview\n\nDemo\n\n## 4. Task Breakdown and Status\n\nHalf done.\n"
+
+    with patch.object(model, "complete", complete), \
+         patch.object(model.settings, "HANDBOOK_SINGLE_PASS_TOKENS", 2000), \
+         patch.object(model.settings, "HANDBOOK_PARTITION_TOKENS", 1000), \
+         patch.object(model.settings, "HANDBOOK_MAP_CONCURRENCY", 2):
+        handbook = await model.generate_project_handbook_text(
+            ProjectHandbookRequest(projectId="P1", userId="U1", selected_model=1),
+            project_row=PROJECT, task_rows=rows,
+        )
+
+    map_calls = calls.count(model.HANDBOOK_MAP_PROMPT)
+    assert map_calls > 2
+    assert calls[-1] == model.HANDBOOK_SYSTEM_PROMPT
+    assert peak <= 2
+    # one table row per task even though the LLM never saw them all at once
+    assert handbook.count("| Task ") == 80
+
+
+@pytest.mark.asyncio
+async def test_handbook_streams_the_tasks_and_maps_while_loading():
+    from backend.model import model
+
+    rows = _tasks(30, "todo", "z" * 300) + _tasks(30, "done", "z" * 300)
+    loaded, map_calls_while_loading = 0, []
+
+    async def iter_tasks(project_id, columns):
+        nonlocal loaded
+        assert columns == model.TASK_HANDBOOK_COLUMNS
+        for row in rows:
+            loaded += 1
+            yield row
+            await asyncio.sleep(0)
+
+    async def complete(model_id, system_prompt, user_prompt, max_tokens=2000):
+        if system_prompt == model.HANDBOOK_MAP_PROMPT:
+            map_calls_while_loading.append(loaded < len(rows))
+            return "- summary"
+        return "## 1. Overview\n\nDemo\n"
+
+    with patch.object(model, "iter_tasks_from_supabase", iter_tasks), \
+         patch.object(model, "complete", complete), \
+         patch.object(model.settings, "HANDBOOK_SINGLE_PASS_TOKENS", 2000), \
+         patch.object(model.settings, "HANDBOOK_PARTITION_TOKENS", 1000):
+        handbook = await model.generate_project_handbook_text(
+            ProjectHandbookRequest(projectId="P1", userId="U1", selected_model=1), project_row=PROJECT,
+        )
+
+    # map calls started before the last page was read
+    assert any(map_calls_while_loading)
+    assert handbook.count("| Task ") == 60
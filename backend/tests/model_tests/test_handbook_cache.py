@@ -0,0 +1,112 @@
+import os
+import time
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from backend.model.handbook_cache import HandbookCache, handbook_fingerprint
+from backend.types.types import ProjectHandbookRequest
+
+
+PROJECT = {"id": "P1", "updated_at": "2025-01-01T00:00:00"}
+TASKS = [
+    {"id": 1, "updated_at": "2025-01-02T00:00:00"},
+    {"id": 2, "updated_at": "2025-01-03T00:00:00"},
+]
+
+
+def test_fingerprint_ignores_row_order_and_tracks_updates():
+    fp = handbook_fingerprint(PROJECT, TASKS, "model-a")
+
+    assert fp == handbook_fingerprint(PROJECT, list(reversed(TASKS)), "model-a")
+    assert fp != handbook_fingerprint(PROJECT, TASKS, "model-b")
+    assert fp != handbook_fingerprint(PROJECT, TASKS[:1], "model-a")
+    assert fp != handbook_fingerprint(
+        PROJECT, [TASKS[0], {"id": 2, "updated_at": "2025-02-01T00:00:00"}], "model-a"
+    )
+
+
+def _read_pdf(cache, fingerprint):
+    f = cache.open_pdf(fingerprint)
+    if f is None:
+        return None
+    with f:
+        return f.read()
+
+
+def _commit_pdf(cache, fingerprint, data):
+    tmp = cache.temp_path(fingerprint, "pdf")
+    with open(tmp, "wb") as f:
+        f.write(data)
+    cache.commit(fingerprint, "pdf", tmp)
+
+
+def test_cache_round_trip_and_size_eviction(tmp_path):
+    cache = HandbookCache(str(tmp_path), max_bytes=250)
+
+    _commit_pdf(cache, "old", b"x" * 100)
+    _commit_pdf(cache, "mid", b"y" * 100)
+    # make "old" the least recently used
+    past = time.time() - 60
+    os.utime(tmp_path / "old.pdf", (past, past))
+    _commit_pdf(cache, "new", b"z" * 100)
+
+    assert _read_pdf(cache, "old") is None
+    assert _read_pdf(cache, "mid") == b"y" * 100
+    assert _read_pdf(cache, "new") == b"z" * 100
+    assert cache.evictions == 1
+    assert cache.stats()["bytes"] <= 250
+
+
+def test_open_pdf_survives_eviction(tmp_path):
+    cache = HandbookCache(str(tmp_path), max_bytes=150)
+    _commit_pdf(cache, "a", b"a" * 100)
+
+    f = cache.open_pdf("a")
+    _commit_pdf(cache, "b", b"b" * 100)
+
+    assert cache.open_pdf("a") is None
+    with f:
+        assert f.read() == b"a" * 100
+
+
+def test_eviction_scan_removes_abandoned_temp_files(tmp_path):
+    cache = HandbookCache(str(tmp_path), tmp_max_age=60)
+    abandoned = cache.temp_path("gone", "pdf")
+    in_progress = cache.temp_path("rendering", "pdf")
+    for path in (abandoned, in_progress):
+        with open(path, "wb") as f:
+            f.write(b"%PDF partial")
+    past = time.time() - 120
+    os.utime(abandoned, (past, past))
+
+    _commit_pdf(cache, "a", b"a" * 10)
+
+    assert not os.path.exists(abandoned)
+    assert os.path.exists(in_progress)
+    assert cache.stats()["tmp_removed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_open_handbook_pdf_generates_once(tmp_path):
+    from backend.model import model
+
+    req = ProjectHandbookRequest(userId="U1", projectId="P1")
+    cache = HandbookCache(str(tmp_path))
+    generate = AsyncMock(return_value="# Project Handbook")
+
+    async def render_to_file(markdown_text, path):
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.7")
+
+    with patch.object(model, "handbook_cache", cache), \
+         patch.object(model, "generate_project_handbook_text", generate), \
+         patch.object(model.handbook_renderer, "render_to_file", new=AsyncMock(side_effect=render_to_file)) as render:
+        with await model.open_handbook_pdf(req, "fp1", PROJECT) as first:
+            assert first.read() == b"%PDF-1.7"
+        with await model.open_handbook_pdf(req, "fp1", PROJECT) as second:
+            assert second.read() == b"%PDF-1.7"
+
+    generate.assert_awaited_once()
+    render.assert_awaited_once()
+    assert cache.get_markdown("fp1") == "# Project Handbook"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["fp1.md", "fp1.pdf"]
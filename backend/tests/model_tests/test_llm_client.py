@@ -0,0 +1,97 @@
+import json
+import httpx
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.model.llm_client import LLMClient, LLMClientConfig, LLMError
+
+
+def _response(status_code, json_data=None, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.json.return_value = json_data or {}
+    response.headers = headers or {}
+    return response
+
+
+def _ok(content="ok", model="primary"):
+    return _response(200, {"model": model, "choices": [{"message": {"content": content}}]})
+
+
+def _client(responses, **cfg):
+    http = AsyncMock()
+    http.post.side_effect = responses
+    llm = LLMClient(
+        api_key="key",
+        config=LLMClientConfig(
+            max_retries=2,
+            model_timeouts={"slow": 90},
+            fallbacks={"primary": ["backup"]},
+            **cfg
+        ),
+        http_client_factory=AsyncMock(return_value=http),
+    )
+    return llm, http
+
+
+def _models(http):
+    return [json.loads(c.kwargs["content"])["model"] for c in http.post.call_args_list]
+
+
+@pytest.mark.asyncio
+async def test_retries_on_429_honoring_retry_after():
+    llm, http = _client([_response(429, headers={"Retry-After": "2"}), _response(502), _ok()])
+
+    with patch("backend.model.llm_client.asyncio.sleep", new_callable=AsyncMock) as sleep:
+        data = await llm.chat("primary", [{"role": "user", "content": "hi"}], max_tokens=10)
+
+    assert data["choices"][0]["message"]["content"] == "ok"
+    assert http.post.await_count == 3
+    assert sleep.await_args_list[0].args[0] == 2.0
+    assert 0 <= sleep.await_args_list[1].args[0] <= 1.0
+    assert llm.stats["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_falls_back_when_primary_is_saturated():
+    llm, http = _client([_response(429)] * 3 + [_ok(model="backup")])
+
+    with patch("backend.model.llm_client.asyncio.sleep", new_callable=AsyncMock):
+        data = await llm.chat("primary", [], max_tokens=10)
+
+    assert data["model"] == "backup"
+    assert _models(http) == ["primary", "primary", "primary", "backup"]
+    assert llm.stats["fallbacks"] == 1
+
+
+@pytest.mark.asyncio
+async def test_timeouts_count_as_saturation():
+    llm, http = _client([httpx.ReadTimeout("slow")] * 3 + [_ok(model="backup")])
+
+    with patch("backend.model.llm_client.asyncio.sleep", new_callable=AsyncMock):
+        data = await llm.chat("primary", [], max_tokens=10)
+
+    assert data["model"] == "backup"
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried():
+    llm, http = _client([_response(401, {"error": "bad key"})])
+
+    with pytest.raises(LLMError) as exc:
+        await llm.chat("primary", [], max_tokens=10)
+
+    assert exc.value.status_code == 401
+    assert http.post.await_count == 1
+
+
+@pytest.mark.asyncio
+async def test_per_model_timeout():
+    llm, http = _client([_ok(), _ok()])
+
+    await llm.chat("slow", [], max_tokens=10)
+    await llm.chat("primary", [], max_tokens=10)
+
+    slow, default = [c.kwargs["timeout"] for c in http.post.call_args_list]
+    assert slow.read == 90
+    assert default.read == llm.cfg.default_timeout
@@ -0,0 +1,82 @@
+import re
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+
+ROWS = [
+    {"id": i, "project_id": "P1", "title": f"Task {i}", "created_at": f"2025-01-0{1 + i // 3}T00:00:00+00:00", "updated_at": None}
+    for i in range(8)
+]
+
+
+class FakeQuery:
+    """Just enough of the postgrest builder to evaluate the keyset filter."""
+
+    def __init__(self, calls):
+        self.calls = calls
+        self.columns = None
+        self.cursor = None
+        self.limit_n = None
+
+    def select(self, columns):
+        self.columns = [c.strip() for c in columns.split(",")]
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def or_(self, filters):
+        created_at, task_id = re.match(r'created_at\.gt\."([^"]+)",.*id\.gt\."([^"]+)"', filters).groups()
+        self.cursor = (created_at, int(task_id))
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, n):
+        self.limit_n = n
+        return self
+
+    async def execute(self):
+        self.calls.append(self)
+        rows = sorted(ROWS, key=lambda r: (r["created_at"], r["id"]))
+        if self.cursor:
+            rows = [r for r in rows if (r["created_at"], r["id"]) > self.cursor]
+        data = [{c: r[c] for c in self.columns} for r in rows[:self.limit_n]]
+        return MagicMock(data=data)
+
+
+@pytest.mark.asyncio
+async def test_iter_tasks_pages_with_keyset_and_projection():
+    from backend.model import model
+
+    calls = []
+    supabase = MagicMock()
+    supabase.table.side_effect = lambda name: FakeQuery(calls)
+
+    with patch.object(model, "get_supabase_client", new=AsyncMock(return_value=supabase)):
+        rows = [r async for r in model.iter_tasks_from_supabase("P1", columns="title", page_size=3)]
+
+    assert [r["id"] for r in rows] == list(range(8))
+    # cursor columns are added to the projection, nothing else is fetched
+    assert set(rows[0]) == {"title", "created_at", "id"}
+    assert len(calls) == 3
+    assert calls[0].cursor is None
+    assert calls[1].cursor == (ROWS[2]["created_at"], 2)
+
+
+@pytest.mark.asyncio
+async def test_load_tasks_collects_all_pages():
+    from backend.model import model
+
+    calls = []
+    supabase = MagicMock()
+    supabase.table.side_effect = lambda name: FakeQuery(calls)
+
+    with patch.object(model, "get_supabase_client", new=AsyncMock(return_value=supabase)), \
+         patch.object(model.settings, "SUPABASE_PAGE_SIZE", 4):
+        rows = await model.load_tasks_from_supabase("P1", model.TASK_FINGERPRINT_COLUMNS)
+
+    assert len(rows) == 8
+    # a full last page needs one more (empty) round trip
+    assert len(calls) == 3
@@ -0,0 +1,78 @@
+import asyncio
+import time
+import pytest
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from unittest.mock import patch
+
+from backend.model.pdf_renderer import PdfRenderer, markdown_to_html
+
+
+def test_markdown_to_html_renders_tables():
+    html = markdown_to_html("| ID | Title |\n|----|-------|\n| 1 | Login |")
+    assert "<table>" in html and "<td>Login</td>" in html
+
+
+@pytest.mark.asyncio
+async def test_renderer_bounds_concurrency_and_records_stage_timings(tmp_path):
+    active = 0
+    peak = 0
+
+    def fake_render(markdown_text, path):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        time.sleep(0.02)
+        active -= 1
+        with open(path, "wb") as f:
+            f.write(b"%PDF " + markdown_text.encode())
+        return {"markdown": 1.0, "template": 1.0, "layout": 5.0, "pdf": 2.0}
+
+    renderer = PdfRenderer(workers=4, max_concurrency=2)
+    pool = ThreadPoolExecutor(max_workers=4)
+
+    with patch("backend.model.pdf_renderer.render_pdf_to_file", new=fake_render), \
+         patch.object(renderer, "executor", return_value=pool):
+        await asyncio.gather(*(renderer.render_to_file(f"doc{i}", str(tmp_path / f"{i}.pdf")) for i in range(6)))
+
+    pool.shutdown()
+
+    assert (tmp_path / "3.pdf").read_bytes() == b"%PDF doc3"
+    assert peak == 2
+
+    stats = renderer.stats()
+    assert stats["renders"] == 6
+    assert stats["running"] == 0 and stats["waiting"] == 0
+    assert stats["avg_ms"]["layout"] == 5.0
+    assert stats["max_ms"]["queue_wait"] > 0
+
+
+def test_warm_up_submits_one_task_per_worker():
+    renderer = PdfRenderer(workers=3, max_concurrency=2)
+    pool = ThreadPoolExecutor(max_workers=3)
+
+    with patch.object(renderer, "executor", return_value=pool):
+        futures = renderer.warm_up()
+
+    assert len(futures) == 3
+    assert all(f.result(timeout=5) is None for f in futures)
+    pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_broken_pool_is_replaced_on_the_next_render(tmp_path):
+    renderer = PdfRenderer(workers=1, max_concurrency=1)
+    broken = renderer.executor()
+    broken_future = Future()
+    broken_future.set_exception(BrokenProcessPool("worker died"))
+
+    with patch.object(broken, "submit", return_value=broken_future), \
+         patch.object(broken, "shutdown") as shutdown:
+        with pytest.raises(BrokenProcessPool):
+            await renderer.render_to_file("doc", str(tmp_path / "a.pdf"))
+
+    shutdown.assert_called_once_with(wait=False)
+    replacement = renderer.executor()
+    assert replacement is not broken
+    assert renderer.stats()["failures"] == 1
+    renderer.shutdown()
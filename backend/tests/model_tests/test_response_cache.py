@@ -0,0 +1,92 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.model import response_cache
+from backend.model.model import cached_enrichment
+
+
+def _fake_redis(store=None):
+    store = {} if store is None else store
+    redis = MagicMock()
+    redis.get = AsyncMock(side_effect=lambda k: store.get(k))
+
+    async def set_(k, v, ex=None):
+        store[k] = v
+
+    redis.set = AsyncMock(side_effect=set_)
+    return redis, store
+
+
+def test_response_key_depends_on_project_version():
+    k1 = response_cache.response_key("P1", "m", "sys", "ctx", "0")
+    k2 = response_cache.response_key("P1", "m", "sys", "ctx", "1")
+
+    assert k1 != k2
+    assert k1.startswith("project:P1:llm:")
+    # whitespace differences do not change the key
+    assert k1 == response_cache.response_key("P1", "m", "sys", "  ctx\n", "0")
+
+
+@pytest.mark.asyncio
+async def test_cached_enrichment_calls_llm_once_for_identical_requests():
+    redis, store = _fake_redis()
+    complete = AsyncMock(return_value="Build the login form.\n**Story Points: 3**")
+
+    with patch("backend.model.model.ensure_redis_client", new=AsyncMock()), \
+         patch("backend.model.model._redis_client", redis), \
+         patch("backend.model.model.complete", complete):
+        first = await cached_enrichment("P1", "model-a", "CTX", "Login", "desc")
+        second = await cached_enrichment("P1", "model-a", "CTX", "Login", "desc")
+
+    assert first == second == ("Build the login form.", 3)
+    complete.assert_awaited_once()
+    assert json.loads(next(iter(store.values())))["story_points"] == 3
+
+
+@pytest.mark.asyncio
+async def test_cached_enrichment_misses_after_project_version_bump():
+    redis, store = _fake_redis()
+    complete = AsyncMock(return_value="Desc\n**Story Points: 2**")
+
+    with patch("backend.model.model.ensure_redis_client", new=AsyncMock()), \
+         patch("backend.model.model._redis_client", redis), \
+         patch("backend.model.model.complete", complete):
+        await cached_enrichment("P1", "model-a", "CTX", "Login", "desc")
+        store[response_cache.version_key("P1")] = "1"
+        await cached_enrichment("P1", "model-a", "CTX", "Login", "desc")
+
+    assert complete.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_enrichment_serves_near_duplicate():
+    redis, _ = _fake_redis()
+    complete = AsyncMock()
+    similar = {"taskId": "T7", "similarity": 0.97, "ai_description": "Reused.", "story_points": 5}
+
+    with patch("backend.model.model.ensure_redis_client", new=AsyncMock()), \
+         patch("backend.model.model._redis_client", redis), \
+         patch("backend.model.model.complete", complete), \
+         patch("backend.model.model.settings.LLM_CACHE_SIMILARITY", 0.95), \
+         patch("backend.model.model._rag.find_similar_task", new=AsyncMock(return_value=similar)) as find:
+        result = await cached_enrichment("P1", "model-a", "CTX", "Login", "desc", exclude_task_id="T1")
+
+    assert result == ("Reused.", 5)
+    complete.assert_not_awaited()
+    assert find.call_args.kwargs["exclude_task_id"] == "T1"
+
+
+@pytest.mark.asyncio
+async def test_redis_failure_falls_back_to_llm():
+    redis = MagicMock()
+    redis.get = AsyncMock(side_effect=ConnectionError("down"))
+    redis.set = AsyncMock(side_effect=ConnectionError("down"))
+    complete = AsyncMock(return_value="Desc\n**Story Points: 1**")
+
+    with patch("backend.model.model.ensure_redis_client", new=AsyncMock()), \
+         patch("backend.model.model._redis_client", redis), \
+         patch("backend.model.model.complete", complete):
+        result = await cached_enrichment("P1", "model-a", "CTX", "Login", "desc")
+
+    assert result == ("Desc", 1)
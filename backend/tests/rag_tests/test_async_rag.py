@@ -0,0 +1,47 @@
+import threading
+import pytest
+from unittest.mock import MagicMock
+
+from backend.rag.async_rag import AsyncRAGService
+
+
+@pytest.mark.asyncio
+async def test_async_rag_runs_calls_off_the_event_loop():
+    loop_thread = threading.get_ident()
+    seen = {}
+
+    rag = MagicMock()
+
+    def fake_get_project(project_id):
+        seen["thread"] = threading.get_ident()
+        return f"text of {project_id}"
+
+    rag.get_project_by_id.side_effect = fake_get_project
+
+    service = AsyncRAGService(rag=rag)
+    before = AsyncRAGService.stats()["completed"]
+
+    result = await service.get_project_by_id("P1")
+
+    assert result == "text of P1"
+    assert seen["thread"] != loop_thread
+
+    stats = AsyncRAGService.stats()
+    assert stats["completed"] == before + 1
+    assert stats["queued"] == 0
+    assert stats["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_async_rag_propagates_errors():
+    rag = MagicMock()
+    rag.delete_task.side_effect = RuntimeError("chroma down")
+
+    service = AsyncRAGService(rag=rag)
+    before = AsyncRAGService.stats()["failed"]
+
+    with pytest.raises(RuntimeError):
+        await service.delete_task(projectId="P1", taskId="T1")
+
+    rag.delete_task.assert_called_once_with(projectId="P1", taskId="T1")
+    assert AsyncRAGService.stats()["failed"] == before + 1
@@ -0,0 +1,68 @@
+import random
+import pytest
+
+from backend.benchmarks.bench_chunking import legacy_chunk_text, sample_text
+from backend.rag import chunking
+from backend.rag.chunking import _WS, chunk_and_hash_many, chunk_text, iter_chunks, normalize_text, sha256_of
+
+
+EDGE_CASES = [
+    "",
+    "   \n\t ",
+    "one sentence without end",
+    "a. . b! ? c",
+    "Wait!!  Really?\n\nYes.",
+    "x " * 500,  # one huge sentence
+    " non breaking　spaces. next one.",
+]
+
+
+@pytest.mark.parametrize("text", EDGE_CASES)
+@pytest.mark.parametrize("max_words,overlap_words", [(220, 40), (5, 2), (3, 10), (1, 0)])
+def test_same_chunks_as_legacy_on_edge_cases(text, max_words, overlap_words):
+    assert chunk_text(text, max_words, overlap_words) == legacy_chunk_text(text, max_words, overlap_words)
+
+
+def test_same_chunks_as_legacy_on_random_text():
+    rng = random.Random(7)
+    for seed in range(20):
+        text = sample_text(rng.randint(100, 20_000), seed=seed)
+        max_words = rng.randint(5, 300)
+        overlap_words = rng.randint(0, max_words)
+        assert chunk_text(text, max_words, overlap_words) == legacy_chunk_text(text, max_words, overlap_words)
+
+
+def test_normalize_matches_regex_version():
+    text = " a\t\tb\n c   d  "
+    assert normalize_text(text) == _WS.sub(" ", text.strip()) == "a b c d"
+
+
+def test_iter_chunks_is_lazy():
+    chunks = iter_chunks(sample_text(200_000), max_words=50, overlap_words=10)
+
+    first = next(chunks)
+
+    assert len(first.split()) <= 50
+    assert first == chunk_text(sample_text(200_000), max_words=50, overlap_words=10)[0]
+
+
+def test_chunk_and_hash_many_in_a_process_pool_keeps_order():
+    texts = [sample_text(2_000, seed=i) for i in range(8)]
+
+    pooled = chunk_and_hash_many(texts, workers=2)
+
+    assert pooled == chunk_and_hash_many(texts, workers=0)
+    assert pooled[3] == [(c, sha256_of(c)) for c in chunk_text(texts[3])]
+
+
+def test_chunk_and_hash_many_reuses_its_process_pool():
+    texts = [sample_text(500, seed=i) for i in range(8)]
+    try:
+        chunk_and_hash_many(texts, workers=2)
+        pool = chunking._pool
+
+        assert chunk_and_hash_many(texts, workers=2) == chunk_and_hash_many(texts, workers=0)
+        assert chunking._pool is pool
+    finally:
+        chunking.shutdown_chunk_pool()
+    assert chunking._pool is None
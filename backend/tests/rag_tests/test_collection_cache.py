@@ -0,0 +1,86 @@
+from unittest.mock import patch, MagicMock
+
+from backend.rag.collection_cache import CollectionCache
+from backend.rag.vector_store import VectorStore, VSConfig
+
+
+def _store(path, **cfg):
+    with patch("backend.rag.vector_store.chromadb.PersistentClient") as mock_client, \
+         patch("backend.rag.vector_store.embedding_functions.DefaultEmbeddingFunction"):
+        vs = VectorStore(VSConfig(persist_dir=str(path), **cfg))
+    client = mock_client.return_value
+    client.get_or_create_collection.side_effect = lambda name, embedding_function: MagicMock(name=name)
+    return vs, client
+
+
+def test_catalog_is_looked_up_once_per_project(tmp_path):
+    vs, client = _store(tmp_path)
+
+    vs.query("P1", "login bug")
+    vs.delete_ids("P1", ["task-T1-0"])
+    vs.get_chunk_metadatas("P1", {"taskId": "T1"})
+    vs.query("P2", "login bug")
+
+    assert client.get_or_create_collection.call_count == 2
+    stats = vs.collections.stats()
+    assert stats["catalog_lookups_avoided"] == 2
+    assert stats["catalog_lookups"] == 2
+    assert stats["entries"] == 2
+
+
+def test_delete_project_drops_the_cached_handle(tmp_path):
+    vs, client = _store(tmp_path)
+    before = vs._collection("P1")
+
+    vs.delete_project("P1")
+    after = vs._collection("P1")
+
+    client.delete_collection.assert_called_once_with(name="proj_P1")
+    assert after is not before
+    assert client.get_or_create_collection.call_count == 2
+    assert vs.collections.stats()["invalidations"] == 1
+
+
+def test_least_recently_used_handle_is_evicted(tmp_path):
+    vs, client = _store(tmp_path, collection_cache_size=2)
+    vs._collection("P1")
+    vs._collection("P2")
+    vs._collection("P1")
+    vs._collection("P3")
+
+    vs._collection("P1")
+    assert client.get_or_create_collection.call_count == 3
+    vs._collection("P2")
+    assert client.get_or_create_collection.call_count == 4
+    assert vs.collections.stats()["evictions"] == 2
+
+
+def test_prewarm_opens_existing_collections_only(tmp_path):
+    vs, client = _store(tmp_path)
+
+    def get_collection(name, embedding_function):
+        if name == "proj_GONE":
+            raise ValueError("Collection [proj_GONE] does not exist")
+        return MagicMock(name=name)
+
+    client.get_collection.side_effect = get_collection
+
+    loaded = vs.prewarm_collections(["P1", "GONE", "P2"])
+    vs.query("P1", "q")
+
+    assert loaded == 2
+    client.get_or_create_collection.assert_not_called()
+    assert vs.collections.stats()["prewarmed"] == 2
+
+
+def test_prewarm_keeps_hottest_when_over_capacity():
+    cache = CollectionCache(loader=lambda pid: object(), max_entries=2)
+
+    loaded = cache.prewarm(["HOT", "WARM", "COLD"], opener=lambda pid: object())
+
+    assert loaded == 2
+    cache.get("NEW")
+    # the colder prewarmed handle goes first
+    assert cache.stats()["evictions"] == 1
+    assert cache.get("HOT") is not None
+    assert cache.stats()["catalog_lookups"] == 1
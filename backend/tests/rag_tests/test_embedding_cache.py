@@ -0,0 +1,72 @@
+import numpy as np
+from unittest.mock import MagicMock
+
+from backend.rag.embedding_cache import EmbeddingCache, CachedEmbeddingFunction, claim_cache_dir
+
+
+def _fake_model():
+    # deterministic 4-dim "embedding" per text
+    inner = MagicMock(side_effect=lambda texts: [np.full(4, len(t), dtype=np.float32) for t in texts])
+    return inner
+
+
+def test_cached_embedding_function_only_embeds_misses(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=10)
+    inner = _fake_model()
+    ef = CachedEmbeddingFunction(cache, inner=inner)
+
+    first = ef(["aa", "bbb", "aa"])
+    second = ef(["bbb", "cccc"])
+
+    # duplicates inside a batch and across calls are embedded once
+    assert inner.call_args_list[0][0][0] == ["aa", "bbb"]
+    assert inner.call_args_list[1][0][0] == ["cccc"]
+    assert [float(v[0]) for v in first] == [2.0, 3.0, 2.0]
+    assert [float(v[0]) for v in second] == [3.0, 4.0]
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 4
+
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=2)
+    cache.put_many({"a": np.ones(3), "b": np.ones(3) * 2})
+    cache.get_many(["a"])  # "b" is now the oldest
+    cache.put_many({"c": np.ones(3) * 3})
+
+    assert set(cache.get_many(["a", "b", "c"])) == {"a", "c"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_embedding_cache_persists_between_instances(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=4)
+    cache.put_many({"k": np.arange(3, dtype=np.float32)})
+    cache.flush()
+
+    reopened = EmbeddingCache(str(tmp_path), max_entries=4)
+    found = reopened.get_many(["k"])
+
+    assert np.allclose(found["k"], [0, 1, 2])
+
+
+def test_each_process_claims_its_own_cache_dir(tmp_path):
+    first = claim_cache_dir(str(tmp_path))
+    second = claim_cache_dir(str(tmp_path))
+
+    assert first != second
+    assert first == str(tmp_path / "worker-0")
+
+
+def test_reused_slot_without_flush_is_a_miss_after_restart(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_entries=1, flush_every=1000)
+    cache.put_many({"old": np.ones(3)})
+    cache.flush()
+    # "new" takes the slot of "old", but the index on disk still says "old"
+    cache.put_many({"new": np.ones(3) * 2})
+
+    reopened = EmbeddingCache(str(tmp_path), max_entries=1)
+
+    assert reopened.get_many(["old"]) == {}
+    reopened.put_many({"other": np.ones(3) * 3})
+    assert np.allclose(reopened.get_many(["other"])["other"], [3, 3, 3])
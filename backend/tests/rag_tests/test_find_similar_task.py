@@ -0,0 +1,52 @@
+import numpy as np
+from unittest.mock import MagicMock
+from backend.rag.retriever import RAGService
+
+
+def _rag(metadatas, vectors):
+    rag = RAGService()
+    rag.vs = MagicMock()
+    rag.vs.query.return_value = {
+        "ids": [[f"task-{md['taskId']}-0" for md in metadatas]],
+        "metadatas": [metadatas],
+        "distances": [[0.5] * len(metadatas)],
+    }
+    rag.vs.embed_texts.side_effect = lambda texts: [np.asarray(vectors[t], dtype=np.float32) for t in texts]
+    return rag
+
+
+def _task(task_id, title, description="", ai="Build it.", points=3):
+    return {"taskId": task_id, "title": title, "user_description": description,
+            "ai_description": ai, "story_points": points}
+
+
+def test_find_similar_task_compares_title_and_description_on_both_sides():
+    rag = _rag(
+        [_task("T1", "Login page", "user can log in", ai="Build the login form.")],
+        {"Login page user can log in": [1.0, 0.0], "Login page User can log in": [0.99, 0.14]},
+    )
+
+    result = rag.find_similar_task("P1", "Login page", "User can log in", min_similarity=0.95)
+
+    assert result == {"taskId": "T1", "similarity": 0.9901, "ai_description": "Build the login form.", "story_points": 3}
+    assert rag.vs.query.call_args.kwargs["where"] == {"type": "task"}
+    # the stored chunk (with its AI description) is not what gets compared
+    assert rag.vs.embed_texts.call_args[0][0] == ["Login page User can log in", "Login page user can log in"]
+
+
+def test_find_similar_task_below_threshold_is_a_miss():
+    rag = _rag([_task("T1", "Signup page")], {"Login page": [1.0, 0.0], "Signup page": [0.6, 0.8]})
+
+    assert rag.find_similar_task("P1", "Login page", "", min_similarity=0.95) is None
+
+
+def test_find_similar_task_skips_the_edited_task_and_picks_the_closest():
+    rag = _rag(
+        [_task("T1", "Login page", ai="itself", points=5), _task("T2", "Login form"), _task("T3", "Login screen", ai="other", points=2)],
+        {"Login page": [1.0, 0.0], "Login form": [0.96, 0.28], "Login screen": [0.99, 0.14]},
+    )
+
+    result = rag.find_similar_task("P1", "Login page", "", min_similarity=0.95, exclude_task_id="T1")
+
+    assert result["taskId"] == "T3"
+    assert result["story_points"] == 2
@@ -8,31 +8,29 @@ def test_get_previous_tasks():
     rag.vs = MagicMock()
 
     # Mocked vector-store response with task chunks
-    rag.vs.query.return_value = {
-        "documents": [["Task chunk A", "Task chunk B"]]
+    rag.vs.get.return_value = {
+        "ids": ["task-T1-0", "task-T2-0"],
+        "documents": ["Task chunk A", "Task chunk B"]
     }
 
     result = rag.get_previous_tasks("P123")
 
     assert result == ["Task chunk A", "Task chunk B"]
 
-    # Ensure query was called correctly
-    rag.vs.query.assert_called_once_with(
-        project_id="P123",
-        query_text="",
-        k=50,
-        where={"type": "task"}
-    )
+    # Deterministic read, no similarity query (nothing gets embedded)
+    rag.vs.get.assert_called_once_with("P123", where={"type": "task"}, include=["documents"])
+    rag.vs.query.assert_not_called()
 
 def test_get_previous_tasks_empty():
 
     rag = RAGService()
     rag.vs = MagicMock()
 
-    rag.vs.query.return_value = {
-        "documents": [[]]
+    rag.vs.get.return_value = {
+        "ids": [],
+        "documents": []
     }
 
     result = rag.get_previous_tasks("P123")
 
-    assert result == []  # empty list returned
\ No newline at end of file
+    assert result == []  # empty list returned
@@ -0,0 +1,18 @@
+from unittest.mock import MagicMock
+from backend.rag.retriever import RAGService
+
+
+def test_get_previous_task_texts_groups_chunks_per_task():
+
+    rag = RAGService()
+    rag.vs = MagicMock()
+
+    rag.vs.get.return_value = {
+        "ids": ["task-T1-1", "task-T2-0", "task-T1-0"],
+        "documents": ["T1 second", "T2 only", "T1 first"],
+        "metadatas": [{"taskId": "T1"}, {"taskId": "T2"}, {"taskId": "T1"}],
+    }
+
+    result = rag.get_previous_task_texts("P123")
+
+    assert result == {"T1": "T1 first\nT1 second", "T2": "T2 only"}
@@ -8,8 +8,9 @@ def test_get_project_by_id():
     rag.vs = MagicMock()  # prevent real DB access
 
     # Mock vector-store response
-    rag.vs.query.return_value = {
-        "documents": [["Chunk A", "Chunk B"]],
+    rag.vs.get.return_value = {
+        "ids": ["proj-P123-0", "proj-P123-1"],
+        "documents": ["Chunk A", "Chunk B"],
     }
 
     result = rag.get_project_by_id("P123")
@@ -17,10 +18,6 @@ def test_get_project_by_id():
     # It should join the documents with newline
     assert result == "Chunk A\nChunk B"
 
-    # Ensure query was called correctly
-    rag.vs.query.assert_called_once_with(
-        project_id="P123",
-        query_text="",
-        k=50,
-        where={"type": "project"},
-    )
\ No newline at end of file
+    # Deterministic read, no similarity query (nothing gets embedded)
+    rag.vs.get.assert_called_once_with("P123", where={"type": "project"}, include=["documents"])
+    rag.vs.query.assert_not_called()
@@ -0,0 +1,52 @@
+from unittest.mock import patch, MagicMock
+
+from backend.rag import retriever
+from backend.rag.lexical_index import BM25Index
+from backend.rag.retriever import RAGService
+from backend.types.types import RetrieveRequest
+
+
+def _rag():
+    rag = RAGService()
+    rag.vs = MagicMock()
+    rag.vs.query.return_value = {
+        "ids": [["task-T1-0", "task-T2-0"]],
+        "documents": [["Login page redesign", "Dashboard charts"]],
+        "metadatas": [[{"type": "task", "taskId": "T1"}, {"type": "task", "taskId": "T2"}]],
+    }
+    index = BM25Index()
+    index.add("task-T1-0", "Login page redesign", {"type": "task"})
+    index.add("task-T2-0", "Dashboard charts", {"type": "task"})
+    index.add("task-T3-0", "Fix PAY-4521 webhook signature", {"type": "task"})
+    index.add("task-T4-0", "PAY-4521 follow up", {"type": "task", "status": "archived"})
+    rag.vs.lexical_index.return_value = index
+    rag.vs.get_documents.return_value = {"task-T3-0": ("Fix PAY-4521 webhook signature", {"type": "task", "taskId": "T3"})}
+    return rag
+
+
+def test_hybrid_brings_in_the_exact_identifier_match():
+    rag = _rag()
+    req = RetrieveRequest(projectId="P1", title="PAY-4521 webhook retries", user_description="", top_k=2)
+
+    with patch.object(retriever.settings, "RETRIEVAL_MODE", "hybrid"):
+        res = rag.retrieve(req)
+
+    # the lexical top hit takes the place of the second vector hit; the archived one is filtered
+    assert [c.doc_id for c in res.contexts] == ["task-T1-0", "task-T3-0"]
+    assert res.contexts[1].text == "Fix PAY-4521 webhook signature"
+    rag.vs.get_documents.assert_called_once_with("P1", ["task-T3-0"])
+
+    fused = res.retrieval_stats["fused"]
+    assert fused[0] == {"doc_id": "task-T1-0", "score": round(1 / 61, 6), "vector_rank": 1, "lexical_rank": None}
+    assert fused[1] == {"doc_id": "task-T3-0", "score": round(1 / 61, 6), "vector_rank": None, "lexical_rank": 1}
+
+
+def test_vector_mode_is_unchanged():
+    rag = _rag()
+    req = RetrieveRequest(projectId="P1", title="PAY-4521 webhook retries", user_description="", top_k=2)
+
+    res = rag.retrieve(req)
+
+    assert [c.doc_id for c in res.contexts] == ["task-T1-0", "task-T2-0"]
+    assert "fused" not in res.retrieval_stats
+    rag.vs.lexical_index.assert_not_called()
@@ -0,0 +1,92 @@
+from unittest.mock import patch, MagicMock
+
+from backend.rag.retriever import RAGService
+from backend.types.types import IndexEnrichedTaskRequest
+
+
+def _req(**overrides):
+    data = dict(
+        taskId="T1",
+        projectId="P1",
+        task_title="Build login feature",
+        user_description="User wants a login form",
+        ai_description="AI generated description",
+        status="todo",
+        story_points=3,
+    )
+    data.update(overrides)
+    return IndexEnrichedTaskRequest(**data)
+
+
+def _stored(rag, req, chunks):
+    """Metadata as Chroma would return it for an already indexed task (None values dropped)."""
+    items = {}
+    for i, ch in enumerate(chunks):
+        md = {
+            "projectId": req.projectId, "type": "task", "taskId": req.taskId,
+            "title": req.task_title, "status": req.status,
+            "user_description": req.user_description,
+            "ai_description": req.ai_description,
+            "story_points": req.story_points, "hash": f"hash({ch})",
+        }
+        items[f"task-{req.taskId}-{i}"] = md
+    return items
+
+
+def test_index_task_skips_unchanged_chunks():
+    rag = RAGService()
+    rag.vs = MagicMock()
+
+    with patch("backend.rag.retriever.chunk_text") as mock_chunk, \
+         patch("backend.rag.retriever.sha256_of", side_effect=lambda x: f"hash({x})"):
+        mock_chunk.return_value = ["chunk_A", "chunk_B_changed"]
+        req = _req()
+        rag.vs.get_chunk_metadatas.return_value = _stored(rag, req, ["chunk_A", "chunk_B", "chunk_C"])
+        rag.vs.upsert_texts.side_effect = lambda pid, items: len(items)
+
+        result = rag.index_task(req)
+
+    assert result == {"chunks_indexed": 1, "skipped": 1}
+
+    rag.vs.get_chunk_metadatas.assert_called_once_with("P1", where={"taskId": "T1"})
+
+    _, embedded = rag.vs.upsert_texts.call_args[0]
+    assert [it["id"] for it in embedded] == ["task-T1-1"]
+
+    # unchanged chunk with identical metadata needs no write at all
+    _, refreshed = rag.vs.update_metadatas.call_args[0]
+    assert refreshed == []
+
+    # text got shorter -> trailing chunk removed
+    rag.vs.delete_ids.assert_called_once_with("P1", ["task-T1-2"])
+
+
+def test_index_task_metadata_only_change_is_not_embedded():
+    rag = RAGService()
+    rag.vs = MagicMock()
+
+    with patch("backend.rag.retriever.chunk_text") as mock_chunk, \
+         patch("backend.rag.retriever.sha256_of", side_effect=lambda x: f"hash({x})"):
+        mock_chunk.return_value = ["chunk_A"]
+        rag.vs.get_chunk_metadatas.return_value = _stored(rag, _req(), ["chunk_A"])
+        rag.vs.upsert_texts.side_effect = lambda pid, items: len(items)
+
+        result = rag.index_task(_req(status="done"))
+
+    assert result == {"chunks_indexed": 0, "skipped": 1}
+
+    _, refreshed = rag.vs.update_metadatas.call_args[0]
+    assert [it["id"] for it in refreshed] == ["task-T1-0"]
+    assert refreshed[0]["metadata"]["status"] == "done"
+
+
+def test_index_task_full_mode_embeds_everything():
+    rag = RAGService()
+    rag.vs = MagicMock()
+    rag.vs.upsert_texts.return_value = 2
+
+    with patch("backend.rag.retriever.chunk_text", return_value=["a", "b"]):
+        result = rag.index_task(_req(), incremental=False)
+
+    assert result == {"chunks_indexed": 2, "skipped": 0}
+    rag.vs.get_chunk_metadatas.assert_not_called()
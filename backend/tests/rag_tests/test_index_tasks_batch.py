@@ -0,0 +1,122 @@
+from unittest.mock import patch, MagicMock
+
+from backend.rag.retriever import RAGService
+from backend.types.types import IndexEnrichedTaskRequest
+
+
+def test_index_tasks_batch_groups_chunks_into_large_upserts():
+    rag = RAGService()
+    rag.vs = MagicMock()
+    rag.vs.upsert_texts.side_effect = lambda pid, items, embeddings=None: len(items)
+    rag.vs.embed_texts.side_effect = lambda texts: [[float(len(t))] for t in texts]
+
+    reqs = [
+        IndexEnrichedTaskRequest(
+            taskId=f"T{i}", projectId="P1", task_title=f"Task {i}",
+            user_description="desc", ai_description="ai", status="todo", story_points=1,
+        )
+        for i in range(3)
+    ]
+
+    with patch("backend.rag.retriever.chunk_text", return_value=["c0", "c1"]):
+        result = rag.index_tasks_batch(reqs, batch_size=4, workers=0)
+
+    # every task has the same two chunks: the first batch embeds them once
+    assert result == {"chunks_indexed": 6, "skipped": 0, "deduplicated": 2}
+    assert [c[0][0] for c in rag.vs.embed_texts.call_args_list] == [["c0", "c1"], ["c0", "c1"]]
+
+    # 6 chunks with batch size 4 -> two upserts instead of one per task
+    sizes = [len(c[0][1]) for c in rag.vs.upsert_texts.call_args_list]
+    assert sizes == [4, 2]
+    first_ids = [it["id"] for it in rag.vs.upsert_texts.call_args_list[0][0][1]]
+    assert first_ids == ["task-T0-0", "task-T0-1", "task-T1-0", "task-T1-1"]
+
+
+def test_index_tasks_batch_defaults_to_chroma_max_batch_size_and_dedups_ids():
+    rag = RAGService()
+    rag.vs = MagicMock()
+    rag.vs.max_batch_size.return_value = 5461
+    rag.vs.upsert_texts.side_effect = lambda pid, items, embeddings=None: len(items)
+    rag.vs.embed_texts.side_effect = lambda texts: [[0.0] for _ in texts]
+
+    def task(task_id, project_id, title):
+        return IndexEnrichedTaskRequest(
+            taskId=task_id, projectId=project_id, task_title=title,
+            user_description="", ai_description="", status="todo", story_points=1,
+        )
+
+    old, new, other = task("T1", "P1", "Old title"), task("T1", "P1", "New title"), task("T2", "P2", "Other")
+
+    result = rag.index_tasks_batch([old, new, other], workers=0)
+
+    assert result["chunks_indexed"] == 2
+    calls = rag.vs.upsert_texts.call_args_list
+    assert [c[0][0] for c in calls] == ["P1", "P2"]
+    assert [it["text"] for it in calls[0][0][1]] == ["New title"]
+    assert len(calls[0][1]["embeddings"]) == 1
+
+
+def test_index_tasks_batch_removes_stale_task_chunks():
+    rag = RAGService()
+    rag.vs = MagicMock()
+    rag.vs.upsert_texts.side_effect = lambda pid, items, embeddings=None: len(items)
+    rag.vs.embed_texts.side_effect = lambda texts: [[0.0] for _ in texts]
+    # T1 had three chunks, its text now fits in one; T2 is new
+    rag.vs.get_chunk_metadatas.return_value = {"task-T1-0": {}, "task-T1-1": {}, "task-T1-2": {}}
+
+    reqs = [
+        IndexEnrichedTaskRequest(
+            taskId=task_id, projectId="P1", task_title="Short now",
+            user_description="", ai_description="", status="todo", story_points=1,
+        )
+        for task_id in ("T1", "T2")
+    ]
+    rag.index_tasks_batch(reqs, batch_size=10, workers=0)
+
+    rag.vs.get_chunk_metadatas.assert_called_once_with("P1", where={"taskId": {"$in": ["T1", "T2"]}})
+    rag.vs.delete_ids.assert_called_once_with("P1", ["task-T1-1", "task-T1-2"])
+
+
+def test_index_projects_batch_removes_stale_project_chunks():
+    from backend.types.types import IndexProjectRequest
+
+    rag = RAGService()
+    rag.vs = MagicMock()
+    rag.vs.upsert_texts.side_effect = lambda pid, items, embeddings=None: len(items)
+    rag.vs.embed_texts.side_effect = lambda texts: [[0.0] for _ in texts]
+    rag.vs.get_chunk_metadatas.return_value = {"proj-P1-0": {}, "proj-P1-1": {}}
+
+    reqs = [IndexProjectRequest(projectId="P1", userId="U1", name="Demo", description="Short now.")]
+    result = rag.index_projects_batch(reqs, batch_size=10, workers=0)
+
+    assert result["chunks_indexed"] == 1
+    rag.vs.delete_ids.assert_called_once_with("P1", ["proj-P1-1"])
+    assert rag.vs.upsert_texts.call_args[0][1][0]["metadata"]["type"] == "project"
+
+
+def test_index_tasks_batch_skips_unchanged_chunks():
+    rag = RAGService()
+    rag.vs = MagicMock()
+    rag.vs.upsert_texts.side_effect = lambda pid, items, embeddings=None: len(items)
+    rag.vs.embed_texts.side_effect = lambda texts: [[0.0] for _ in texts]
+
+    def task(task_id, status):
+        return IndexEnrichedTaskRequest(
+            taskId=task_id, projectId="P1", task_title=f"Task {task_id}",
+            user_description="desc", ai_description="ai", status=status, story_points=1,
+        )
+
+    # T1 is stored as is, T2 only changed its status, T3 is new
+    stored = [task("T1", "todo"), task("T2", "todo")]
+    rag.vs.get_chunk_metadatas.return_value = {
+        it["id"]: {k: v for k, v in it["metadata"].items() if v is not None}
+        for req in stored for it in rag._task_items(req)
+    }
+
+    result = rag.index_tasks_batch([task("T1", "todo"), task("T2", "done"), task("T3", "todo")], workers=0)
+
+    assert result["chunks_indexed"] == 1
+    assert result["skipped"] == 2
+    assert [it["id"] for it in rag.vs.upsert_texts.call_args[0][1]] == ["task-T3-0"]
+    assert [it["id"] for it in rag.vs.update_metadatas.call_args[0][1]] == ["task-T2-0"]
+    rag.vs.embed_texts.assert_called_once()
@@ -0,0 +1,130 @@
+from unittest.mock import patch, MagicMock
+
+from backend.rag.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+from backend.rag.vector_store import VectorStore, VSConfig
+
+
+def test_tokenize_keeps_identifiers_and_their_parts():
+    terms = tokenize("Fix PROJ-123: get_user returns E1001 for the v2.1 API")
+
+    assert "proj-123" in terms and "proj" in terms and "123" in terms
+    assert "get_user" in terms and "user" in terms
+    assert "e1001" in terms and "v2.1" in terms
+    assert "the" not in terms
+
+
+def test_bm25_ranks_exact_identifier_first_and_filters():
+    index = BM25Index()
+    index.add("a", "Login page shows an error after submit", {"status": "todo"})
+    index.add("b", "Handle error E1001 from the payments API", {"status": "todo"})
+    index.add("c", "E1001 E1001 retry payments", {"status": "archived"})
+
+    hits = index.search("payments fail with E1001", k=5, accept=lambda md: md["status"] != "archived")
+
+    assert [cid for cid, _ in hits] == ["b"]
+
+
+def test_bm25_replace_and_remove():
+    index = BM25Index()
+    index.add("a", "cache invalidation", {})
+    index.add("a", "redis pubsub", {})
+    index.add("b", "redis cluster", {})
+
+    assert index.search("cache") == []
+    assert {cid for cid, _ in index.search("redis")} == {"a", "b"}
+
+    index.remove(["a"])
+    assert len(index) == 1
+    assert [cid for cid, _ in index.search("pubsub")] == []
+
+
+def test_rrf_rewards_agreement():
+    fused = reciprocal_rank_fusion([["x", "y"], ["y", "z"]], k=60)
+
+    assert [cid for cid, _ in fused] == ["y", "x", "z"]
+    assert fused[0][1] == 1 / 62 + 1 / 61
+
+
+def _store(path):
+    with patch("backend.rag.vector_store.chromadb.PersistentClient") as mock_client, \
+         patch("backend.rag.vector_store.embedding_functions.DefaultEmbeddingFunction"):
+        vs = VectorStore(VSConfig(persist_dir=str(path)))
+    coll = MagicMock()
+    mock_client.return_value.get_or_create_collection.return_value = coll
+    return vs, coll
+
+
+def test_vector_store_builds_the_index_once_and_keeps_it_in_sync(tmp_path):
+    vs, coll = _store(tmp_path)
+    coll.get.return_value = {
+        "ids": ["task-T1-0"], "documents": ["Migrate auth to OAuth2"], "metadatas": [{"type": "task", "taskId": "T1"}],
+    }
+
+    index = vs.lexical_index("P1")
+    assert [cid for cid, _ in index.search("oauth2")] == ["task-T1-0"]
+
+    vs.upsert_texts("P1", [{"id": "task-T2-0", "text": "OAuth2 refresh tokens", "metadata": {"type": "task"}}])
+    assert vs.lexical_index("P1") is index
+    assert len(index.search("oauth2")) == 2
+    # loaded from Chroma only the first time
+    assert coll.get.call_count == 1
+
+    vs.delete_ids("P1", ["task-T1-0"])
+    assert [cid for cid, _ in index.search("oauth2")] == ["task-T2-0"]
+
+    vs.delete_project("P1")
+    assert vs.lexical.get("P1") is None
+
+
+def test_index_is_rebuilt_after_a_write_from_another_process(tmp_path):
+    vs, coll = _store(tmp_path)
+    other, other_coll = _store(tmp_path)
+    coll.get.return_value = {
+        "ids": ["task-T1-0"], "documents": ["Fix PROJ-7 login"], "metadatas": [{"type": "task", "status": "todo"}],
+    }
+    index = vs.lexical_index("P1")
+    accept_open = lambda md: md["status"] != "archived"
+    assert len(index.search("proj-7", accept=accept_open)) == 1
+
+    # same chunk count, only the status changed
+    other.update_metadatas("P1", [{"id": "task-T1-0", "metadata": {"status": "archived"}}])
+    coll.get.return_value = {
+        "ids": ["task-T1-0"], "documents": ["Fix PROJ-7 login"], "metadatas": [{"type": "task", "status": "archived"}],
+    }
+
+    rebuilt = vs.lexical_index("P1")
+    assert rebuilt is not index
+    assert rebuilt.search("proj-7", accept=accept_open) == []
+    assert vs.lexical_index("P1") is rebuilt
+    assert coll.get.call_count == 2
+    # a write of this process keeps its index current
+    vs.upsert_texts("P1", [{"id": "task-T2-0", "text": "PROJ-7 follow-up", "metadata": {"status": "todo"}}])
+    assert vs.lexical_index("P1") is rebuilt
+
+
+def test_least_recently_searched_index_is_evicted(tmp_path):
+    vs, coll = _store(tmp_path)
+    vs.lexical.max_projects = 2
+    coll.get.return_value = {"ids": [], "documents": [], "metadatas": []}
+
+    vs.lexical_index("P1")
+    vs.lexical_index("P2")
+    vs.lexical_index("P1")
+    vs.lexical_index("P3")
+
+    assert vs.lexical.get("P2") is None
+    assert vs.lexical.get("P1") is not None and vs.lexical.get("P3") is not None
+    assert vs.lexical.stats()["evictions"] == 1
+
+
+def test_very_common_terms_are_pruned_in_large_indexes_only():
+    index = BM25Index(prune_min_docs=10)
+    for i in range(20):
+        index.add(f"d{i}", f"common word{i}", {})
+
+    assert index.search("common") == []
+    assert [cid for cid, _ in index.search("common word3")] == ["d3"]
+
+    small = BM25Index(prune_min_docs=10)
+    small.add("a", "common", {})
+    assert [cid for cid, _ in small.search("common")] == ["a"]
@@ -0,0 +1,75 @@
+import pytest
+from unittest.mock import patch
+from tokenizers import Tokenizer, models, normalizers, pre_tokenizers
+
+from backend.rag import retriever
+from backend.rag.chunking import chunk_by_tokens, normalize_text
+
+
+WORDS = ["login", "api", "dashboard", "cache", "the", "user", "token", "deploy"]
+
+
+@pytest.fixture
+def tokenizer():
+    """A tiny BERT-style wordpiece tokenizer ("deploy" is 2 pieces, punctuation 1)."""
+    vocab = ["[UNK]", ".", "!", "?", "login", "api", "dashboard", "cache", "the", "user", "token", "de", "##ploy"]
+    tok = Tokenizer(models.WordPiece({w: i for i, w in enumerate(vocab)}, unk_token="[UNK]"))
+    tok.normalizer = normalizers.BertNormalizer(lowercase=True)
+    tok.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    return tok
+
+
+def _sentences(n, length):
+    return " ".join(
+        " ".join(WORDS[(i + j) % len(WORDS)] for j in range(length)) + "." for i in range(n)
+    )
+
+
+def _tokens(tokenizer, text):
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def test_chunks_fit_the_model_limit(tokenizer):
+    text = _sentences(60, 9)
+
+    chunks = chunk_by_tokens(text, max_tokens=40, overlap_tokens=12, tokenizer=tokenizer)
+
+    assert len(chunks) > 1
+    # room is left for [CLS] / [SEP]
+    assert all(_tokens(tokenizer, c) <= 38 for c in chunks)
+    # packed close to the limit, not by word count
+    assert all(_tokens(tokenizer, c) > 38 - 12 for c in chunks[:-1])
+    # nothing is lost: the last sentence is in the last chunk, the first in the first
+    assert chunks[0].startswith(normalize_text(text)[:20])
+    assert chunks[-1].endswith(normalize_text(text)[-20:])
+
+
+def test_consecutive_chunks_overlap(tokenizer):
+    chunks = chunk_by_tokens(_sentences(30, 5), max_tokens=30, overlap_tokens=10, tokenizer=tokenizer)
+
+    for prev, nxt in zip(chunks, chunks[1:]):
+        last_sentence = prev.rsplit(". ", 1)[-1]
+        assert nxt.startswith(last_sentence)
+
+
+def test_long_sentence_is_cut_at_word_boundaries(tokenizer):
+    text = " ".join(["deploy"] * 50) + "."
+
+    chunks = chunk_by_tokens(text, max_tokens=12, overlap_tokens=0, tokenizer=tokenizer)
+
+    assert all(_tokens(tokenizer, c) <= 10 for c in chunks)
+    # "deploy" is 2 wordpieces and never cut in half
+    assert all(c == " ".join(["deploy"] * 5) for c in chunks[:-1])
+    assert chunks[-1] == "."
+
+
+def test_retriever_uses_the_configured_mode(tokenizer):
+    text = _sentences(20, 9)
+
+    with patch.object(retriever.settings, "CHUNK_MODE", "tokens"), \
+         patch.object(retriever.settings, "EMBED_MAX_TOKENS", 40), \
+         patch("backend.rag.chunking.embedding_tokenizer", return_value=tokenizer):
+        by_tokens = retriever.chunk(text)
+
+    assert by_tokens == chunk_by_tokens(text, 40, retriever.settings.CHUNK_OVERLAP_TOKENS, tokenizer)
+    assert retriever.chunk(text) != by_tokens
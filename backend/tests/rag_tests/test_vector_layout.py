@@ -0,0 +1,125 @@
+import hashlib
+
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+from backend.rag.migrate_layout import migrate_layout
+from backend.rag.vector_layout import PerProjectLayout, ShardedLayout, make_layout
+from backend.rag.vector_store import VectorStore, VSConfig
+
+
+class HashEmbedding(EmbeddingFunction[Documents]):
+    """Deterministic unit vectors, no model download."""
+
+    def __init__(self) -> None:
+        pass
+
+    def __call__(self, input: Documents) -> Embeddings:
+        out = []
+        for text in input:
+            seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "big")
+            v = np.random.default_rng(seed).normal(size=8).astype(np.float32)
+            out.append(v / np.linalg.norm(v))
+        return out
+
+    @staticmethod
+    def name() -> str:
+        return "default"
+
+    def get_config(self):
+        return {}
+
+    @staticmethod
+    def build_from_config(config):
+        return HashEmbedding()
+
+
+def _store(path, layout, shards=4):
+    vs = VectorStore(VSConfig(persist_dir=str(path), layout=layout, shards=shards))
+    vs.embed = HashEmbedding()
+    return vs
+
+
+def _items(project_id, task_id, n, status="todo"):
+    return [{
+        "id": f"task-{task_id}-{i}",
+        "text": f"{task_id} chunk {i} of project {project_id}",
+        "metadata": {"projectId": project_id, "type": "task", "taskId": task_id, "status": status},
+    } for i in range(n)]
+
+
+def test_shard_router_is_stable_and_spreads_projects():
+    layout = ShardedLayout(shards=8)
+
+    shards = [layout.shard_of(f"P{i}") for i in range(800)]
+
+    assert shards == [ShardedLayout(shards=8).shard_of(f"P{i}") for i in range(800)]
+    assert min(shards.count(s) for s in range(8)) > 50
+    assert layout.collection_name("P1") == layout.shard_name(layout.shard_of("P1"))
+
+
+def test_sharded_where_always_scopes_to_the_project():
+    layout = make_layout("sharded", 4)
+
+    assert layout.where("P1") == {"projectId": "P1"}
+    assert layout.where("P1", {"type": "task"}) == {"$and": [{"projectId": "P1"}, {"type": "task"}]}
+    assert PerProjectLayout().where("P1", None) is None
+    with pytest.raises(ValueError):
+        make_layout("per_user")
+
+
+def test_sharded_store_isolates_projects_sharing_a_shard(tmp_path):
+    vs = _store(tmp_path, "sharded", shards=1)
+    # same chunk ids in two projects of the same shard
+    vs.upsert_texts("P1", _items("P1", "T1", 3))
+    vs.upsert_texts("P2", _items("P2", "T1", 2))
+
+    assert vs.get("P1")["ids"] == ["task-T1-0", "task-T1-1", "task-T1-2"]
+    assert vs.count("P2") == 2
+    hits = vs.query("P2", "T1 chunk 0 of project P2", k=5, where={"type": "task"})
+    assert sorted(hits["ids"][0]) == ["task-T1-0", "task-T1-1"]
+    assert all(md["projectId"] == "P2" for md in hits["metadatas"][0])
+    assert set(vs.get_documents("P1", ["task-T1-2"])) == {"task-T1-2"}
+
+    assert vs.delete_by_task("P1", "T1") == 3
+    assert vs.count("P1") == 0
+    assert vs.count("P2") == 2
+
+    vs.delete_project("P2")
+    assert vs.count("P2") == 0
+    assert vs.project_ids() == []
+
+
+def test_sharded_hybrid_queries_do_not_count_the_project_chunks(tmp_path):
+    vs = _store(tmp_path, "sharded", shards=1)
+    vs.upsert_texts("P1", _items("P1", "T1", 3))
+
+    with patch.object(vs, "count", side_effect=AssertionError("count on the query path")):
+        index = vs.lexical_index("P1")
+        assert vs.lexical_index("P1") is index
+    assert len(index) == 3
+
+
+def test_migration_round_trip_keeps_chunks_and_embeddings(tmp_path):
+    per_project = _store(tmp_path, "per_project")
+    for p in ("P1", "P2", "P3"):
+        per_project.upsert_texts(p, _items(p, f"T{p}", 3))
+    sharded = _store(tmp_path, "sharded", shards=2)
+
+    stats = migrate_layout(per_project, sharded, page_size=2)
+
+    assert stats["projects"] == 3 and stats["chunks"] == 9
+    assert sharded.project_ids() == ["P1", "P2", "P3"]
+    assert sharded.get("P2")["documents"] == per_project.get("P2")["documents"]
+    before = per_project.client.get_collection("proj_P1").get(ids=["task-TP1-0"], include=["embeddings"])
+    (items, embeddings), = sharded.export_project("P1")
+    assert np.allclose(embeddings[0], before["embeddings"][0])
+
+    back = _store(tmp_path / "back", "per_project")
+    migrate_layout(sharded, back, delete_source=True)
+    assert back.project_ids() == ["P1", "P2", "P3"]
+    assert back.get("P3")["ids"] == ["task-TP3-0", "task-TP3-1", "task-TP3-2"]
+    assert sharded.project_ids() == []
@@ -0,0 +1,34 @@
+from unittest.mock import patch, MagicMock
+
+from backend.rag.vector_store import VectorStore, VSConfig
+
+
+def _store(path):
+    with patch("backend.rag.vector_store.chromadb.PersistentClient") as mock_client, \
+         patch("backend.rag.vector_store.embedding_functions.DefaultEmbeddingFunction"):
+        vs = VectorStore(VSConfig(persist_dir=str(path)))
+    coll = MagicMock()
+    mock_client.return_value.get_or_create_collection.return_value = coll
+    return vs, coll
+
+
+def test_delete_by_task_fetches_ids_only(tmp_path):
+    vs, coll = _store(tmp_path)
+    coll.get.return_value = {"ids": ["task-T1-0", "task-T1-1"]}
+
+    deleted = vs.delete_by_task(project_id="P1", task_id="T1")
+
+    assert deleted == 2
+    # filtered lookup, no documents / metadatas / embeddings pulled
+    coll.get.assert_called_once_with(where={"taskId": "T1"}, include=[])
+    coll.delete.assert_called_once_with(ids=["task-T1-0", "task-T1-1"])
+
+
+def test_delete_by_task_nothing_to_delete(tmp_path):
+    vs, coll = _store(tmp_path)
+    coll.get.return_value = {"ids": []}
+
+    deleted = vs.delete_by_task(project_id="P1", task_id="T404")
+
+    assert deleted == 0
+    coll.delete.assert_not_called()
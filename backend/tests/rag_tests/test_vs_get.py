@@ -0,0 +1,47 @@
+import numpy as np
+
+from backend.rag.vector_store import VectorStore, VSConfig, chunk_sort_key
+
+
+def _store(tmp_path):
+    vs = VectorStore(VSConfig(persist_dir=str(tmp_path)))
+    ids = [f"task-T{t}-{c}" for t in (2, 1, 10) for c in range(12)] + ["proj-P1-0"]
+    coll = vs.client.get_or_create_collection("proj_P1", embedding_function=None)
+    coll.add(
+        ids=ids,
+        documents=[f"doc {cid}" for cid in ids],
+        metadatas=[{"type": "project" if cid.startswith("proj") else "task"} for cid in ids],
+        embeddings=np.ones((len(ids), 4), dtype=np.float32),
+    )
+    # reads must not embed anything
+    vs.embed = None
+    vs._collection = lambda project_id: coll
+    return vs
+
+
+def test_chunk_sort_key_compares_chunk_index_as_number():
+    assert sorted(["task-T1-10", "task-T1-2", "task-T0-5"], key=chunk_sort_key) == \
+        ["task-T0-5", "task-T1-2", "task-T1-10"]
+
+
+def test_get_returns_everything_in_chunk_order(tmp_path):
+    vs = _store(tmp_path)
+
+    res = vs.get("P1", where={"type": "task"}, page_size=5)
+
+    assert len(res["ids"]) == 36
+    assert res["ids"][:3] == ["task-T1-0", "task-T1-1", "task-T1-2"]
+    assert res["ids"][11:13] == ["task-T1-11", "task-T10-0"]
+    assert res["documents"] == [f"doc {cid}" for cid in res["ids"]]
+    assert all(md == {"type": "task"} for md in res["metadatas"])
+
+
+def test_get_pages_with_limit_and_offset(tmp_path):
+    vs = _store(tmp_path)
+    everything = vs.get("P1", include=[])["ids"]
+
+    pages = [vs.get("P1", limit=10, offset=o, include=["documents"], page_size=4) for o in range(0, 40, 10)]
+
+    assert [cid for p in pages for cid in p["ids"]] == everything
+    assert "metadatas" not in pages[0]
+    assert pages[-1]["documents"] == [f"doc {cid}" for cid in everything[30:]]
@@ -0,0 +1,42 @@
+import json
+import pytest
+import httpx
+from unittest.mock import AsyncMock, patch
+
+from backend.main import app
+
+
+@pytest.mark.asyncio
+async def test_route_bulk_import_parses_ndjson():
+    body = "\n".join([
+        json.dumps({"title": "A", "description": "a", "status": "todo"}),
+        "",
+        json.dumps({"title": "B", "status": "done", "story_points": 3}),
+        json.dumps({"description": "missing title"}),
+    ])
+
+    received = []
+
+    async def fake_import(project_id, tasks, batch_size):
+        async for t in tasks:
+            received.append(t)
+        return {"imported": len(received), "failed": 0, "chunks_indexed": 2, "elapsed_s": 0.1, "tasks_per_s": 20.0}
+
+    transport = httpx.ASGITransport(app=app)
+
+    with patch("backend.api.routes._task_service.bulk_import_tasks", new=AsyncMock(side_effect=fake_import)):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            resp = await ac.post(
+                "/index/task/bulk_import?projectId=P1",
+                content=body,
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+
+    assert resp.status_code == 200
+    data = resp.json()
+
+    assert [t.title for t in received] == ["A", "B"]
+    assert data["data"]["imported"] == 2
+    assert data["data"]["rejected"] == 1
+    assert data["data"]["rejected_lines"][0]["line"] == 4
+    assert data["ok"] is False
@@ -0,0 +1,33 @@
+import pytest
+import httpx
+from unittest.mock import patch
+
+from backend.main import app
+
+
+@pytest.mark.asyncio
+async def test_route_create_task_stream_returns_sse():
+    payload = {
+        "taskId": None,
+        "userId": "U1",
+        "projectId": "P1",
+        "task_title": "Task title",
+        "user_description": "User desc",
+        "selected_model": 2,
+        "status": "todo",
+    }
+
+    async def fake_stream(req):
+        yield 'event: token\ndata: {"text": "Hi"}\n\n'
+        yield 'event: done\ndata: {"saved": true}\n\n'
+
+    transport = httpx.ASGITransport(app=app)
+
+    with patch("backend.api.routes.stream_task_enrichment", new=fake_stream):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            resp = await ac.post("/index/task/enrich_and_index/stream", json=payload)
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert "event: token" in resp.text
+    assert "event: done" in resp.text
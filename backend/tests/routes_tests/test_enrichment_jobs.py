@@ -0,0 +1,44 @@
+import pytest
+import httpx
+from unittest.mock import AsyncMock, patch
+
+from backend.main import app
+
+
+PAYLOAD = {
+    "taskId": None,
+    "userId": "U1",
+    "projectId": "P1",
+    "task_title": "Task title",
+    "user_description": "User desc",
+    "selected_model": 2,
+    "status": "todo",
+}
+
+
+@pytest.mark.asyncio
+async def test_route_enqueue_enrichment_returns_job_id():
+    transport = httpx.ASGITransport(app=app)
+
+    with patch("backend.api.routes.enrichment_queue.enqueue", new=AsyncMock(return_value=("job1", False))) as enqueue:
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            resp = await ac.post("/index/task/enrich_and_index/jobs", json=PAYLOAD)
+
+    assert resp.status_code == 202
+    assert resp.json() == {"success": True, "jobId": "job1", "deduplicated": False}
+    assert enqueue.await_args.args[0].task_title == "Task title"
+
+
+@pytest.mark.asyncio
+async def test_route_get_job():
+    transport = httpx.ASGITransport(app=app)
+    job = {"jobId": "job1", "status": "done", "result": {"story_points": 3}}
+
+    with patch("backend.api.routes.enrichment_queue.get_job", new=AsyncMock(side_effect=[job, None])):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            found = await ac.get("/index/task/jobs/job1")
+            missing = await ac.get("/index/task/jobs/nope")
+
+    assert found.status_code == 200
+    assert found.json()["result"] == {"story_points": 3}
+    assert missing.status_code == 404
@@ -0,0 +1,55 @@
+import io
+import pytest
+import httpx
+from unittest.mock import AsyncMock, patch
+
+from backend.main import app
+
+
+PAYLOAD = {"userId": "U1", "projectId": "P1", "selected_model": 1}
+
+
+@pytest.mark.asyncio
+async def test_route_handbook_pdf_sets_etag_and_honors_if_none_match_on_get():
+    transport = httpx.ASGITransport(app=app)
+    fingerprint = AsyncMock(return_value=("abc123", {"id": "P1"}))
+    pdf = io.BytesIO(b"%PDF-1.7" + b"0" * 200_000)
+    build = AsyncMock(return_value=pdf)
+
+    with patch("backend.api.routes.get_handbook_fingerprint", new=fingerprint), \
+         patch("backend.api.routes.open_handbook_pdf", new=build):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            first = await ac.post("/index/project/handbook/pdf", json=PAYLOAD)
+            second = await ac.get(
+                "/index/project/handbook/pdf", params=PAYLOAD,
+                headers={"If-None-Match": first.headers["etag"]}
+            )
+
+    assert first.status_code == 200
+    assert first.content.startswith(b"%PDF-1.7")
+    assert first.headers["content-length"] == str(len(first.content)) == "200008"
+    assert pdf.closed
+    assert first.headers["etag"] == '"abc123"'
+
+    assert second.status_code == 304
+    assert second.content == b""
+    build.assert_awaited_once()
+    assert fingerprint.await_args_list[1].args[0].projectId == "P1"
+
+
+@pytest.mark.asyncio
+async def test_route_handbook_pdf_post_ignores_if_none_match():
+    transport = httpx.ASGITransport(app=app)
+    fingerprint = AsyncMock(return_value=("abc123", {"id": "P1"}))
+    build = AsyncMock(side_effect=lambda *args: io.BytesIO(b"%PDF-1.7"))
+
+    with patch("backend.api.routes.get_handbook_fingerprint", new=fingerprint), \
+         patch("backend.api.routes.open_handbook_pdf", new=build):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            response = await ac.post(
+                "/index/project/handbook/pdf", json=PAYLOAD, headers={"If-None-Match": '"abc123"'}
+            )
+
+    # a POST never gets a 304 (RFC 9110 13.1.2): the cached PDF is sent again
+    assert response.status_code == 200
+    assert response.content == b"%PDF-1.7"
@@ -52,5 +52,7 @@ async def test_delete_project_success():
                 # delete from RAG
                 mock_rag_delete.assert_called_once_with("P1")
 
-                # delete from cache
-                mock_redis.delete.assert_awaited_once()
\ No newline at end of file
+                # delete from cache: project text, task texts and response cache version
+                mock_redis.delete.assert_awaited_once_with(
+                    "user:U1:project:P1:embeddings", "project:P1:task_texts", "project:P1:version"
+                )
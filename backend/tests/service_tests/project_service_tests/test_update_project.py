@@ -38,6 +38,7 @@ async def test_update_project_success():
     mock_redis = MagicMock()
     mock_redis.delete = AsyncMock()
     mock_redis.setex = AsyncMock()
+    mock_redis.incr = AsyncMock()
 
     # -------------------------------
     # mock rag
@@ -68,4 +69,37 @@ async def test_update_project_success():
 
                     # update cache
                     mock_redis.delete.assert_awaited_once()
-                    mock_redis.setex.assert_awaited_once()
\ No newline at end of file
+                    mock_redis.setex.assert_awaited_once()
+
+                    # cached enrichments of the old project text are invalidated
+                    mock_redis.incr.assert_awaited_once_with("project:P1:version")
+
+
+@pytest.mark.asyncio
+async def test_update_project_succeeds_when_the_cache_is_down():
+    service = ProjectService()
+
+    mock_supabase = MagicMock()
+    mock_update_query = MagicMock()
+    mock_update_query.eq.return_value = mock_update_query
+    mock_update_query.execute = AsyncMock(return_value=MagicMock(
+        data=[{"id": "P1", "user_id": "U1", "name": "Updated Name", "description": "Updated Desc"}]
+    ))
+    mock_supabase.table.return_value.update.return_value = mock_update_query
+
+    # every Redis call fails after the update is committed
+    mock_redis = MagicMock()
+    mock_redis.delete = AsyncMock(side_effect=ConnectionError("redis down"))
+    mock_redis.setex = AsyncMock(side_effect=ConnectionError("redis down"))
+    mock_redis.incr = AsyncMock(side_effect=ConnectionError("redis down"))
+    mock_redis.publish = AsyncMock(side_effect=ConnectionError("redis down"))
+
+    with patch.object(service._rag, "index_project"), \
+         patch("backend.service.project_service.get_supabase_client", new=AsyncMock(return_value=mock_supabase)), \
+         patch("backend.service.project_service.get_redis_client", new=AsyncMock(return_value=mock_redis)):
+        result = await service.update_project(
+            EditProjectRequest(projectId="P1", userId="U1", name="Updated Name", description="Updated Desc")
+        )
+
+    assert result is True
+    mock_redis.incr.assert_awaited_once_with("project:P1:version")
@@ -0,0 +1,109 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from backend.service.task_service import TaskService
+from backend.types.types import BulkImportTask
+
+
+async def _stream(tasks):
+    for t in tasks:
+        yield t
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_tasks_batches_inserts_and_rebuilds_cache_once():
+
+    service = TaskService()
+
+    # -------------------------------
+    # mock supabase: echo back ids for each inserted row
+    # -------------------------------
+    mock_supabase = MagicMock()
+    mock_table = MagicMock()
+
+    def insert(rows):
+        query = MagicMock()
+        query.execute = AsyncMock(return_value=MagicMock(
+            data=[{"id": f"T{r['title']}"} for r in rows]
+        ))
+        return query
+
+    mock_table.insert.side_effect = insert
+    mock_supabase.table.return_value = mock_table
+
+    # -------------------------------
+    # mock redis
+    # -------------------------------
+    mock_redis = MagicMock()
+    mock_upsert_script = AsyncMock(return_value=1)
+    mock_redis.register_script.return_value = mock_upsert_script
+
+    tasks = [BulkImportTask(title=str(i), description="desc", status="Done") for i in range(5)]
+
+    with patch("backend.service.task_service.get_supabase_client", new=AsyncMock(return_value=mock_supabase)):
+        with patch("backend.service.task_service.get_redis_client", new=AsyncMock(return_value=mock_redis)):
+            with patch.object(service._rag, "index_tasks_batch") as mock_rag_batch:
+                mock_rag_batch.side_effect = lambda reqs: {"chunks_indexed": len(reqs), "skipped": 0}
+
+                stats = await service.bulk_import_tasks("P1", _stream(tasks), batch_size=2)
+
+    assert stats["imported"] == 5
+    assert stats["failed"] == 0
+    assert stats["chunks_indexed"] == 5
+
+    # 5 tasks / batch of 2 -> 3 inserts and 3 embedding batches
+    assert mock_table.insert.call_count == 3
+    assert mock_rag_batch.call_count == 3
+    assert mock_table.insert.call_args_list[0][0][0][0]["status"] == "done"
+
+    # cache updated once with every new entry (taskId, entry, text triples after the ttl)
+    mock_upsert_script.assert_awaited_once()
+    args = mock_upsert_script.call_args.kwargs["args"]
+    assert args[1::2] == ["T0", "T1", "T2", "T3", "T4"]
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_reports_inserted_but_unindexed_tasks():
+
+    service = TaskService()
+
+    mock_supabase = MagicMock()
+    mock_table = MagicMock()
+    inserts = []
+
+    def insert(rows):
+        inserts.append(rows)
+        query = MagicMock()
+        if len(inserts) == 3:
+            query.execute = AsyncMock(side_effect=RuntimeError("supabase down"))
+        else:
+            query.execute = AsyncMock(return_value=MagicMock(data=[{"id": f"T{r['title']}"} for r in rows]))
+        return query
+
+    mock_table.insert.side_effect = insert
+    mock_supabase.table.return_value = mock_table
+
+    mock_redis = MagicMock()
+    mock_upsert_script = AsyncMock(return_value=1)
+    mock_redis.register_script.return_value = mock_upsert_script
+
+    def index_batch(reqs):
+        if reqs[0].taskId == "T2":
+            raise RuntimeError("chroma down")
+        return {"chunks_indexed": len(reqs), "skipped": 0}
+
+    tasks = [BulkImportTask(title=str(i), description="desc", status="todo") for i in range(5)]
+
+    with patch("backend.service.task_service.get_supabase_client", new=AsyncMock(return_value=mock_supabase)):
+        with patch("backend.service.task_service.get_redis_client", new=AsyncMock(return_value=mock_redis)):
+            with patch.object(service._rag, "index_tasks_batch", side_effect=index_batch):
+                stats = await service.bulk_import_tasks("P1", _stream(tasks), batch_size=2)
+
+    # batch 1 fine, batch 2 inserted but not indexed, batch 3 not inserted
+    assert stats["imported"] == 4
+    assert stats["failed"] == 1
+    assert stats["index_failed"] == 2
+    assert stats["unindexed_ids"] == ["T2", "T3"]
+    assert stats["chunks_indexed"] == 2
+    args = mock_upsert_script.call_args.kwargs["args"]
+    assert args[1::2] == ["T0", "T1"]
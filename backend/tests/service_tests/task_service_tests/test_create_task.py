@@ -25,8 +25,8 @@ async def test_create_task_success():
 
     # mock redis
     mock_redis = MagicMock()
-    mock_redis.get = AsyncMock(return_value=None)
-    mock_redis.set = AsyncMock()
+    mock_upsert_script = AsyncMock(return_value=1)
+    mock_redis.register_script.return_value = mock_upsert_script
 
 
     with patch("backend.service.task_service.get_supabase_client", new_callable=AsyncMock) as mock_supabase_factory:
@@ -60,5 +60,9 @@ async def test_create_task_success():
                 # rag index_task called
                 mock_rag_index.assert_called_once()
 
-                # redis cache updated
-                mock_redis.set.assert_awaited_once()
\ No newline at end of file
+                # redis cache updated: one atomic hash write for the new task
+                mock_upsert_script.assert_awaited_once()
+                keys = mock_upsert_script.call_args.kwargs["keys"]
+                args = mock_upsert_script.call_args.kwargs["args"]
+                assert keys == ["project:P1:task_texts"]
+                assert args[1] == "NEW123"
\ No newline at end of file
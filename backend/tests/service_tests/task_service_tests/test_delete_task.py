@@ -28,12 +28,8 @@ async def test_delete_task_success():
     # -------------------------------
     # mock redis
     # -------------------------------
-    cache_before = '[{"taskId": "T123"}, {"taskId": "T999"}]'
-
     mock_redis = MagicMock()
-    mock_redis.get = AsyncMock(return_value=cache_before)
-    mock_redis.set = AsyncMock()
-    mock_redis.delete = AsyncMock()
+    mock_redis.hdel = AsyncMock()
 
 
     with patch("backend.service.task_service.get_supabase_client", new=AsyncMock(return_value=mock_supabase)) as mock_supabase_factory:
@@ -62,5 +58,5 @@ async def test_delete_task_success():
                 # rag delete called
                 mock_rag_delete.assert_called_once_with(projectId="P1", taskId="T123")
 
-                # cache updated correctly
-                mock_redis.set.assert_awaited_once()
\ No newline at end of file
+                # cache updated correctly: task removed from the texts hash
+                mock_redis.hdel.assert_awaited_once_with("project:P1:task_texts", "T123")
\ No newline at end of file
@@ -41,8 +41,8 @@ async def test_update_task_success_with_regeneration():
     # mock redis
     # -------------------------------
     mock_redis = MagicMock()
-    mock_redis.get = AsyncMock(return_value='[{"taskId": "T123", "title": "Old Title"}]')
-    mock_redis.set = AsyncMock()
+    mock_upsert_script = AsyncMock(return_value=1)
+    mock_redis.register_script.return_value = mock_upsert_script
 
     with patch("backend.service.task_service.get_supabase_client", new=AsyncMock(return_value=mock_supabase)) as mock_supabase_factory:
         with patch("backend.service.task_service.get_redis_client", new=AsyncMock(return_value=mock_redis)) as mock_redis_factory:
@@ -82,5 +82,8 @@ async def test_update_task_success_with_regeneration():
                     # check if RAG indexing triggered
                     mock_rag_index.assert_called_once()
 
-                    # update cache
-                    mock_redis.set.assert_awaited_once()
\ No newline at end of file
+                    # update cache: only the edited task's fields are written
+                    mock_upsert_script.assert_awaited_once()
+                    args = mock_upsert_script.call_args.kwargs["args"]
+                    assert args[1] == "T123"
+                    assert args[2] == "Updated Title\nUpdated Desc\nNew AI Desc"
\ No newline at end of file
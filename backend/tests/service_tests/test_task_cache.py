@@ -0,0 +1,48 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from backend.service import task_cache
+
+
+@pytest.mark.asyncio
+async def test_read_texts_miss_and_hit():
+    redis = MagicMock()
+    redis.hvals = AsyncMock(return_value=[])
+    assert await task_cache.read_texts(redis, "P1") is None
+
+    # "_" placeholder of an empty project is filtered out
+    redis.hvals = AsyncMock(return_value=["", "Task A\ndesc", "Task B"])
+    assert await task_cache.read_texts(redis, "P1") == ["Task A\ndesc", "Task B"]
+    redis.hvals.assert_awaited_with("project:P1:task_texts")
+
+
+@pytest.mark.asyncio
+async def test_upsert_tasks_sends_one_atomic_script_call():
+    redis = MagicMock()
+    script = AsyncMock(return_value=0)
+    redis.register_script.return_value = script
+
+    entry = task_cache.build_entry("T1", "Title", "desc", None)
+    written = await task_cache.upsert_tasks(redis, "P1", [entry], ttl=60)
+
+    # project not cached -> nothing written, the next read rebuilds from RAG
+    assert written is False
+    script.assert_awaited_once_with(
+        keys=["project:P1:task_texts"],
+        args=[60, "T1", "Title\ndesc"],
+    )
+
+
+@pytest.mark.asyncio
+async def test_fill_texts_replaces_hash_in_a_transaction():
+    redis = MagicMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    redis.pipeline.return_value = pipe
+
+    await task_cache.fill_texts(redis, "P1", {"T1": "text 1"}, ttl=30)
+
+    pipe.delete.assert_called_once_with("project:P1:task_texts")
+    pipe.hset.assert_called_once_with("project:P1:task_texts", mapping={"_": "", "T1": "text 1"})
+    pipe.expire.assert_called_once_with("project:P1:task_texts", 30)
+    pipe.execute.assert_awaited_once()
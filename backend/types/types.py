@@ -45,10 +45,26 @@ class IndexEnrichedTaskRequest(BaseModel):
     task_title: str
     user_description: str
     ai_description: str
+    epic: Optional[str] = None
     status: TaskStatus
     story_points: int
 
 
+class BulkImportTask(BaseModel):
+    """One NDJSON line of a bulk task import."""
+    title: str
+    description: str = ""
+    ai_description: str = ""
+    status: TaskStatus = 'todo'
+    story_points: int = 0
+    epic: Optional[str] = None
+
+    @field_validator('status', mode='before')
+    @classmethod
+    def lower_status(cls, v):
+        return v.lower() if isinstance(v, str) else v
+
+
 class EditEnrichedTaskRequest(BaseModel):
     projectId: str
     taskId: str
@@ -74,6 +90,7 @@ class RetrieveRequest(BaseModel):
     title: str
     user_description: str
     epic: Optional[str] = None
+    top_k: int = 6
 
 class ContextChunk(BaseModel):
     doc_id: str